@@ -5,26 +5,37 @@
 import eventlet
 eventlet.monkey_patch()
 
-from flask import Flask, render_template, request, jsonify, send_file
+from flask import Flask, render_template, request, jsonify, send_file, Response, stream_with_context
 from flask_socketio import SocketIO, emit
 from flask_cors import CORS
 import os
 import sys
-import pandas as pd
 from datetime import datetime
 from dotenv import load_dotenv
 import io
+import csv
+import json
+import tempfile
+import base64
 from pathlib import Path
+from openpyxl import Workbook
 
 # Adicionar src ao path
 sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
 
 from database.db import Database
+from database.empresa_query import EmpresaQuery
+from database.campaign_log import CampaignLogWriter
 from scraper.google_maps_scraper import GoogleMapsScraper
+from scraper.scraper_pool import ScraperPool, DEFAULT_WORKERS
+from scraper.email_enricher import EmailEnricher
 from utils.logger import Logger
 from whatsapp.whatsapp_bot import WhatsAppBot
 from whatsapp.whatsapp_selenium import WhatsAppSelenium
 from whatsapp.whatsapp_ptt_client import WhatsAppPTTClient
+from whatsapp.sender_pool import SenderPool
+from whatsapp.number_checker import NumberChecker
+from whatsapp.campaign_worker import CampaignWorker, RETRY
 
 # Carregar variáveis de ambiente
 load_dotenv()
@@ -45,10 +56,11 @@ db = Database(db_path)
 # Variável global para controlar o bot
 bot_running = False
 scraper_instance = None
-whatsapp_bot_running = False
 whatsapp_bot_instance = None
 whatsapp_selenium_instance = None  # Instância global do Selenium WhatsApp
+sender_pool = SenderPool()  # Sessões Selenium usadas em paralelo nas campanhas (inclui a 'default')
 whatsapp_ptt_client = WhatsAppPTTClient()  # Cliente PTT para Baileys
+number_checker = NumberChecker(db, whatsapp_ptt_client)  # Verificação prévia de números (cache + Baileys)
 
 
 @app.route('/')
@@ -87,230 +99,269 @@ def enviar_ptt():
     return render_template('enviar_ptt.html')
 
 
-@app.route('/api/empresas')
-def get_empresas():
-    """Listar empresas com filtros"""
-    setor = request.args.get('setor', '')
-    cidade = request.args.get('cidade', '')
-    has_email = request.args.get('has_email', '')
-    has_telefone = request.args.get('has_telefone', '')
-    has_whatsapp = request.args.get('has_whatsapp', '')
-    has_website = request.args.get('has_website', '')
-    has_instagram = request.args.get('has_instagram', '')
-    has_facebook = request.args.get('has_facebook', '')
-    has_linkedin = request.args.get('has_linkedin', '')
-    has_twitter = request.args.get('has_twitter', '')
-    search = request.args.get('search', '')
+# ==================== PAGINAÇÃO ====================
 
-    # Construir query base
-    query = 'SELECT * FROM empresas WHERE 1=1'
-    params = []
+# Colunas de empresas aceitas no parâmetro fields=
+EMPRESAS_FIELDS = [
+    'id', 'nome', 'setor', 'cidade', 'endereco', 'telefone', 'whatsapp',
+    'email', 'website', 'instagram', 'facebook', 'linkedin', 'twitter',
+    'google_maps_url', 'rating', 'total_reviews', 'horario_funcionamento',
+    'latitude', 'longitude', 'data_criacao', 'data_atualizacao'
+]
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
 
-    if setor:
-        query += ' AND setor LIKE ?'
-        params.append(f'%{setor}%')
+# Status de envio calculado a partir dos JOINs com whatsapp_blocked (wb) e whatsapp_logs (wl)
+STATUS_ENVIO_SQL = '''
+    CASE
+        WHEN wb.telefone IS NOT NULL THEN 'bloqueado'
+        WHEN wl.id IS NOT NULL THEN 'enviado'
+        ELSE 'nao_enviado'
+    END
+'''
 
-    if cidade:
-        query += ' AND cidade LIKE ?'
-        params.append(f'%{cidade}%')
 
-    if has_email == 'true':
-        query += ' AND email IS NOT NULL AND email != ""'
+def encode_cursor(row):
+    """Gerar cursor opaco a partir da última linha da página (data_criacao, id)"""
+    raw = json.dumps([row['data_criacao'], row['id']])
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
 
-    if has_telefone == 'true':
-        query += ' AND telefone IS NOT NULL AND telefone != ""'
 
-    if has_whatsapp == 'true':
-        query += ' AND whatsapp IS NOT NULL AND whatsapp != ""'
+def decode_cursor(cursor):
+    """Decodificar cursor gerado por encode_cursor (ValueError se inválido)"""
+    try:
+        data_criacao, empresa_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return data_criacao, int(empresa_id)
+    except Exception:
+        raise ValueError('Cursor inválido')
 
-    if has_website == 'true':
-        query += ' AND website IS NOT NULL AND website != ""'
 
-    if has_instagram == 'true':
-        query += ' AND instagram IS NOT NULL AND instagram != ""'
+def get_page_args():
+    """
+    Ler limit/cursor da query string
 
-    if has_facebook == 'true':
-        query += ' AND facebook IS NOT NULL AND facebook != ""'
+    Returns:
+        tuple: (limit, cursor) ou (None, None) se a paginação não foi pedida
+    """
+    limit = request.args.get('limit', type=int)
+    cursor = request.args.get('cursor', '')
 
-    if has_linkedin == 'true':
-        query += ' AND linkedin IS NOT NULL AND linkedin != ""'
+    if limit is None and not cursor:
+        return None, None
 
-    if has_twitter == 'true':
-        query += ' AND twitter IS NOT NULL AND twitter != ""'
+    limit = max(1, min(limit or DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE))
+    return limit, decode_cursor(cursor) if cursor else None
 
-    if search:
-        query += ' AND (nome LIKE ? OR endereco LIKE ?)'
-        params.extend([f'%{search}%', f'%{search}%'])
 
-    query += ' ORDER BY data_criacao DESC'
+def select_fields(alias=''):
+    """Montar a lista de colunas a partir de fields= (id e data_criacao sempre incluídos)"""
+    fields = request.args.get('fields', '')
+    if not fields:
+        return f'{alias}*'
 
-    cursor = db.cursor
-    cursor.execute(query, params)
-    empresas = [dict(row) for row in cursor.fetchall()]
+    columns = ['id', 'data_criacao']
+    for field in fields.split(','):
+        field = field.strip()
+        if field in EMPRESAS_FIELDS and field not in columns:
+            columns.append(field)
 
-    return jsonify(empresas)
+    return ', '.join(f'{alias}{col}' for col in columns)
 
 
-@app.route('/api/empresas-com-status')
-def get_empresas_com_status():
-    """Listar empresas com status de envio e filtros avançados"""
-    try:
-        # Filtros
-        setor = request.args.get('setor', '')
-        cidade = request.args.get('cidade', '')
-        has_whatsapp = request.args.get('has_whatsapp', 'true')
-        search = request.args.get('search', '')
-        search_numero = request.args.get('search_numero', '')
-        status_envio = request.args.get('status_envio', '')
-
-        # Query base com LEFT JOINs para verificar status
-        query = '''
-            SELECT DISTINCT
-                e.*,
-                CASE
-                    WHEN wb.telefone IS NOT NULL THEN 'bloqueado'
-                    WHEN wl.id IS NOT NULL THEN 'enviado'
-                    ELSE 'nao_enviado'
-                END as status_envio,
-                wl.data_envio,
-                wl.status as status_msg,
-                wl.erro,
-                wb.motivo as motivo_bloqueio
-            FROM empresas e
-            LEFT JOIN whatsapp_blocked wb ON wb.telefone = REPLACE(REPLACE(REPLACE(REPLACE(e.whatsapp, ' ', ''), '-', ''), '(', ''), ')', '')
-            LEFT JOIN (
-                SELECT empresa_id, MAX(id) as max_id
-                FROM whatsapp_logs
-                GROUP BY empresa_id
-            ) latest_log ON latest_log.empresa_id = e.id
-            LEFT JOIN whatsapp_logs wl ON wl.id = latest_log.max_id
-            WHERE 1=1
-        '''
+def fetch_page(query, params, limit, cursor, alias=''):
+    """
+    Executar query ordenada por (data_criacao, id) DESC com paginação keyset
 
-        params = []
+    A query deve terminar em uma cláusula WHERE (sem ORDER BY).
 
-        # Filtrar por WhatsApp
-        if has_whatsapp == 'true':
-            query += ' AND e.whatsapp IS NOT NULL AND e.whatsapp != ""'
+    Returns:
+        dict: empresas da página, next_cursor e has_more
+    """
+    if cursor:
+        query += f' AND ({alias}data_criacao, {alias}id) < (?, ?)'
+        params = params + list(cursor)
 
-        # Filtrar por setor
-        if setor:
-            query += ' AND e.setor LIKE ?'
-            params.append(f'%{setor}%')
+    query += f' ORDER BY {alias}data_criacao DESC, {alias}id DESC LIMIT ?'
+    params = params + [limit + 1]
 
-        # Filtrar por cidade
-        if cidade:
-            query += ' AND e.cidade LIKE ?'
-            params.append(f'%{cidade}%')
+    cur = db.cursor
+    cur.execute(query, params)
+    rows = [dict(row) for row in cur.fetchall()]
 
-        # Buscar por nome ou endereço
-        if search:
-            query += ' AND (e.nome LIKE ? OR e.endereco LIKE ?)'
-            params.extend([f'%{search}%', f'%{search}%'])
+    has_more = len(rows) > limit
+    rows = rows[:limit]
 
-        # Buscar por número
-        if search_numero:
-            # Remover caracteres especiais para busca
-            numero_limpo = ''.join(filter(str.isdigit, search_numero))
-            query += ' AND REPLACE(REPLACE(REPLACE(REPLACE(e.whatsapp, " ", ""), "-", ""), "(", ""), ")", "") LIKE ?'
-            params.append(f'%{numero_limpo}%')
+    return {
+        'empresas': rows,
+        'next_cursor': encode_cursor(rows[-1]) if has_more else None,
+        'has_more': has_more
+    }
 
-        query += ' ORDER BY e.data_criacao DESC'
 
-        cursor = db.cursor
-        cursor.execute(query, params)
-        empresas_raw = [dict(row) for row in cursor.fetchall()]
+def build_empresas_status_query(select):
+    """
+    Montar FROM/WHERE das listagens com status de envio a partir da query string
 
-        # Filtrar por status de envio (após query principal)
-        if status_envio:
-            empresas = [e for e in empresas_raw if e['status_envio'] == status_envio]
-        else:
-            empresas = empresas_raw
+    Cada empresa é ligada apenas ao seu último log (subconsulta indexada por
+    empresa_id), então não há linhas duplicadas para agrupar em Python.
 
-        # Estatísticas
-        total = len(empresas)
-        enviados = len([e for e in empresas if e['status_envio'] == 'enviado'])
-        nao_enviados = len([e for e in empresas if e['status_envio'] == 'nao_enviado'])
-        bloqueados = len([e for e in empresas if e['status_envio'] == 'bloqueado'])
+    Returns:
+        tuple: (query, params)
+    """
+    status_envio = request.args.get('status_envio', '')
+    campanha_id = request.args.get('campanha_id', type=int)
 
-        return jsonify({
-            'empresas': empresas,
-            'stats': {
-                'total': total,
-                'enviados': enviados,
-                'nao_enviados': nao_enviados,
-                'bloqueados': bloqueados
-            }
-        })
+    from_params = []
+    latest_log = 'SELECT MAX(id) FROM whatsapp_logs WHERE empresa_id = e.id'
+    if campanha_id:
+        latest_log += ' AND campanha_id = ?'
+        from_params.append(campanha_id)
 
-    except Exception as e:
-        print(f"❌ Erro em get_empresas_com_status: {e}")
-        import traceback
-        traceback.print_exc()
-        return jsonify({'error': str(e)}), 500
+    from_clause = f'''empresas e
+        LEFT JOIN whatsapp_blocked wb ON wb.telefone = e.whatsapp_norm
+        LEFT JOIN whatsapp_logs wl ON wl.id = ({latest_log})'''
 
+    empresa_query = EmpresaQuery.from_args(db, request.args, alias='e.', defaults={'has_whatsapp': 'true'})
 
-@app.route('/api/stats')
-def get_stats():
-    """Obter estatísticas"""
-    stats = db.get_stats()
+    # Filtrar por status de envio direto no SQL
+    if status_envio == 'bloqueado':
+        empresa_query.where('wb.telefone IS NOT NULL')
+    elif status_envio == 'enviado':
+        empresa_query.where('wb.telefone IS NULL AND wl.id IS NOT NULL')
+    elif status_envio == 'nao_enviado':
+        empresa_query.where('wb.telefone IS NULL AND wl.id IS NULL')
 
-    # Estatísticas gerais
-    cursor = db.cursor
-    cursor.execute('SELECT COUNT(*) as total FROM empresas')
-    result = cursor.fetchone()
-    total = result['total'] if result else 0
+    return empresa_query.build(select, from_clause, from_params)
 
-    cursor = db.cursor
-    cursor.execute('SELECT COUNT(*) as total FROM empresas WHERE email IS NOT NULL AND email != ""')
-    result = cursor.fetchone()
-    total_email = result['total'] if result else 0
 
-    cursor = db.cursor
-    cursor.execute('SELECT COUNT(*) as total FROM empresas WHERE telefone IS NOT NULL AND telefone != ""')
-    result = cursor.fetchone()
-    total_telefone = result['total'] if result else 0
+def empresas_status_response(query, params, limit, cursor):
+    """Executar listagem com status (paginada ou completa com estatísticas)"""
+    if limit:
+        return jsonify(fetch_page(query, params, limit, cursor, alias='e.'))
 
-    cursor = db.cursor
-    cursor.execute('SELECT COUNT(*) as total FROM empresas WHERE whatsapp IS NOT NULL AND whatsapp != ""')
-    result = cursor.fetchone()
-    total_whatsapp = result['total'] if result else 0
+    query += ' ORDER BY e.data_criacao DESC, e.id DESC'
 
-    cursor = db.cursor
-    cursor.execute('SELECT COUNT(*) as total FROM empresas WHERE website IS NOT NULL AND website != ""')
-    result = cursor.fetchone()
-    total_website = result['total'] if result else 0
+    cur = db.cursor
+    cur.execute(query, params)
+    empresas = [dict(row) for row in cur.fetchall()]
 
-    cursor = db.cursor
-    cursor.execute('SELECT COUNT(*) as total FROM empresas WHERE instagram IS NOT NULL AND instagram != ""')
-    result = cursor.fetchone()
-    total_instagram = result['total'] if result else 0
+    # Estatísticas
+    total = len(empresas)
+    enviados = len([e for e in empresas if e['status_envio'] == 'enviado'])
+    nao_enviados = len([e for e in empresas if e['status_envio'] == 'nao_enviado'])
+    bloqueados = len([e for e in empresas if e['status_envio'] == 'bloqueado'])
+
+    return jsonify({
+        'empresas': empresas,
+        'stats': {
+            'total': total,
+            'enviados': enviados,
+            'nao_enviados': nao_enviados,
+            'bloqueados': bloqueados
+        }
+    })
 
-    cursor = db.cursor
-    cursor.execute('SELECT COUNT(*) as total FROM empresas WHERE facebook IS NOT NULL AND facebook != ""')
-    result = cursor.fetchone()
-    total_facebook = result['total'] if result else 0
+
+def build_empresas_query(select='*'):
+    """Montar SELECT de empresas com os filtros da query string"""
+    return EmpresaQuery.from_args(db, request.args).build(select)
+
+
+@app.route('/api/empresas')
+def get_empresas():
+    """Listar empresas com filtros (paginação keyset opcional via limit/cursor)"""
+    try:
+        limit, cursor = get_page_args()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    query, params = build_empresas_query(select_fields())
+
+    if limit:
+        return jsonify(fetch_page(query, params, limit, cursor))
+
+    query += ' ORDER BY data_criacao DESC, id DESC'
 
     cursor = db.cursor
-    cursor.execute('SELECT COUNT(*) as total FROM empresas WHERE linkedin IS NOT NULL AND linkedin != ""')
-    result = cursor.fetchone()
-    total_linkedin = result['total'] if result else 0
+    cursor.execute(query, params)
+    empresas = [dict(row) for row in cursor.fetchall()]
+
+    return jsonify(empresas)
+
+
+@app.route('/api/empresas/count')
+def count_empresas():
+    """Contar empresas com os mesmos filtros de /api/empresas"""
+    query, params = build_empresas_query('COUNT(*) as total')
 
     cursor = db.cursor
-    cursor.execute('SELECT COUNT(*) as total FROM empresas WHERE twitter IS NOT NULL AND twitter != ""')
+    cursor.execute(query, params)
     result = cursor.fetchone()
-    total_twitter = result['total'] if result else 0
+
+    return jsonify({'total': result['total'] if result else 0})
+
+
+@app.route('/api/empresas-com-status')
+def get_empresas_com_status():
+    """Listar empresas com status de envio e filtros avançados"""
+    try:
+        limit, cursor = get_page_args()
+        query, params = build_empresas_status_query(f'''
+            {select_fields('e.')},
+            {STATUS_ENVIO_SQL} as status_envio,
+            wl.data_envio,
+            wl.status as status_msg,
+            wl.erro,
+            wb.motivo as motivo_bloqueio
+        ''')
+        return empresas_status_response(query, params, limit, cursor)
+
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        print(f"❌ Erro em get_empresas_com_status: {e}")
+        import traceback
+        traceback.print_exc()
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/empresas-com-status/count')
+def count_empresas_com_status():
+    """Contar empresas por status de envio (mesmos filtros de /api/empresas-com-status)"""
+    try:
+        query, params = build_empresas_status_query(f'''
+            COUNT(*) as total,
+            COALESCE(SUM(CASE WHEN {STATUS_ENVIO_SQL} = 'enviado' THEN 1 ELSE 0 END), 0) as enviados,
+            COALESCE(SUM(CASE WHEN {STATUS_ENVIO_SQL} = 'nao_enviado' THEN 1 ELSE 0 END), 0) as nao_enviados,
+            COALESCE(SUM(CASE WHEN {STATUS_ENVIO_SQL} = 'bloqueado' THEN 1 ELSE 0 END), 0) as bloqueados
+        ''')
+
+        cursor = db.cursor
+        cursor.execute(query, params)
+        return jsonify(dict(cursor.fetchone()))
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/stats')
+def get_stats():
+    """Obter estatísticas (contadores materializados; ?fresh=true recalcula)"""
+    fresh = request.args.get('fresh', '') == 'true'
+
+    stats = db.get_stats()
+    totals = db.get_totals(fresh=fresh)
 
     return jsonify({
-        'total': total,
-        'total_email': total_email,
-        'total_telefone': total_telefone,
-        'total_whatsapp': total_whatsapp,
-        'total_website': total_website,
-        'total_instagram': total_instagram,
-        'total_facebook': total_facebook,
-        'total_linkedin': total_linkedin,
-        'total_twitter': total_twitter,
+        'total': totals['total'],
+        'total_email': totals['com_email'],
+        'total_telefone': totals['com_telefone'],
+        'total_whatsapp': totals['com_whatsapp'],
+        'total_website': totals['com_website'],
+        'total_instagram': totals['com_instagram'],
+        'total_facebook': totals['com_facebook'],
+        'total_linkedin': totals['com_linkedin'],
+        'total_twitter': totals['com_twitter'],
         'by_sector': stats
     })
 
@@ -333,175 +384,106 @@ def get_cidades():
     return jsonify(cidades)
 
 
-@app.route('/api/export/excel')
-def export_excel():
-    """Exportar para Excel"""
-    setor = request.args.get('setor', '')
-    cidade = request.args.get('cidade', '')
-    has_email = request.args.get('has_email', '')
-    has_telefone = request.args.get('has_telefone', '')
-    has_whatsapp = request.args.get('has_whatsapp', '')
-    has_website = request.args.get('has_website', '')
-    has_instagram = request.args.get('has_instagram', '')
-    has_facebook = request.args.get('has_facebook', '')
-    has_linkedin = request.args.get('has_linkedin', '')
-    has_twitter = request.args.get('has_twitter', '')
-    search = request.args.get('search', '')
-
-    # Construir query
-    query = 'SELECT * FROM empresas WHERE 1=1'
-    params = []
-
-    if setor:
-        query += ' AND setor LIKE ?'
-        params.append(f'%{setor}%')
-
-    if cidade:
-        query += ' AND cidade LIKE ?'
-        params.append(f'%{cidade}%')
-
-    if has_email == 'true':
-        query += ' AND email IS NOT NULL AND email != ""'
-
-    if has_telefone == 'true':
-        query += ' AND telefone IS NOT NULL AND telefone != ""'
+# ==================== EXPORTAÇÃO ====================
 
-    if has_whatsapp == 'true':
-        query += ' AND whatsapp IS NOT NULL AND whatsapp != ""'
+# Colunas exportadas (na ordem das planilhas)
+EXPORT_COLUMNS = [
+    'id', 'nome', 'setor', 'cidade', 'endereco', 'telefone', 'whatsapp',
+    'email', 'website', 'instagram', 'facebook', 'linkedin', 'twitter',
+    'rating', 'total_reviews', 'horario_funcionamento',
+    'google_maps_url', 'latitude', 'longitude', 'data_criacao', 'data_atualizacao'
+]
+EXPORT_BATCH_SIZE = 1000  # Linhas lidas do cursor por vez
+XLSX_MIMETYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
 
-    if has_website == 'true':
-        query += ' AND website IS NOT NULL AND website != ""'
 
-    if has_instagram == 'true':
-        query += ' AND instagram IS NOT NULL AND instagram != ""'
-
-    if has_facebook == 'true':
-        query += ' AND facebook IS NOT NULL AND facebook != ""'
-
-    if has_linkedin == 'true':
-        query += ' AND linkedin IS NOT NULL AND linkedin != ""'
-
-    if has_twitter == 'true':
-        query += ' AND twitter IS NOT NULL AND twitter != ""'
-
-    if search:
-        query += ' AND (nome LIKE ? OR endereco LIKE ?)'
-        params.extend([f'%{search}%', f'%{search}%'])
-
-    query += ' ORDER BY data_criacao DESC'
-
-    cursor = db.cursor
-    cursor.execute(query, params)
-    empresas = [dict(row) for row in cursor.fetchall()]
-
-    # Criar DataFrame
-    df = pd.DataFrame(empresas)
+def iter_rows(query, params, columns):
+    """Percorrer o resultado da query em lotes (fetchmany), gerando tuplas na ordem de columns"""
+    cur = db.cursor
+    cur.execute(query, params)
+    try:
+        while True:
+            rows = cur.fetchmany(EXPORT_BATCH_SIZE)
+            if not rows:
+                break
+            for row in rows:
+                yield tuple(row[col] for col in columns)
+    finally:
+        cur.close()
+
+
+def stream_csv(columns, rows):
+    """Gerar o CSV em blocos (um por lote de linhas), com BOM para o Excel"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    yield '\ufeff'
+    writer.writerow(columns)
+
+    for i, row in enumerate(rows, 1):
+        writer.writerow(row)
+        if i % EXPORT_BATCH_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+
+    yield buffer.getvalue()
+
+
+def csv_response(columns, rows, filename):
+    """Resposta HTTP com o CSV enviado em streaming"""
+    return Response(
+        stream_with_context(stream_csv(columns, rows)),
+        mimetype='text/csv',
+        headers={'Content-Disposition': f'attachment; filename={filename}'}
+    )
 
-    # Reordenar colunas
-    columns_order = [
-        'id', 'nome', 'setor', 'cidade', 'endereco', 'telefone', 'whatsapp',
-        'email', 'website', 'instagram', 'facebook', 'linkedin', 'twitter',
-        'rating', 'total_reviews', 'horario_funcionamento',
-        'google_maps_url', 'latitude', 'longitude', 'data_criacao', 'data_atualizacao'
-    ]
 
-    df = df[[col for col in columns_order if col in df.columns]]
+def xlsx_response(columns, rows, sheet_name, filename):
+    """
+    Gravar as linhas em uma planilha openpyxl write-only em arquivo temporário
 
-    # Criar arquivo Excel em memória
-    output = io.BytesIO()
-    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-        df.to_excel(writer, index=False, sheet_name='Empresas')
+    O modo write-only não mantém as células em memória, então o consumo fica
+    constante independentemente do número de linhas.
+    """
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(sheet_name)
+    ws.append(columns)
+    for row in rows:
+        ws.append(row)
 
+    output = tempfile.TemporaryFile(suffix='.xlsx')
+    wb.save(output)
     output.seek(0)
 
-    filename = f"empresas_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-
     return send_file(
         output,
-        mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+        mimetype=XLSX_MIMETYPE,
         as_attachment=True,
         download_name=filename
     )
 
 
-@app.route('/api/export/csv')
-def export_csv():
-    """Exportar para CSV"""
-    setor = request.args.get('setor', '')
-    cidade = request.args.get('cidade', '')
-    has_email = request.args.get('has_email', '')
-    has_telefone = request.args.get('has_telefone', '')
-    has_whatsapp = request.args.get('has_whatsapp', '')
-    has_website = request.args.get('has_website', '')
-    has_instagram = request.args.get('has_instagram', '')
-    has_facebook = request.args.get('has_facebook', '')
-    has_linkedin = request.args.get('has_linkedin', '')
-    has_twitter = request.args.get('has_twitter', '')
-    search = request.args.get('search', '')
-
-    # Construir query
-    query = 'SELECT * FROM empresas WHERE 1=1'
-    params = []
-
-    if setor:
-        query += ' AND setor LIKE ?'
-        params.append(f'%{setor}%')
-
-    if cidade:
-        query += ' AND cidade LIKE ?'
-        params.append(f'%{cidade}%')
-
-    if has_email == 'true':
-        query += ' AND email IS NOT NULL AND email != ""'
-
-    if has_telefone == 'true':
-        query += ' AND telefone IS NOT NULL AND telefone != ""'
-
-    if has_whatsapp == 'true':
-        query += ' AND whatsapp IS NOT NULL AND whatsapp != ""'
-
-    if has_website == 'true':
-        query += ' AND website IS NOT NULL AND website != ""'
-
-    if has_instagram == 'true':
-        query += ' AND instagram IS NOT NULL AND instagram != ""'
-
-    if has_facebook == 'true':
-        query += ' AND facebook IS NOT NULL AND facebook != ""'
-
-    if has_linkedin == 'true':
-        query += ' AND linkedin IS NOT NULL AND linkedin != ""'
-
-    if has_twitter == 'true':
-        query += ' AND twitter IS NOT NULL AND twitter != ""'
-
-    if search:
-        query += ' AND (nome LIKE ? OR endereco LIKE ?)'
-        params.extend([f'%{search}%', f'%{search}%'])
-
-    query += ' ORDER BY data_criacao DESC'
-
-    cursor = db.cursor
-    cursor.execute(query, params)
-    empresas = [dict(row) for row in cursor.fetchall()]
+@app.route('/api/export/excel')
+def export_excel():
+    """Exportar para Excel"""
+    query, params = build_empresas_query(', '.join(EXPORT_COLUMNS))
+    query += ' ORDER BY data_criacao DESC, id DESC'
 
-    # Criar DataFrame
-    df = pd.DataFrame(empresas)
+    filename = f"empresas_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
+    rows = iter_rows(query, params, EXPORT_COLUMNS)
+    return xlsx_response(EXPORT_COLUMNS, rows, 'Empresas', filename)
 
-    # Criar arquivo CSV em memória
-    output = io.StringIO()
-    df.to_csv(output, index=False, encoding='utf-8-sig')
 
-    output.seek(0)
+@app.route('/api/export/csv')
+def export_csv():
+    """Exportar para CSV (streaming)"""
+    query, params = build_empresas_query(', '.join(EXPORT_COLUMNS))
+    query += ' ORDER BY data_criacao DESC, id DESC'
 
     filename = f"empresas_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-
-    return send_file(
-        io.BytesIO(output.getvalue().encode('utf-8-sig')),
-        mimetype='text/csv',
-        as_attachment=True,
-        download_name=filename
-    )
+    rows = iter_rows(query, params, EXPORT_COLUMNS)
+    return csv_response(EXPORT_COLUMNS, rows, filename)
 
 
 @socketio.on('start_scraping')
@@ -518,6 +500,7 @@ def handle_start_scraping(data):
     max_results = data.get('max_results', 50)
     continue_from_checkpoint = data.get('continue_from_checkpoint', True)
     required_contacts = data.get('required_contacts', {})
+    workers = int(data.get('workers', DEFAULT_WORKERS))
 
     if not setor or not cidade:
         emit('scraping_error', {'message': 'Setor e cidade são obrigatórios!'})
@@ -528,9 +511,16 @@ def handle_start_scraping(data):
     def run_scraper():
         global bot_running, scraper_instance
 
+        # Emails dos websites buscados em segundo plano (sem aiohttp: durante a extração)
+        email_enricher = EmailEnricher(db) if EmailEnricher.available() else None
+
         try:
             headless = os.getenv('HEADLESS', 'True').lower() == 'true'
-            scraper_instance = GoogleMapsScraper(headless=headless)
+            # Com mais de um worker, a extração é distribuída entre vários navegadores
+            if workers > 1:
+                scraper_instance = ScraperPool(workers=workers, headless=headless, email_enricher=email_enricher)
+            else:
+                scraper_instance = GoogleMapsScraper(headless=headless, email_enricher=email_enricher)
 
             socketio.emit('scraping_status', {'status': 'started', 'message': 'Iniciando busca...'})
 
@@ -551,6 +541,10 @@ def handle_start_scraping(data):
                 required_contacts=required_contacts
             )
 
+            if email_enricher:
+                socketio.emit('scraping_status', {'status': 'enriching', 'message': 'Buscando emails nos websites...'})
+                email_enricher.join(timeout=120)
+
             socketio.emit('scraping_complete', {
                 'total': len(businesses),
                 'message': f'Busca concluída! {len(businesses)} empresas com dados de contato encontradas.'
@@ -562,6 +556,8 @@ def handle_start_scraping(data):
         finally:
             if scraper_instance:
                 scraper_instance.close()
+            if email_enricher:
+                email_enricher.close(wait=False)
             bot_running = False
 
     # Executar em greenlet separada com eventlet
@@ -831,12 +827,7 @@ def get_campaign_logs(campanha_id):
 
 @socketio.on('send_whatsapp')
 def handle_send_whatsapp(data):
-    """Enviar mensagem WhatsApp via WebSocket"""
-    global whatsapp_bot_running, whatsapp_bot_instance
-
-    if whatsapp_bot_running:
-        emit('whatsapp_error', {'message': 'Bot WhatsApp já está em execução!'})
-        return
+    """Enfileirar campanha WhatsApp (executada pelo worker de campanhas)"""
 
     empresas_ids = data.get('empresas_ids', [])
     mensagem = data.get('mensagem', '')
@@ -845,6 +836,8 @@ def handle_send_whatsapp(data):
     continuar_campanha_id = data.get('continuar_campanha_id')  # Para retomar campanha
     block_resend = data.get('block_resend', True)  # Bloquear reenvio global (padrão: True)
     check_history = data.get('check_history', False)  # Verificar histórico de conversa
+    session_names = data.get('sessions') or None  # Sessões do pool a usar (padrão: todas logadas)
+    precheck_numbers = data.get('precheck_numbers', True)  # Pular números que não existem no WhatsApp
 
     # DEBUG: Imprimir dados recebidos
     print(f"\n🔍 DEBUG - Dados recebidos:")
@@ -854,268 +847,293 @@ def handle_send_whatsapp(data):
     print(f"  - campanha_nome: {campanha_nome}")
     print(f"  - block_resend: {block_resend}")
     print(f"  - check_history: {check_history}")
+    print(f"  - sessions: {session_names or 'todas'}")
+    print(f"  - precheck_numbers: {precheck_numbers}")
 
     if not empresas_ids or not mensagem:
         emit('whatsapp_error', {'message': 'IDs das empresas e mensagem são obrigatórios!'})
         return
 
-    whatsapp_bot_running = True
+    # A campanha é criada/retomada quando o worker assumir o job
+    job_id = db.enqueue_job('whatsapp', {
+        'empresas_ids': empresas_ids,
+        'mensagem': mensagem,
+        'delay': delay,
+        'campanha_nome': campanha_nome,
+        'block_resend': block_resend,
+        'check_history': check_history,
+        'sessions': session_names,
+        'precheck_numbers': precheck_numbers
+    }, campanha_id=continuar_campanha_id)
+
+    emit('whatsapp_status', {
+        'status': 'queued',
+        'message': f'Campanha adicionada à fila (job {job_id})',
+        'job_id': job_id
+    })
 
-    def run_whatsapp_bot():
-        global whatsapp_bot_running, whatsapp_bot_instance, whatsapp_selenium_instance
-        campanha_id = None
 
-        try:
-            # Verificar se há sessão Selenium ativa
-            if not whatsapp_selenium_instance or not whatsapp_selenium_instance.is_logged_in:
-                socketio.emit('whatsapp_error', {
-                    'message': 'Você precisa estar conectado ao WhatsApp! Clique em "Conectar ao WhatsApp" primeiro.'
-                })
-                return
+def run_whatsapp_job(job, should_stop):
+    """Executar um job de campanha WhatsApp (handler do worker de campanhas)"""
+    payload = job['payload']
+    empresas_ids = payload['empresas_ids']
+    mensagem = payload['mensagem']
+    delay = payload.get('delay', 30)
+    campanha_nome = payload['campanha_nome']
+    block_resend = payload.get('block_resend', True)
+    check_history = payload.get('check_history', False)
+    session_names = payload.get('sessions') or None
+    precheck_numbers = payload.get('precheck_numbers', True)
 
-            socketio.emit('whatsapp_status', {'status': 'started', 'message': 'Iniciando envio de mensagens...'})
+    # Campanha informada para retomar ou criada em uma execução anterior deste job
+    continuar_campanha_id = job['campanha_id']
+    campanha_id = None
+    log_writer = None
 
-            # Buscar empresas
-            empresas = []
-            empresas_bloqueadas = []
-            empresas_ja_enviadas = []
-            print(f"\n🔍 DEBUG - Buscando empresas no banco:")
-            print(f"   Block Resend Ativo: {block_resend}")
+    try:
+        # Verificar se há ao menos uma sessão Selenium logada no pool
+        if not sender_pool.logged_in(session_names):
+            socketio.emit('whatsapp_status', {
+                'status': 'waiting',
+                'message': 'Campanha na fila aguardando conexão ao WhatsApp. Clique em "Conectar ao WhatsApp".',
+                'job_id': job['id']
+            })
+            return RETRY
+
+        socketio.emit('whatsapp_status', {'status': 'started', 'message': 'Iniciando envio de mensagens...'})
+
+        # Buscar empresas e separar bloqueadas/já enviadas em lote
+        print(f"\n🔍 DEBUG - Buscando {len(empresas_ids)} empresas no banco:")
+        print(f"   Block Resend Ativo: {block_resend}")
+
+        alvos = db.resolve_campaign_targets(empresas_ids, block_resend=block_resend)
+        empresas = alvos['validas']
+        empresas_bloqueadas = [empresa['nome'] for empresa in alvos['bloqueadas']]
+        empresas_ja_enviadas = [empresa['nome'] for empresa in alvos['ja_enviadas']]
+
+        if alvos['sem_whatsapp']:
+            print(f"❌ Empresas sem WhatsApp válido ({len(alvos['sem_whatsapp'])}): {', '.join(e['nome'] for e in alvos['sem_whatsapp'][:10])}")
+        if alvos['nao_encontradas']:
+            print(f"❌ Empresas não encontradas ({len(alvos['nao_encontradas'])}): {alvos['nao_encontradas'][:10]}")
+
+        print(f"\n📊 Total de empresas válidas: {len(empresas)}")
+        if empresas_bloqueadas:
+            print(f"🚫 Empresas bloqueadas ignoradas ({len(empresas_bloqueadas)}): {', '.join(empresas_bloqueadas)}")
+        if empresas_ja_enviadas:
+            print(f"⏭️ Empresas já enviadas ignoradas ({len(empresas_ja_enviadas)}): {', '.join(empresas_ja_enviadas[:10])}{'...' if len(empresas_ja_enviadas) > 10 else ''}")
+
+        # Pular de antemão números que não existem no WhatsApp (cache + Baileys)
+        if precheck_numbers and empresas:
+            empresas, empresas_inexistentes = number_checker.filter_empresas(empresas)
+            if empresas_inexistentes:
+                print(f"📵 Números sem WhatsApp ignorados ({len(empresas_inexistentes)}): {', '.join(e['nome'] for e in empresas_inexistentes[:10])}{'...' if len(empresas_inexistentes) > 10 else ''}")
+                socketio.emit('whatsapp_status', {
+                    'status': 'prechecked',
+                    'message': f'{len(empresas_inexistentes)} números sem WhatsApp ignorados'
+                })
 
-            for empresa_id in empresas_ids:
-                empresa = db.get_empresa_by_id(empresa_id)
-                print(f"  - ID {empresa_id}: {empresa['nome'] if empresa else 'NÃO ENCONTRADA'} | WhatsApp: {empresa.get('whatsapp') if empresa else 'N/A'}")
-                # Verificar se empresa existe E tem whatsapp válido (não nulo e não vazio)
-                if empresa and empresa.get('whatsapp') and str(empresa.get('whatsapp')).strip():
-                    # Normalizar número
-                    telefone_normalizado = ''.join(filter(str.isdigit, empresa.get('whatsapp')))
-
-                    # Verificar se número está bloqueado
-                    if db.is_number_blocked(telefone_normalizado):
-                        empresas_bloqueadas.append(empresa['nome'])
-                        print(f"    🚫 Número bloqueado/ignorado")
-                    # Verificar se já recebeu mensagem em qualquer campanha (se block_resend estiver ativo)
-                    elif block_resend and db.check_empresa_already_sent_global(empresa['id']):
-                        empresas_ja_enviadas.append(empresa['nome'])
-                        print(f"    ⏭️ Já recebeu mensagem anteriormente (pulando)")
-                    else:
-                        empresas.append(empresa)
-                        print(f"    ✅ Adicionada à lista")
-                elif empresa:
-                    print(f"    ❌ WhatsApp inválido: '{empresa.get('whatsapp')}'")
-                else:
-                    print(f"    ❌ Empresa não encontrada")
+        if not empresas:
+            socketio.emit('whatsapp_error', {'message': 'Nenhuma empresa com WhatsApp encontrada'})
+            return 'erro'
+
+        # Criar ou retomar campanha
+        if continuar_campanha_id:
+            campanha_id = continuar_campanha_id
+            db.resume_campaign(campanha_id)
+            socketio.emit('whatsapp_status', {
+                'status': 'resumed',
+                'message': f'Retomando campanha ID: {campanha_id}'
+            })
 
-            print(f"\n📊 Total de empresas válidas: {len(empresas)}")
-            if empresas_bloqueadas:
-                print(f"🚫 Empresas bloqueadas ignoradas ({len(empresas_bloqueadas)}): {', '.join(empresas_bloqueadas)}")
-            if empresas_ja_enviadas:
-                print(f"⏭️ Empresas já enviadas ignoradas ({len(empresas_ja_enviadas)}): {', '.join(empresas_ja_enviadas[:10])}{'...' if len(empresas_ja_enviadas) > 10 else ''}")
+            # Manter o filtro acima (bloqueadas, já enviadas, sem WhatsApp, números
+            # inexistentes) e tirar as que já foram processadas nesta campanha. Na
+            # retomada automática de um job que criou a campanha, qualquer status
+            # conta; ao continuar uma campanha manualmente, as falhas são repetidas
+            pendentes = {
+                empresa['id'] for empresa in db.get_empresas_nao_enviadas(
+                    campanha_id,
+                    [empresa['id'] for empresa in empresas],
+                    apenas_sucesso=not payload.get('campanha_criada')
+                )
+            }
+            empresas = [empresa for empresa in empresas if empresa['id'] in pendentes]
 
             if not empresas:
-                socketio.emit('whatsapp_error', {'message': 'Nenhuma empresa com WhatsApp encontrada'})
-                return
-
-            # Criar ou retomar campanha
-            if continuar_campanha_id:
-                campanha_id = continuar_campanha_id
-                db.resume_campaign(campanha_id)
-                socketio.emit('whatsapp_status', {
-                    'status': 'resumed',
-                    'message': f'Retomando campanha ID: {campanha_id}'
+                socketio.emit('whatsapp_complete', {
+                    'total': 0,
+                    'success': 0,
+                    'failed': 0,
+                    'message': 'Todas as empresas desta campanha já receberam mensagens!'
                 })
+                return
 
-                # Filtrar empresas que já receberam
-                empresas_nao_enviadas = db.get_empresas_nao_enviadas(campanha_id, empresas_ids)
-                empresas = empresas_nao_enviadas
-
-                if not empresas:
-                    socketio.emit('whatsapp_complete', {
-                        'total': 0,
-                        'success': 0,
-                        'failed': 0,
-                        'message': 'Todas as empresas desta campanha já receberam mensagens!'
-                    })
-                    return
+            socketio.emit('whatsapp_status', {
+                'status': 'filtered',
+                'message': f'{len(empresas)} empresas restantes (pulando já enviadas)'
+            })
+        else:
+            # Criar nova campanha
+            campanha_id = db.create_campaign(
+                nome=campanha_nome,
+                mensagem=mensagem,
+                total_empresas=len(empresas),
+                delay=delay,
+                filtros={'empresas_ids': empresas_ids}
+            )
+            socketio.emit('whatsapp_status', {
+                'status': 'campaign_created',
+                'message': f'Campanha criada: {campanha_nome} (ID: {campanha_id})',
+                'campanha_id': campanha_id
+            })
+            db.set_job_campaign(job['id'], campanha_id)
+            payload['campanha_criada'] = True
+            db.update_job_payload(job['id'], payload)
+
+        # Logs e progresso gravados em lote; o checkpoint de cada mensagem é imediato
+        log_writer = CampaignLogWriter(db, campanha_id)
+
+        def already_sent(empresa):
+            """Pular empresas que já receberam nesta campanha (antes de aguardar o intervalo)"""
+            if db.check_empresa_already_sent(empresa['id'], campanha_id):
+                logger.info(f'Pulando {empresa["nome"]} - já recebeu mensagem nesta campanha')
+                return True
+            return False
+
+        def send_to_empresa(session, empresa):
+            """Enviar para uma empresa usando uma sessão do pool"""
+            # Personalizar mensagem
+            mensagem_personalizada = session._personalize_message(mensagem, empresa)
+
+            # Enviar usando Selenium
+            result = session.send_message(
+                empresa['whatsapp'],
+                mensagem_personalizada,
+                empresa['nome'],
+                check_history=check_history
+            )
 
-                socketio.emit('whatsapp_status', {
-                    'status': 'filtered',
-                    'message': f'{len(empresas)} empresas restantes (pulando já enviadas)'
-                })
+            # Verificar se número não existe e bloquear automaticamente
+            if result.get('status') == 'nao_existe':
+                telefone_normalizado = ''.join(filter(str.isdigit, empresa['whatsapp']))
+                db.block_number(telefone_normalizado, 'Número não existe no WhatsApp (bloqueado automaticamente)')
+                number_checker.mark(telefone_normalizado, False)
+                logger.info(f'Número {empresa["whatsapp"]} bloqueado automaticamente (não existe)')
+
+            # Se histórico foi encontrado, marcar como enviado
+            elif result.get('status') == 'ja_enviado':
+                logger.info(f'Histórico detectado para {empresa["nome"]} - marcado como enviado')
+                result = {**result, 'success': True}
+
+            return result
+
+        # Callback de progresso (chamado pelo pool, um alvo de cada vez)
+        def progress_callback(progress):
+            empresa = progress['target']
+            result = progress['result']
+
+            progress_data = {
+                'empresa_id': empresa['id'],
+                'current': progress['current'],
+                'total': progress['total'],
+                'success': progress['success_count'],
+                'failed': progress['failed_count'],
+                'empresa': empresa['nome'],
+                'phone': empresa.get('whatsapp', ''),
+                'session': progress['session'],
+                **result
+            }
+            socketio.emit('whatsapp_progress', progress_data)
+
+            # Determinar status
+            if result.get('status') == 'ja_enviado':
+                # Registrar no log como sucesso (já enviado anteriormente)
+                log_writer.log(
+                    enviados=1,
+                    empresa_id=empresa['id'],
+                    empresa_nome=empresa['nome'],
+                    telefone=''.join(filter(str.isdigit, empresa['whatsapp'])),
+                    mensagem='[Histórico de conversa detectado - não enviado]',
+                    status='sucesso',
+                    erro=None
+                )
             else:
-                # Criar nova campanha
-                campanha_id = db.create_campaign(
-                    nome=campanha_nome,
+                if result.get('status') == 'nao_existe':
+                    status = 'nao_existe'
+                elif result.get('success'):
+                    status = 'sucesso'
+                else:
+                    status = 'erro'
+
+                log_writer.log(
+                    enviados=1 if status == 'sucesso' else 0,
+                    falhas=1 if status in ['erro', 'nao_existe'] else 0,
+                    empresa_id=empresa['id'],
+                    empresa_nome=empresa['nome'],
+                    telefone=empresa.get('whatsapp', ''),
                     mensagem=mensagem,
-                    total_empresas=len(empresas),
-                    delay=delay,
-                    filtros={'empresas_ids': empresas_ids}
+                    status=status,
+                    erro=result.get('error')
                 )
-                socketio.emit('whatsapp_status', {
-                    'status': 'campaign_created',
-                    'message': f'Campanha criada: {campanha_nome} (ID: {campanha_id})',
-                    'campanha_id': campanha_id
-                })
-
-            # Callback de progresso
-            def progress_callback(progress_data):
-                socketio.emit('whatsapp_progress', progress_data)
-
-                # Registrar no log (apenas se não for ja_enviado, pois já foi registrado no bloco principal)
-                if progress_data.get('status') != 'ja_enviado':
-                    empresa_id = progress_data.get('empresa_id')
-                    empresa_nome = progress_data.get('empresa', '')
-                    telefone = progress_data.get('phone', '')
-
-                    # Determinar status
-                    if progress_data.get('status') == 'nao_existe':
-                        status = 'nao_existe'
-                    elif progress_data.get('success'):
-                        status = 'sucesso'
-                    else:
-                        status = 'erro'
-
-                    erro = progress_data.get('error')
-
-                    db.log_whatsapp_send(campanha_id, empresa_id, empresa_nome, telefone, mensagem, status, erro)
-
-                    # Atualizar checkpoint da campanha
-                    db.update_campaign_progress(
-                        campanha_id,
-                        enviados_increment=1 if status == 'sucesso' else 0,
-                        falhas_increment=1 if status in ['erro', 'nao_existe'] else 0,
-                        ultimo_indice=progress_data.get('current', 0)
-                    )
-                else:
-                    # Para ja_enviado, apenas atualizar checkpoint (log já foi feito)
-                    db.update_campaign_progress(
-                        campanha_id,
-                        enviados_increment=1,
-                        falhas_increment=0,
-                        ultimo_indice=progress_data.get('current', 0)
-                    )
-
-                socketio.sleep(0)
-
-            # Enviar mensagens
-            total = len(empresas)
-            success_count = 0
-            failed_count = 0
-
-            for i, empresa in enumerate(empresas, 1):
-                # Verificar se foi interrompido
-                if not whatsapp_bot_running:
-                    db.pause_campaign(campanha_id)
-                    socketio.emit('whatsapp_paused', {
-                        'campanha_id': campanha_id,
-                        'message': f'Campanha pausada. {i-1}/{total} enviados. Você pode continuar depois.'
-                    })
-                    return
-
-                try:
-                    # Verificar se já foi enviado (segurança extra)
-                    if db.check_empresa_already_sent(empresa['id'], campanha_id):
-                        logger.info(f'Pulando {empresa["nome"]} - já recebeu mensagem nesta campanha')
-                        continue
-
-                    # Personalizar mensagem
-                    mensagem_personalizada = whatsapp_selenium_instance._personalize_message(mensagem, empresa)
-
-                    # Enviar usando Selenium
-                    result = whatsapp_selenium_instance.send_message(
-                        empresa['whatsapp'],
-                        mensagem_personalizada,
-                        empresa['nome'],
-                        check_history=check_history
-                    )
-
-                    # Verificar se número não existe e bloquear automaticamente
-                    if result.get('status') == 'nao_existe':
-                        telefone_normalizado = ''.join(filter(str.isdigit, empresa['whatsapp']))
-                        db.block_number(telefone_normalizado, 'Número não existe no WhatsApp (bloqueado automaticamente)')
-                        logger.info(f'Número {empresa["whatsapp"]} bloqueado automaticamente (não existe)')
-                        failed_count += 1
-
-                    # Se histórico foi encontrado, marcar como enviado
-                    elif result.get('status') == 'ja_enviado':
-                        telefone_normalizado = ''.join(filter(str.isdigit, empresa['whatsapp']))
-                        # Registrar no log como sucesso (já enviado anteriormente)
-                        db.log_whatsapp_send(
-                            campanha_id=campanha_id,
-                            empresa_id=empresa['id'],
-                            empresa_nome=empresa['nome'],
-                            telefone=telefone_normalizado,
-                            mensagem='[Histórico de conversa detectado - não enviado]',
-                            status='sucesso',
-                            erro=None
-                        )
-                        logger.info(f'Histórico detectado para {empresa["nome"]} - marcado como enviado')
-                        success_count += 1
-
-                    elif result['success']:
-                        success_count += 1
-                    else:
-                        failed_count += 1
 
-                    progress_callback({
-                        'empresa_id': empresa['id'],
-                        'current': i,
-                        'total': total,
-                        'success': success_count,
-                        'failed': failed_count,
-                        'empresa': empresa['nome'],
-                        'phone': empresa['whatsapp'],
-                        **result
-                    })
+            # Checkpoint da campanha gravado antes da próxima mensagem sair
+            log_writer.checkpoint(progress['current'])
 
-                    # Delay entre envios
-                    if i < total:
-                        socketio.sleep(delay)
+            socketio.sleep(0)
 
-                except Exception as e:
-                    failed_count += 1
-                    progress_callback({
-                        'empresa_id': empresa['id'],
-                        'current': i,
-                        'total': total,
-                        'success': success_count,
-                        'failed': failed_count,
-                        'empresa': empresa['nome'],
-                        'phone': empresa.get('whatsapp', ''),
-                        'success': False,
-                        'error': str(e)
-                    })
-
-            # Marcar campanha como concluída
-            db.complete_campaign(campanha_id)
+        # Enviar mensagens dividindo as empresas entre as sessões logadas
+        total = len(empresas)
+        stats = sender_pool.run(
+            empresas,
+            send_to_empresa,
+            delay=delay,
+            progress_callback=progress_callback,
+            should_stop=should_stop,
+            session_names=session_names,
+            sleep=socketio.sleep,
+            skip_fn=already_sent
+        )
+        success_count = stats['success']
+        failed_count = stats['failed']
 
-            socketio.emit('whatsapp_complete', {
+        if stats['stopped']:
+            db.pause_campaign(campanha_id)
+            socketio.emit('whatsapp_paused', {
                 'campanha_id': campanha_id,
-                'total': total,
-                'success': success_count,
-                'failed': failed_count,
-                'message': f'Envio concluído! {success_count}/{total} mensagens enviadas com sucesso.'
+                'message': f'Campanha pausada. {stats["processed"]}/{total} enviados. Você pode continuar depois.'
             })
+            return 'pausado'
 
-        except Exception as e:
-            print(f"❌ Erro no bot WhatsApp: {e}")
-            if campanha_id:
-                db.pause_campaign(campanha_id)
-            socketio.emit('whatsapp_error', {'message': str(e), 'campanha_id': campanha_id})
-        finally:
-            whatsapp_bot_running = False
-            # Nota: NÃO fechamos a instância Selenium aqui para manter a sessão ativa
+        # Marcar campanha como concluída
+        db.complete_campaign(campanha_id)
 
-    # Executar em greenlet separada
-    eventlet.spawn(run_whatsapp_bot)
+        socketio.emit('whatsapp_complete', {
+            'campanha_id': campanha_id,
+            'total': total,
+            'success': success_count,
+            'failed': failed_count,
+            'sessions': stats['sessions'],
+            'message': f'Envio concluído! {success_count}/{total} mensagens enviadas com sucesso.'
+        })
+
+    except Exception as e:
+        print(f"❌ Erro no bot WhatsApp: {e}")
+        if campanha_id:
+            db.pause_campaign(campanha_id)
+        socketio.emit('whatsapp_error', {'message': str(e), 'campanha_id': campanha_id})
+        return 'erro'
+    finally:
+        if log_writer:
+            log_writer.close()
+        # Nota: NÃO fechamos a instância Selenium aqui para manter a sessão ativa
 
 
 @socketio.on('stop_whatsapp')
 def handle_stop_whatsapp():
-    """Parar bot WhatsApp"""
-    global whatsapp_bot_running, whatsapp_bot_instance
+    """Parar bot WhatsApp (a campanha em execução é pausada)"""
+    global whatsapp_bot_instance
 
-    whatsapp_bot_running = False
+    for worker in campaign_workers:
+        worker.stop(kind='whatsapp')
     whatsapp_bot_instance = None
 
     emit('whatsapp_stopped', {'message': 'Bot WhatsApp interrompido!'})
@@ -1135,11 +1153,23 @@ def start_whatsapp_session():
                 'message': 'Sessão já está ativa'
             }), 400
 
+        data = request.get_json(silent=True) or {}
+        # Modo de abrir conversas: 'url' (padrão); 'link' e 'search' são experimentais (WHATSAPP_INPAGE_NAVIGATION=1)
+        navigation = data.get('navigation', 'url')
+        # Modo de escrever a mensagem: 'insert_text' (padrão) ou 'keys' (tecla a tecla)
+        composition = data.get('composition', 'insert_text')
+
         # Criar instância do WhatsApp Selenium
-        whatsapp_selenium_instance = WhatsAppSelenium(session_name='default', headless=False)
+        whatsapp_selenium_instance = WhatsAppSelenium(
+            session_name='default',
+            headless=False,
+            navigation=navigation,
+            composition=composition
+        )
 
         # Iniciar navegador
         if whatsapp_selenium_instance.start():
+            sender_pool.add(whatsapp_selenium_instance)
             return jsonify({
                 'success': True,
                 'is_logged_in': whatsapp_selenium_instance.is_logged_in,
@@ -1151,6 +1181,12 @@ def start_whatsapp_session():
                 'message': 'Erro ao iniciar navegador'
             }), 500
 
+    except ValueError as e:
+        # Modo de navegação/composição inválido ou não habilitado
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
     except Exception as e:
         logger.error(f'Erro ao iniciar sessão WhatsApp: {e}')
         return jsonify({
@@ -1247,18 +1283,108 @@ def close_whatsapp_session():
     try:
         if whatsapp_selenium_instance:
             whatsapp_selenium_instance.close()
+            sender_pool.remove(whatsapp_selenium_instance.session_name)
             whatsapp_selenium_instance = None
 
         return jsonify({
             'success': True,
-            'message': 'Sessão fechada com sucesso'
+            'message': 'Sessão fechada com sucesso'
+        })
+
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 500
+
+
+# ==================== POOL DE SESSÕES WHATSAPP ====================
+
+@app.route('/api/whatsapp/pool', methods=['GET'])
+def get_sender_pool():
+    """Listar sessões do pool de envio"""
+    sessions = sender_pool.get_info()
+    return jsonify({
+        'sessions': sessions,
+        'logged_in': len([s for s in sessions if s['is_logged_in'] and s['driver_active']])
+    })
+
+
+@app.route('/api/whatsapp/pool/sessions', methods=['POST'])
+def add_sender_pool_session():
+    """Adicionar sessão ao pool (um número/perfil de navegador por sessão)"""
+    try:
+        data = request.get_json() or {}
+        session_name = data.get('session_name', '').strip()
+        min_interval = data.get('min_interval')  # Intervalo mínimo próprio entre envios (segundos)
+
+        if not session_name:
+            return jsonify({'success': False, 'message': 'Nome da sessão é obrigatório'}), 400
+
+        if sender_pool.get(session_name):
+            return jsonify({'success': False, 'message': 'Sessão já existe no pool'}), 400
+
+        session = WhatsAppSelenium(
+            session_name=session_name,
+            headless=data.get('headless', False),
+            navigation=data.get('navigation', 'url'),
+            composition=data.get('composition', 'insert_text')
+        )
+        if not session.start():
+            return jsonify({'success': False, 'message': 'Erro ao iniciar navegador'}), 500
+
+        sender_pool.add(session, min_interval=min_interval)
+
+        return jsonify({
+            'success': True,
+            'is_logged_in': session.is_logged_in,
+            'message': 'Navegador iniciado. Aguarde ou escaneie o QR Code.' if not session.is_logged_in else 'Sessão já está logada!'
         })
 
+    except ValueError as e:
+        # Modo de navegação/composição inválido ou não habilitado
+        return jsonify({'success': False, 'message': str(e)}), 400
     except Exception as e:
-        return jsonify({
-            'success': False,
-            'message': str(e)
-        }), 500
+        logger.error(f'Erro ao adicionar sessão ao pool: {e}')
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+
+@app.route('/api/whatsapp/pool/sessions/<session_name>/wait-login', methods=['POST'])
+def wait_sender_pool_login(session_name):
+    """Aguardar login (QR Code) de uma sessão do pool"""
+    session = sender_pool.get(session_name)
+    if not session:
+        return jsonify({'success': False, 'message': 'Sessão não encontrada'}), 404
+
+    timeout = (request.get_json() or {}).get('timeout', 120)
+
+    def wait_login():
+        success = session.wait_for_login(timeout=timeout)
+        socketio.emit('whatsapp_login_success' if success else 'whatsapp_login_timeout', {
+            'session': session_name,
+            'message': 'Login realizado com sucesso!' if success else 'Timeout aguardando login'
+        })
+
+    eventlet.spawn(wait_login)
+
+    return jsonify({
+        'success': True,
+        'message': f'Aguardando login (timeout: {timeout}s)...'
+    })
+
+
+@app.route('/api/whatsapp/pool/sessions/<session_name>', methods=['DELETE'])
+def remove_sender_pool_session(session_name):
+    """Fechar e remover sessão do pool"""
+    if whatsapp_selenium_instance and session_name == whatsapp_selenium_instance.session_name:
+        return jsonify({'success': False, 'message': 'Use /api/whatsapp/session/close para a sessão principal'}), 400
+
+    session = sender_pool.remove(session_name)
+    if not session:
+        return jsonify({'success': False, 'message': 'Sessão não encontrada'}), 404
+
+    session.close()
+    return jsonify({'success': True, 'message': 'Sessão removida do pool'})
 
 
 @app.route('/api/whatsapp/send-audio', methods=['POST'])
@@ -1360,6 +1486,41 @@ def send_audio_file():
         }), 500
 
 
+# ==================== VERIFICAÇÃO DE NÚMEROS ====================
+
+@app.route('/api/whatsapp/check-numbers', methods=['POST'])
+def check_whatsapp_numbers():
+    """Verificar em lote se os números das empresas existem no WhatsApp"""
+    try:
+        data = request.get_json() or {}
+        empresas_ids = data.get('empresas_ids', [])
+        numeros = data.get('numeros', [])
+
+        if not empresas_ids and not numeros:
+            return jsonify({'success': False, 'message': 'Informe empresas_ids ou numeros'}), 400
+
+        if empresas_ids:
+            alvos = db.resolve_campaign_targets(empresas_ids)
+            numeros = numeros + [
+                empresa['whatsapp']
+                for grupo in ('validas', 'bloqueadas', 'ja_enviadas')
+                for empresa in alvos[grupo]
+            ]
+
+        verificacoes = number_checker.check(numeros)
+
+        return jsonify({
+            'success': True,
+            'total': len(verificacoes),
+            'existentes': sum(1 for existe in verificacoes.values() if existe),
+            'inexistentes': [numero for numero, existe in verificacoes.items() if existe is False],
+            'nao_verificados': [numero for numero, existe in verificacoes.items() if existe is None],
+            'cache': db.get_number_checks_stats()
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+
 # ==================== ENDPOINTS PTT (BAILEYS) ====================
 
 @app.route('/api/whatsapp/ptt/status', methods=['GET'])
@@ -1368,7 +1529,7 @@ def get_ptt_status():
     global whatsapp_ptt_client
 
     try:
-        status = whatsapp_ptt_client.check_status()
+        status = whatsapp_ptt_client.check_status(max_age=0)  # Sempre consultar o serviço
         return jsonify(status)
     except Exception as e:
         return jsonify({
@@ -1443,7 +1604,8 @@ def send_audio_ptt():
         # Enviar via serviço PTT
         result = whatsapp_ptt_client.send_audio_ptt(phone, str(audio_path), empresa_nome)
 
-        # Remover arquivo temporário
+        # Envio único: remover o áudio registrado no serviço e o arquivo temporário
+        whatsapp_ptt_client.release_audio(str(audio_path))
         try:
             os.remove(str(audio_path))
         except:
@@ -1471,32 +1633,21 @@ def enviar_ptt_massa():
 def get_empresas_disponiveis_audio():
     """Listar empresas disponíveis para envio de áudio (não bloqueadas e com WhatsApp)"""
     try:
-        setor = request.args.get('setor', '')
-        cidade = request.args.get('cidade', '')
-        search = request.args.get('search', '')
         audio_path = request.args.get('audio_path', '')  # Para verificar se já recebeu este áudio
 
-        # Query para empresas não bloqueadas com WhatsApp
-        query = '''
-            SELECT DISTINCT
-                e.*,
-                CASE
-                    WHEN al.id IS NOT NULL THEN 'enviado'
-                    ELSE 'nao_enviado'
-                END as status_audio
-            FROM empresas e
-            LEFT JOIN whatsapp_blocked wb ON wb.telefone = REPLACE(REPLACE(REPLACE(REPLACE(e.whatsapp, ' ', ''), '-', ''), '(', ''), ')', '')
+        from_clause = '''empresas e
+            LEFT JOIN whatsapp_blocked wb ON wb.telefone = e.whatsapp_norm
         '''
 
         # Se audio_path foi fornecido, verificar se já recebeu este áudio específico
         if audio_path:
-            query += '''
+            from_clause += '''
                 LEFT JOIN audio_logs al ON al.empresa_id = e.id
                     AND al.audio_path = ?
                     AND al.status = 'sucesso'
             '''
         else:
-            query += '''
+            from_clause += '''
                 LEFT JOIN (
                     SELECT empresa_id, MAX(id) as max_id
                     FROM audio_logs
@@ -1506,26 +1657,19 @@ def get_empresas_disponiveis_audio():
                 LEFT JOIN audio_logs al ON al.id = latest_audio.max_id
             '''
 
-        query += '''
-            WHERE e.whatsapp IS NOT NULL
-                AND e.whatsapp != ''
-                AND wb.telefone IS NULL
+        select = '''DISTINCT
+                e.*,
+                CASE
+                    WHEN al.id IS NOT NULL THEN 'enviado'
+                    ELSE 'nao_enviado'
+                END as status_audio
         '''
 
-        params = [audio_path] if audio_path else []
-
-        if setor:
-            query += ' AND e.setor LIKE ?'
-            params.append(f'%{setor}%')
-
-        if cidade:
-            query += ' AND e.cidade LIKE ?'
-            params.append(f'%{cidade}%')
-
-        if search:
-            query += ' AND (e.nome LIKE ? OR e.endereco LIKE ?)'
-            params.extend([f'%{search}%', f'%{search}%'])
+        # Empresas não bloqueadas com WhatsApp
+        empresa_query = EmpresaQuery.from_args(db, request.args, alias='e.', defaults={'has_whatsapp': 'true'})
+        empresa_query.where('wb.telefone IS NULL')
 
+        query, params = empresa_query.build(select, from_clause, [audio_path] if audio_path else [])
         query += ' ORDER BY e.nome ASC'
 
         cursor = db.cursor
@@ -1627,101 +1771,231 @@ def send_bulk_audio_ptt():
 
 @socketio.on('send_bulk_audio_ptt')
 def handle_send_bulk_audio_ptt(data):
-    """Enviar áudio PTT em massa via WebSocket"""
-    global whatsapp_ptt_client
+    """Enfileirar envio de áudio PTT em massa (executado pelo worker de campanhas)"""
+    campanha_id = data.get('campanha_id')
+    empresa_ids = data.get('empresa_ids', [])
+    audio_path = data.get('audio_path')
+    delay = data.get('delay', 30)
+
+    if not campanha_id or not empresa_ids or not audio_path:
+        socketio.emit('audio_bulk_error', {'message': 'Dados incompletos'})
+        return
+
+    job_id = db.enqueue_job('audio', {
+        'empresa_ids': empresa_ids,
+        'audio_path': audio_path,
+        'delay': delay,
+        'jitter': data.get('jitter', delay * 0.2)
+    }, campanha_id=campanha_id)
+
+    socketio.emit('audio_bulk_status', {
+        'status': 'queued',
+        'message': f'Envio adicionado à fila (job {job_id})',
+        'job_id': job_id
+    })
+
+
+def run_audio_job(job, should_stop):
+    """Executar um job de campanha de áudio PTT (handler do worker de campanhas)"""
+    payload = job['payload']
+    campanha_id = job['campanha_id']
+    audio_path = payload['audio_path']
+    delay = payload.get('delay', 30)
 
     try:
-        campanha_id = data.get('campanha_id')
-        empresa_ids = data.get('empresa_ids', [])
-        audio_path = data.get('audio_path')
-        delay = data.get('delay', 30)
+        if not whatsapp_ptt_client.is_connected():
+            socketio.emit('audio_bulk_status', {
+                'status': 'waiting',
+                'message': 'Envio na fila aguardando conexão do serviço PTT',
+                'job_id': job['id']
+            })
+            return RETRY
+
+        # Retomar depois do último envio registrado (posição na lista original)
+        cursor = db.cursor
+        cursor.execute('SELECT ultimo_indice FROM audio_campaigns WHERE id = ?', (campanha_id,))
+        row = cursor.fetchone()
+        inicio = (row['ultimo_indice'] or 0) if row else 0
+        posicoes = {str(empresa_id): i for i, empresa_id in enumerate(payload['empresa_ids'], 1)}
+
+        # Logs e progresso gravados em lote; o checkpoint de cada envio é imediato
+        log_writer = CampaignLogWriter(db, campanha_id, kind='audio')
+
+        # Execução anterior interrompida: o job antigo continuou enviando no serviço.
+        # Registrar o que ele enviou depois do último checkpoint, cancelá-lo e só
+        # então reenviar o restante (wait_batch lê os resultados desde o início,
+        # cancela e acompanha até o envio em andamento terminar)
+        if payload.get('ptt_job_id'):
+            def recover_result(result):
+                """Registrar um envio feito pelo job antigo enquanto esta execução estava parada"""
+                nonlocal inicio
+                posicao = posicoes.get(str(result.get('ref')))
+                if not posicao or posicao <= inicio:
+                    return
+
+                log_writer.log(
+                    enviados=1 if result.get('success') else 0,
+                    falhas=0 if result.get('success') else 1,
+                    empresa_id=result['ref'],
+                    empresa_nome=result.get('name'),
+                    telefone=result['phone'],
+                    audio_path=audio_path,
+                    status='sucesso' if result.get('success') else 'erro',
+                    erro=result.get('error') if not result.get('success') else None
+                )
+                log_writer.checkpoint(posicao)
+                inicio = posicao
 
-        if not campanha_id or not empresa_ids or not audio_path:
-            socketio.emit('audio_bulk_error', {'message': 'Dados incompletos'})
-            return
+            try:
+                whatsapp_ptt_client.wait_batch(
+                    payload['ptt_job_id'],
+                    on_result=recover_result,
+                    should_stop=lambda: True,
+                    sleep=socketio.sleep
+                )
+            except Exception as e:
+                # Job expirado no serviço (ou serviço reiniciado): não há resultados a recuperar
+                logger.error(f'Não foi possível recuperar o job {payload["ptt_job_id"]} do serviço PTT: {e}')
+                whatsapp_ptt_client.cancel_batch(payload['ptt_job_id'])
+
+        empresa_ids = payload['empresa_ids'][inicio:]
 
         socketio.emit('audio_bulk_status', {
             'status': 'started',
-            'message': f'Iniciando envio para {len(empresa_ids)} contatos...'
+            'message': f'Iniciando envio para {len(empresa_ids)} contatos...',
+            'job_id': job['id']
         })
 
+        # Registrar o áudio uma vez (hash do conteúdo): cada envio só referencia o ID
+        try:
+            media_id = whatsapp_ptt_client.upload_audio(audio_path)
+        except Exception as e:
+            log_writer.close()
+            socketio.emit('audio_bulk_error', {'message': f'Erro ao registrar áudio no serviço PTT: {e}'})
+            return 'erro'
+
         total = len(empresa_ids)
         success_count = 0
         failed_count = 0
 
-        for i, empresa_id in enumerate(empresa_ids, 1):
-            try:
-                # Buscar empresa
-                empresa = db.get_empresa_by_id(empresa_id)
-                if not empresa or not empresa.get('whatsapp'):
-                    failed_count += 1
-                    continue
+        # Empresas sem WhatsApp/bloqueadas resolvidas em lote; as demais vão para um job no serviço
+        alvos = db.resolve_campaign_targets(empresa_ids)
+        empresas = {str(empresa['id']): empresa for empresa in alvos['validas']}
 
-                telefone_normalizado = ''.join(filter(str.isdigit, empresa['whatsapp']))
+        failed_count += len(alvos['nao_encontradas']) + len(alvos['sem_whatsapp'])
+        for empresa in alvos['bloqueadas']:
+            failed_count += 1
+            socketio.emit('audio_bulk_progress', {
+                'current': success_count + failed_count,
+                'total': total,
+                'success': success_count,
+                'failed': failed_count,
+                'empresa': empresa['nome'],
+                'status': 'bloqueado'
+            })
 
-                # Verificar se está bloqueado
-                if db.is_number_blocked(telefone_normalizado):
-                    failed_count += 1
+        if empresas:
+            # Ritmo (delay + jitter) e novas tentativas ficam no serviço PTT
+            ptt_job = whatsapp_ptt_client.submit_batch(
+                media_id,
+                [
+                    {
+                        'phone': ''.join(filter(str.isdigit, empresa['whatsapp'])),
+                        'name': empresa['nome'],
+                        'ref': empresa['id']
+                    }
+                    for empresa in alvos['validas']
+                ],
+                delay=delay,
+                jitter=payload.get('jitter', delay * 0.2)
+            )
+            if not ptt_job.get('success'):
+                log_writer.close()
+                socketio.emit('audio_bulk_error', {'message': f'Erro ao criar envio em lote: {ptt_job.get("error")}'})
+                return 'erro'
+
+            # Guardar o job do serviço para cancelá-lo se esta execução for retomada
+            payload['ptt_job_id'] = ptt_job['jobId']
+            db.update_job_payload(job['id'], payload)
+
+            def on_result(result):
+                """Registrar e emitir o resultado de um envio do job"""
+                nonlocal success_count, failed_count
+
+                try:
+                    empresa = empresas[str(result['ref'])]
+                    status = 'sucesso' if result.get('success') else 'erro'
+                    erro = result.get('error') if not result.get('success') else None
+
+                    log_writer.log(
+                        enviados=1 if result.get('success') else 0,
+                        falhas=0 if result.get('success') else 1,
+                        empresa_id=empresa['id'],
+                        empresa_nome=empresa['nome'],
+                        telefone=result['phone'],
+                        audio_path=audio_path,
+                        status=status,
+                        erro=erro
+                    )
+
+                    if result.get('success'):
+                        success_count += 1
+                    else:
+                        failed_count += 1
+
+                    # Checkpoint da campanha (posição da empresa na lista original)
+                    log_writer.checkpoint(posicoes[str(empresa['id'])])
+
+                    # Emitir progresso
                     socketio.emit('audio_bulk_progress', {
-                        'current': i,
+                        'current': success_count + failed_count,
                         'total': total,
                         'success': success_count,
                         'failed': failed_count,
                         'empresa': empresa['nome'],
-                        'status': 'bloqueado'
+                        'phone': empresa['whatsapp'],
+                        'status': status,
+                        'error': erro
                     })
-                    continue
 
-                # Enviar PTT
-                result = whatsapp_ptt_client.send_audio_ptt(
-                    phone=telefone_normalizado,
-                    audio_path=audio_path,
-                    empresa_nome=empresa['nome']
-                )
+                except Exception as e:
+                    logger.error(f'Erro ao registrar resultado de {result.get("ref")}: {e}')
 
-                # Registrar log
-                status = 'sucesso' if result.get('success') else 'erro'
-                erro = result.get('error') if not result.get('success') else None
+            try:
+                final = whatsapp_ptt_client.wait_batch(
+                    ptt_job['jobId'],
+                    on_result=on_result,
+                    should_stop=should_stop,
+                    sleep=socketio.sleep
+                )
+            except Exception as e:
+                # Job perdido no serviço (ex.: reiniciado): voltar à fila; a retomada
+                # registra o que ainda estiver disponível e reenvia a partir do checkpoint
+                logger.error(f'Erro ao acompanhar o job {ptt_job["jobId"]} do serviço PTT: {e}')
+                log_writer.close()
+                socketio.emit('audio_bulk_status', {
+                    'status': 'waiting',
+                    'message': f'Serviço PTT indisponível; envio volta para a fila. {success_count + failed_count}/{total} processados.',
+                    'job_id': job['id']
+                })
+                return RETRY
 
+            if final.get('status') == 'cancelled':
+                log_writer.close()
                 cursor = db.cursor
                 cursor.execute('''
-                    INSERT INTO audio_logs (campanha_id, empresa_id, empresa_nome, telefone, audio_path, status, erro)
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
-                ''', (campanha_id, empresa_id, empresa['nome'], telefone_normalizado, audio_path, status, erro))
-                db.conn.commit()
-
-                if result.get('success'):
-                    success_count += 1
-                else:
-                    failed_count += 1
-
-                # Atualizar progresso da campanha
-                cursor.execute('''
-                    UPDATE audio_campaigns
-                    SET total_enviados = ?, total_falhas = ?, ultimo_indice = ?, data_atualizacao = CURRENT_TIMESTAMP
+                    UPDATE audio_campaigns SET status = 'pausada', data_atualizacao = CURRENT_TIMESTAMP
                     WHERE id = ?
-                ''', (success_count, failed_count, i, campanha_id))
+                ''', (campanha_id,))
                 db.conn.commit()
-
-                # Emitir progresso
-                socketio.emit('audio_bulk_progress', {
-                    'current': i,
-                    'total': total,
-                    'success': success_count,
-                    'failed': failed_count,
-                    'empresa': empresa['nome'],
-                    'phone': empresa['whatsapp'],
-                    'status': status,
-                    'error': erro
+                socketio.emit('audio_bulk_status', {
+                    'status': 'paused',
+                    'message': f'Envio pausado. {success_count + failed_count}/{total} processados.',
+                    'campanha_id': campanha_id
                 })
+                return 'pausado'
 
-                # Delay entre envios
-                if i < total:
-                    socketio.sleep(delay)
-
-            except Exception as e:
-                failed_count += 1
-                logger.error(f'Erro ao enviar para {empresa_id}: {e}')
+        log_writer.close()
 
         # Finalizar campanha
         cursor = db.cursor
@@ -1745,6 +2019,7 @@ def handle_send_bulk_audio_ptt(data):
         import traceback
         traceback.print_exc()
         socketio.emit('audio_bulk_error', {'message': str(e)})
+        return 'erro'
 
 
 # ==================== ENDPOINTS NÚMEROS BLOQUEADOS ====================
@@ -1879,33 +2154,35 @@ def mark_as_sent_batch():
         success_count = 0
         skip_count = 0
 
-        for empresa_id in empresa_ids:
-            empresa = db.get_empresa_by_id(empresa_id)
-            if not empresa or not empresa.get('whatsapp'):
-                continue
+        marcadas = set()  # Logs ainda pendentes no lote não aparecem nas consultas
 
-            # Verificar se já foi marcado
-            if db.check_empresa_already_sent(empresa_id, campanha['id']):
-                skip_count += 1
-                continue
+        # Logs gravados em lote junto com as estatísticas da campanha
+        with CampaignLogWriter(db, campanha['id']) as log_writer:
+            for empresa_id in empresa_ids:
+                empresa = db.get_empresa_by_id(empresa_id)
+                if not empresa or not empresa.get('whatsapp'):
+                    continue
 
-            telefone_normalizado = ''.join(filter(str.isdigit, empresa['whatsapp']))
+                # Verificar se já foi marcado
+                if empresa_id in marcadas or db.check_empresa_already_sent(empresa_id, campanha['id']):
+                    skip_count += 1
+                    continue
+                marcadas.add(empresa_id)
 
-            # Registrar log
-            db.log_whatsapp_send(
-                campanha_id=campanha['id'],
-                empresa_id=empresa_id,
-                empresa_nome=empresa['nome'],
-                telefone=telefone_normalizado,
-                mensagem='[Marcado em massa como enviado]',
-                status='sucesso',
-                erro=None
-            )
+                telefone_normalizado = ''.join(filter(str.isdigit, empresa['whatsapp']))
 
-            success_count += 1
+                # Registrar log
+                log_writer.log(
+                    enviados=1,
+                    empresa_id=empresa_id,
+                    empresa_nome=empresa['nome'],
+                    telefone=telefone_normalizado,
+                    mensagem='[Marcado em massa como enviado]',
+                    status='sucesso',
+                    erro=None
+                )
 
-        # Atualizar estatísticas da campanha
-        db.update_campaign_progress(campanha['id'], enviados_increment=success_count, falhas_increment=0)
+                success_count += 1
 
         message = f'{success_count} número(s) marcado(s) como enviado!'
         if skip_count > 0:
@@ -2016,6 +2293,9 @@ def consultar_numeros():
             'nao_enviados': 0
         }
 
+        # Resolver todos os números de uma vez (empresa, bloqueio e último envio)
+        encontrados = db.resolve_numbers(numeros)
+
         for numero in numeros:
             # Normalizar número
             numero_normalizado = ''.join(filter(str.isdigit, numero))
@@ -2028,47 +2308,16 @@ def consultar_numeros():
             else:
                 numero_formatado = numero_normalizado
 
-            # Buscar empresa pelo número
-            cursor = db.cursor
-            cursor.execute('''
-                SELECT * FROM empresas
-                WHERE REPLACE(REPLACE(REPLACE(REPLACE(whatsapp, ' ', ''), '-', ''), '(', ''), ')', '') = ?
-                LIMIT 1
-            ''', (numero_normalizado,))
+            info = encontrados.get(numero_normalizado)
 
-            empresa = cursor.fetchone()
-
-            if empresa:
-                empresa = dict(empresa)
+            if info and info['empresa_id']:
                 stats['encontrados'] += 1
 
-                # Verificar se está bloqueado
-                is_blocked = db.is_number_blocked(numero_normalizado)
-
-                # Verificar se já recebeu mensagem
-                cursor.execute('''
-                    SELECT data_envio, status, erro
-                    FROM whatsapp_logs
-                    WHERE empresa_id = ? AND status = 'sucesso'
-                    ORDER BY data_envio DESC
-                    LIMIT 1
-                ''', (empresa['id'],))
-
-                log = cursor.fetchone()
-                enviado = log is not None
-
-                # Buscar motivo do bloqueio se bloqueado
-                motivo_bloqueio = None
-                if is_blocked:
-                    cursor.execute('SELECT motivo FROM whatsapp_blocked WHERE telefone = ?', (numero_normalizado,))
-                    bloqueio = cursor.fetchone()
-                    motivo_bloqueio = bloqueio['motivo'] if bloqueio else 'Bloqueado'
-
                 # Determinar status
-                if is_blocked:
+                if info['bloqueado']:
                     status_envio = 'bloqueado'
                     stats['bloqueados'] += 1
-                elif enviado:
+                elif info['data_envio']:
                     status_envio = 'enviado'
                     stats['enviados'] += 1
                 else:
@@ -2079,14 +2328,14 @@ def consultar_numeros():
                     'numero': numero_normalizado,
                     'numero_formatado': numero_formatado,
                     'encontrado': True,
-                    'empresa_id': empresa['id'],
-                    'nome': empresa['nome'],
-                    'setor': empresa.get('setor'),
-                    'cidade': empresa.get('cidade'),
-                    'email': empresa.get('email'),
+                    'empresa_id': info['empresa_id'],
+                    'nome': info['nome'],
+                    'setor': info['setor'],
+                    'cidade': info['cidade'],
+                    'email': info['email'],
                     'status_envio': status_envio,
-                    'data_envio': dict(log)['data_envio'] if log else None,
-                    'motivo_bloqueio': motivo_bloqueio
+                    'data_envio': info['data_envio'],
+                    'motivo_bloqueio': (info['motivo_bloqueio'] or 'Bloqueado') if info['bloqueado'] else None
                 })
             else:
                 stats['nao_encontrados'] += 1
@@ -2122,101 +2371,19 @@ def consultar_numeros():
 def get_empresas_com_status_envio():
     """Listar empresas com status de envio de mensagens"""
     try:
-        # Filtros da query
-        setor = request.args.get('setor', '')
-        cidade = request.args.get('cidade', '')
-        campanha_id = request.args.get('campanha_id', type=int)
-        status_envio = request.args.get('status_envio', '')  # 'enviado', 'nao_enviado', 'bloqueado'
-        has_whatsapp = request.args.get('has_whatsapp', 'true')  # Sempre filtrar com whatsapp
-        search = request.args.get('search', '')
-
-        # Query base
-        query = '''
-            SELECT
-                e.*,
-                CASE
-                    WHEN wb.telefone IS NOT NULL THEN 'bloqueado'
-                    WHEN wl.id IS NOT NULL THEN 'enviado'
-                    ELSE 'nao_enviado'
-                END as status_envio,
-                wl.data_envio,
-                wl.status as status_msg,
-                wl.erro,
-                wb.motivo as motivo_bloqueio
-            FROM empresas e
-            LEFT JOIN whatsapp_blocked wb ON wb.telefone = REPLACE(REPLACE(REPLACE(e.whatsapp, ' ', ''), '-', ''), '(', '')
-            LEFT JOIN whatsapp_logs wl ON wl.empresa_id = e.id
-        '''
-
-        params = []
-        conditions = ['1=1']
-
-        # Filtrar por campanha específica
-        if campanha_id:
-            query += ' AND wl.campanha_id = ?'
-            params.append(campanha_id)
-
-        # Sempre filtrar empresas com WhatsApp
-        if has_whatsapp == 'true':
-            conditions.append('e.whatsapp IS NOT NULL AND e.whatsapp != ""')
-
-        if setor:
-            conditions.append('e.setor LIKE ?')
-            params.append(f'%{setor}%')
-
-        if cidade:
-            conditions.append('e.cidade LIKE ?')
-            params.append(f'%{cidade}%')
-
-        if search:
-            conditions.append('(e.nome LIKE ? OR e.endereco LIKE ?)')
-            params.extend([f'%{search}%', f'%{search}%'])
-
-        # Adicionar condições WHERE
-        if conditions:
-            query += ' WHERE ' + ' AND '.join(conditions)
-
-        query += ' ORDER BY e.data_criacao DESC'
-
-        cursor = db.cursor
-        cursor.execute(query, params)
-        empresas_raw = [dict(row) for row in cursor.fetchall()]
-
-        # Processar e agrupar empresas (remover duplicatas)
-        empresas_dict = {}
-        for emp in empresas_raw:
-            empresa_id = emp['id']
-
-            if empresa_id not in empresas_dict:
-                empresas_dict[empresa_id] = emp
-            else:
-                # Se já existe, atualizar apenas se tem informação de envio mais recente
-                if emp['data_envio'] and (not empresas_dict[empresa_id]['data_envio'] or
-                                          emp['data_envio'] > empresas_dict[empresa_id]['data_envio']):
-                    empresas_dict[empresa_id] = emp
-
-        empresas = list(empresas_dict.values())
-
-        # Filtrar por status de envio (após agrupar)
-        if status_envio:
-            empresas = [e for e in empresas if e['status_envio'] == status_envio]
-
-        # Estatísticas
-        total = len(empresas)
-        enviados = len([e for e in empresas if e['status_envio'] == 'enviado'])
-        nao_enviados = len([e for e in empresas if e['status_envio'] == 'nao_enviado'])
-        bloqueados = len([e for e in empresas if e['status_envio'] == 'bloqueado'])
-
-        return jsonify({
-            'empresas': empresas,
-            'stats': {
-                'total': total,
-                'enviados': enviados,
-                'nao_enviados': nao_enviados,
-                'bloqueados': bloqueados
-            }
-        })
-
+        limit, cursor = get_page_args()
+        query, params = build_empresas_status_query(f'''
+            {select_fields('e.')},
+            {STATUS_ENVIO_SQL} as status_envio,
+            wl.data_envio,
+            wl.status as status_msg,
+            wl.erro,
+            wb.motivo as motivo_bloqueio
+        ''')
+        return empresas_status_response(query, params, limit, cursor)
+
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         print(f"❌ Erro em get_empresas_com_status_envio: {e}")
         import traceback
@@ -2228,107 +2395,32 @@ def get_empresas_com_status_envio():
 def export_mensagens_excel():
     """Exportar empresas com status de envio para Excel"""
     try:
-        # Obter mesmos filtros
-        setor = request.args.get('setor', '')
-        cidade = request.args.get('cidade', '')
-        campanha_id = request.args.get('campanha_id', type=int)
-        status_envio = request.args.get('status_envio', '')
-        search = request.args.get('search', '')
-
-        # Reutilizar a lógica da API
-        # (Código similar ao endpoint acima, mas retorna Excel)
-        query = '''
-            SELECT
-                e.*,
-                CASE
-                    WHEN wb.telefone IS NOT NULL THEN 'Bloqueado'
-                    WHEN wl.id IS NOT NULL THEN 'Enviado'
-                    ELSE 'Não Enviado'
-                END as status_envio,
-                wl.data_envio,
-                wl.status as status_msg,
-                wl.erro,
-                wb.motivo as motivo_bloqueio
-            FROM empresas e
-            LEFT JOIN whatsapp_blocked wb ON wb.telefone = REPLACE(REPLACE(REPLACE(e.whatsapp, ' ', ''), '-', ''), '(', '')
-            LEFT JOIN whatsapp_logs wl ON wl.empresa_id = e.id
-            WHERE e.whatsapp IS NOT NULL AND e.whatsapp != ""
+        # Mesmos filtros da listagem com status (último log por empresa)
+        select = f'''
+            e.*,
+            CASE {STATUS_ENVIO_SQL}
+                WHEN 'bloqueado' THEN 'Bloqueado'
+                WHEN 'enviado' THEN 'Enviado'
+                ELSE 'Não Enviado'
+            END as status_envio,
+            wl.data_envio,
+            wl.status as status_msg,
+            wl.erro,
+            wb.motivo as motivo_bloqueio
         '''
+        query, params = build_empresas_status_query(select)
+        query += ' ORDER BY e.data_criacao DESC, e.id DESC'
 
-        params = []
-
-        if campanha_id:
-            query += ' AND wl.campanha_id = ?'
-            params.append(campanha_id)
-
-        if setor:
-            query += ' AND e.setor LIKE ?'
-            params.append(f'%{setor}%')
-
-        if cidade:
-            query += ' AND e.cidade LIKE ?'
-            params.append(f'%{cidade}%')
-
-        if search:
-            query += ' AND (e.nome LIKE ? OR e.endereco LIKE ?)'
-            params.extend([f'%{search}%', f'%{search}%'])
-
-        query += ' ORDER BY e.data_criacao DESC'
-
-        cursor = db.cursor
-        cursor.execute(query, params)
-        empresas_raw = [dict(row) for row in cursor.fetchall()]
-
-        # Agrupar duplicatas
-        empresas_dict = {}
-        for emp in empresas_raw:
-            empresa_id = emp['id']
-            if empresa_id not in empresas_dict:
-                empresas_dict[empresa_id] = emp
-            else:
-                if emp['data_envio'] and (not empresas_dict[empresa_id]['data_envio'] or
-                                          emp['data_envio'] > empresas_dict[empresa_id]['data_envio']):
-                    empresas_dict[empresa_id] = emp
-
-        empresas = list(empresas_dict.values())
-
-        # Filtrar por status
-        if status_envio:
-            if status_envio == 'enviado':
-                empresas = [e for e in empresas if e['status_envio'] == 'Enviado']
-            elif status_envio == 'nao_enviado':
-                empresas = [e for e in empresas if e['status_envio'] == 'Não Enviado']
-            elif status_envio == 'bloqueado':
-                empresas = [e for e in empresas if e['status_envio'] == 'Bloqueado']
-
-        # Criar DataFrame
-        df = pd.DataFrame(empresas)
-
-        # Reordenar colunas
-        columns_order = [
+        columns = [
             'id', 'nome', 'status_envio', 'setor', 'cidade', 'endereco',
             'whatsapp', 'telefone', 'email', 'website', 'instagram', 'facebook',
             'data_envio', 'status_msg', 'erro', 'motivo_bloqueio',
             'rating', 'total_reviews', 'data_criacao'
         ]
 
-        df = df[[col for col in columns_order if col in df.columns]]
-
-        # Criar arquivo Excel
-        output = io.BytesIO()
-        with pd.ExcelWriter(output, engine='openpyxl') as writer:
-            df.to_excel(writer, index=False, sheet_name='Status Mensagens')
-
-        output.seek(0)
-
         filename = f"status_mensagens_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-
-        return send_file(
-            output,
-            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-            as_attachment=True,
-            download_name=filename
-        )
+        rows = iter_rows(query, params, columns)
+        return xlsx_response(columns, rows, 'Status Mensagens', filename)
 
     except Exception as e:
         print(f"❌ Erro ao exportar: {e}")
@@ -2431,35 +2523,63 @@ def send_sequence():
 
 @socketio.on('send_sequence')
 def handle_send_sequence(data):
-    """Enviar sequência de mensagens via WebSocket"""
-    global whatsapp_selenium_instance, whatsapp_ptt_client
+    """Enfileirar envio de sequência de mensagens (executado pelo worker de campanhas)"""
+    campanha_id = data.get('campanha_id')
+    empresa_ids = data.get('empresa_ids', [])
+    sequence = data.get('sequence', [])
+    delay = data.get('delay', 30)
+
+    if not campanha_id or not empresa_ids or not sequence:
+        socketio.emit('sequence_error', {'message': 'Dados incompletos'})
+        return
+
+    job_id = db.enqueue_job('sequence', {
+        'empresa_ids': empresa_ids,
+        'sequence': sequence,
+        'delay': delay
+    }, campanha_id=campanha_id)
+
+    socketio.emit('sequence_status', {
+        'status': 'queued',
+        'message': f'Sequência adicionada à fila (job {job_id})',
+        'job_id': job_id
+    })
 
-    try:
-        campanha_id = data.get('campanha_id')
-        empresa_ids = data.get('empresa_ids', [])
-        sequence = data.get('sequence', [])
-        delay = data.get('delay', 30)
 
-        if not campanha_id or not empresa_ids or not sequence:
-            socketio.emit('sequence_error', {'message': 'Dados incompletos'})
-            return
+def run_sequence_job(job, should_stop):
+    """Executar um job de campanha de sequência (handler do worker de campanhas)"""
+    payload = job['payload']
+    campanha_id = job['campanha_id']
+    empresa_ids = payload['empresa_ids']
+    sequence = payload['sequence']
+    delay = payload.get('delay', 30)
 
+    try:
         # Verificar conexão WhatsApp
         if not whatsapp_selenium_instance or not whatsapp_selenium_instance.is_logged_in:
             # Tentar usar PTT se Selenium não estiver disponível
             ptt_status = whatsapp_ptt_client.check_status()
             if not ptt_status.get('connected'):
-                socketio.emit('sequence_error', {
-                    'message': 'Nenhuma conexão WhatsApp ativa. Conecte via Selenium ou PTT primeiro.'
+                socketio.emit('sequence_status', {
+                    'status': 'waiting',
+                    'message': 'Sequência na fila aguardando conexão WhatsApp (Selenium ou PTT).',
+                    'job_id': job['id']
                 })
-                return
+                return RETRY
             use_ptt = True
         else:
             use_ptt = False
 
+        # Retomar depois da última empresa registrada
+        cursor = db.cursor
+        cursor.execute('SELECT ultimo_indice FROM sequence_campaigns WHERE id = ?', (campanha_id,))
+        row = cursor.fetchone()
+        inicio = (row['ultimo_indice'] or 0) if row else 0
+
         socketio.emit('sequence_status', {
             'status': 'started',
-            'message': f'Iniciando envio de sequência para {len(empresa_ids)} contatos...'
+            'message': f'Iniciando envio de sequência para {len(empresa_ids) - inicio} contatos...',
+            'job_id': job['id']
         })
 
         total = len(empresa_ids)
@@ -2468,7 +2588,25 @@ def handle_send_sequence(data):
 
         import json
 
-        for i, empresa_id in enumerate(empresa_ids, 1):
+        # Logs e progresso gravados em lote; o checkpoint de cada empresa é imediato
+        log_writer = CampaignLogWriter(db, campanha_id, kind='sequence')
+
+        for i, empresa_id in enumerate(empresa_ids[inicio:], inicio + 1):
+            if should_stop():
+                log_writer.close()
+                cursor = db.cursor
+                cursor.execute('''
+                    UPDATE sequence_campaigns SET status = 'pausada', data_atualizacao = CURRENT_TIMESTAMP
+                    WHERE id = ?
+                ''', (campanha_id,))
+                db.conn.commit()
+                socketio.emit('sequence_status', {
+                    'status': 'paused',
+                    'message': f'Sequência pausada em {i - 1}/{total}.',
+                    'campanha_id': campanha_id
+                })
+                return 'pausado'
+
             try:
                 # Buscar empresa
                 empresa = db.get_empresa_by_id(empresa_id)
@@ -2605,25 +2743,23 @@ def handle_send_sequence(data):
 
                 # Registrar log da sequência
                 status = 'sucesso' if sequence_success else 'erro'
-                cursor = db.cursor
-                cursor.execute('''
-                    INSERT INTO sequence_logs (campanha_id, empresa_id, empresa_nome, telefone, sequence_data, status)
-                    VALUES (?, ?, ?, ?, ?, ?)
-                ''', (campanha_id, empresa_id, empresa['nome'], telefone_normalizado, json.dumps(sequence), status))
-                db.conn.commit()
+                log_writer.log(
+                    enviados=1 if sequence_success else 0,
+                    falhas=0 if sequence_success else 1,
+                    empresa_id=empresa_id,
+                    empresa_nome=empresa['nome'],
+                    telefone=telefone_normalizado,
+                    sequence_data=json.dumps(sequence),
+                    status=status
+                )
 
                 if sequence_success:
                     success_count += 1
                 else:
                     failed_count += 1
 
-                # Atualizar progresso
-                cursor.execute('''
-                    UPDATE sequence_campaigns
-                    SET total_enviados = ?, total_falhas = ?, ultimo_indice = ?, data_atualizacao = CURRENT_TIMESTAMP
-                    WHERE id = ?
-                ''', (success_count, failed_count, i, campanha_id))
-                db.conn.commit()
+                # Checkpoint da campanha gravado antes da próxima empresa
+                log_writer.checkpoint(i)
 
                 # Emitir progresso
                 socketio.emit('sequence_progress', {
@@ -2644,6 +2780,8 @@ def handle_send_sequence(data):
                 failed_count += 1
                 logger.error(f'Erro ao enviar sequência para {empresa_id}: {e}')
 
+        log_writer.close()
+
         # Finalizar campanha
         cursor = db.cursor
         cursor.execute('''
@@ -2666,9 +2804,62 @@ def handle_send_sequence(data):
         import traceback
         traceback.print_exc()
         socketio.emit('sequence_error', {'message': str(e)})
+        return 'erro'
+
+
+# ==================== FILA DE CAMPANHAS ====================
+
+# Um worker por canal de envio: campanhas do mesmo canal rodam em sequência,
+# canais diferentes (sessões Selenium x serviço PTT) rodam em paralelo
+campaign_workers = [
+    CampaignWorker(db, {'whatsapp': run_whatsapp_job, 'sequence': run_sequence_job},
+                   name='selenium', sleep=socketio.sleep),
+    CampaignWorker(db, {'audio': run_audio_job}, name='ptt', sleep=socketio.sleep),
+]
+
+
+@app.route('/api/campaign-jobs', methods=['GET'])
+def get_campaign_jobs():
+    """Listar jobs da fila de campanhas e o estado dos workers"""
+    try:
+        status = request.args.get('status')
+        limit = request.args.get('limit', 100, type=int)
+        return jsonify({
+            'jobs': db.get_jobs(status, limit),
+            'workers': [worker.get_info() for worker in campaign_workers]
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/campaign-jobs/<int:job_id>/cancel', methods=['POST'])
+def cancel_campaign_job(job_id):
+    """Cancelar job pendente ou interromper job em execução"""
+    try:
+        if not db.cancel_job(job_id):
+            return jsonify({'success': False, 'message': 'Job não encontrado ou já finalizado'}), 404
+
+        for worker in campaign_workers:
+            worker.stop(job_id=job_id)
+
+        return jsonify({'success': True, 'message': f'Job {job_id} cancelado'})
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+
+def start_campaign_workers():
+    """Iniciar os workers da fila (retomam jobs interrompidos por uma queda)"""
+    for worker in campaign_workers:
+        worker.start()
 
 
 if __name__ == '__main__':
+    debug = True
+
+    # Com o reloader do modo debug, apenas o processo filho executa a fila
+    if not debug or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_campaign_workers()
+
     print('\n🚀 Servidor web iniciado!')
     print('📍 Acesse: http://localhost:5000\n')
-    socketio.run(app, host='0.0.0.0', port=5000, debug=True)
+    socketio.run(app, host='0.0.0.0', port=5000, debug=debug)
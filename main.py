@@ -30,7 +30,8 @@ def show_menu():
     print('1. 🔍 Buscar empresas')
     print('2. 📊 Ver estatísticas')
     print('3. 📋 Listar empresas salvas')
-    print('4. 🚪 Sair\n')
+    print('4. 📶 Medir economia do bloqueio de requisições')
+    print('5. 🚪 Sair\n')
 
     choice = input('Escolha uma opção: ').strip()
     return choice
@@ -65,6 +66,49 @@ def buscar_empresas(db):
         logger.error(f'Erro na busca: {str(e)}')
 
 
+def medir_economia_bloqueio():
+    """Comparar bytes e tempo de carga por empresa sem e com bloqueio de requisições"""
+    print('\n═══════════════════════════════════════════════')
+    print('      ECONOMIA DO BLOQUEIO DE REQUISIÇÕES')
+    print('═══════════════════════════════════════════════\n')
+
+    setor = input('Digite o setor (ex: lanchonetes, pizzarias, academias): ').strip()
+    cidade = input('Digite a cidade (ex: São Paulo, Rio de Janeiro): ').strip()
+    amostra_input = input('Quantidade de empresas na amostra (padrão: 5): ').strip()
+
+    amostra = int(amostra_input) if amostra_input else 5
+    headless = os.getenv('HEADLESS', 'True').lower() == 'true'
+
+    print('\n⏳ Carregando a amostra sem e com bloqueio...\n')
+
+    try:
+        with GoogleMapsScraper(headless=headless) as scraper:
+            urls = scraper.collect_business_urls(setor, cidade, amostra)[:amostra]
+            if not urls:
+                print('📭 Nenhuma empresa encontrada para a amostra.\n')
+                return
+
+            results = scraper.benchmark_request_blocking(urls)
+            if not results:
+                return
+
+        print(f"\n📊 Médias por empresa ({len(urls)} empresas):")
+        for mode in ('sem_bloqueio', 'com_bloqueio'):
+            data = results[mode]
+            print(f"   {mode}: {data['bytes'] / 1024:.0f} KB, {data['requests']:.0f} requisições "
+                  f"({data['blocked']:.0f} bloqueadas), carga em {data['load_seconds']:.2f}s")
+        economia = results['economia']
+        print(f"   💰 Economia: {economia['bytes'] / 1024:.0f} KB ({economia['bytes_pct']}%) "
+              f"e {economia['load_seconds']:.2f}s ({economia['load_pct']}%) por empresa\n")
+
+        logger.info(f"Economia do bloqueio ({setor} em {cidade}, {len(urls)} empresas): "
+                    f"{economia['bytes']} bytes e {economia['load_seconds']}s por empresa")
+
+    except Exception as e:
+        print(f'❌ Erro durante a medição: {str(e)}')
+        logger.error(f'Erro na medição do bloqueio: {str(e)}')
+
+
 def ver_estatisticas(db):
     """Exibir estatísticas das empresas"""
     print('\n═══════════════════════════════════════════════')
@@ -195,6 +239,8 @@ def main():
             elif choice == '3':
                 listar_empresas(db)
             elif choice == '4':
+                medir_economia_bloqueio()
+            elif choice == '5':
                 running = False
                 print('\n👋 Até logo!\n')
                 logger.info('Bot encerrado')
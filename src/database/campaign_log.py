@@ -0,0 +1,147 @@
+import time
+from datetime import datetime, timezone
+
+
+# Tabelas de cada tipo de campanha: (campanhas, logs, colunas de log além de campanha_id)
+CAMPAIGN_LOG_TABLES = {
+    'whatsapp': ('whatsapp_campaigns', 'whatsapp_logs',
+                 ['empresa_id', 'empresa_nome', 'telefone', 'mensagem', 'status', 'erro']),
+    'audio': ('audio_campaigns', 'audio_logs',
+              ['empresa_id', 'empresa_nome', 'telefone', 'audio_path', 'status', 'erro']),
+    'sequence': ('sequence_campaigns', 'sequence_logs',
+                 ['empresa_id', 'empresa_nome', 'telefone', 'sequence_data', 'status', 'erro']),
+}
+
+DEFAULT_FLUSH_EVERY = 50  # Linhas de log acumuladas antes de gravar
+DEFAULT_FLUSH_INTERVAL = 2.0  # Segundos máximos entre gravações
+
+
+class CampaignLogWriter:
+    """
+    Grava logs e progresso de uma campanha em lotes
+
+    As linhas de log e os incrementos de enviados/falhas ficam em memória e são
+    gravados em uma única transação a cada `flush_every` linhas ou
+    `flush_interval` segundos (verificado a cada chamada), em vez de um INSERT
+    e um UPDATE com commit por mensagem.
+
+    checkpoint() é a exceção: grava na hora o ultimo_indice junto com tudo que
+    estiver pendente, garantindo que o ponto de retomada esteja no disco antes
+    da próxima mensagem sair.
+
+    Exemplo:
+        with CampaignLogWriter(db, campanha_id) as log_writer:
+            for i, empresa in enumerate(empresas, 1):
+                ...
+                log_writer.log(enviados=1, empresa_id=empresa['id'], status='sucesso', ...)
+                log_writer.checkpoint(i)
+    """
+
+    def __init__(self, db, campanha_id, kind='whatsapp',
+                 flush_every=DEFAULT_FLUSH_EVERY, flush_interval=DEFAULT_FLUSH_INTERVAL):
+        """
+        Args:
+            db (Database): Banco de dados
+            campanha_id (int): ID da campanha
+            kind (str): 'whatsapp', 'audio' ou 'sequence'
+            flush_every (int): Linhas pendentes que disparam a gravação
+            flush_interval (float): Tempo máximo (s) que uma linha fica pendente
+        """
+        if kind not in CAMPAIGN_LOG_TABLES:
+            raise ValueError(f'Tipo de campanha inválido: {kind}')
+
+        self.db = db
+        self.campanha_id = campanha_id
+        self.campaigns_table, self.logs_table, self.log_columns = CAMPAIGN_LOG_TABLES[kind]
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+
+        self._rows = []
+        self._enviados = 0
+        self._falhas = 0
+        self._ultimo_indice = None
+        self._pending_since = None
+
+    def log(self, enviados=0, falhas=0, **row):
+        """
+        Enfileirar uma linha de log (e os incrementos de progresso correspondentes)
+
+        A data de envio é registrada no momento da chamada, não da gravação.
+        """
+        values = [self.campanha_id] + [row.get(col) for col in self.log_columns]
+        values.append(datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S'))
+        self._rows.append(values)
+        self.progress(enviados, falhas)
+
+    def progress(self, enviados=0, falhas=0):
+        """Enfileirar incrementos de enviados/falhas sem linha de log"""
+        self._enviados += enviados
+        self._falhas += falhas
+
+        if self._pending_since is None:
+            self._pending_since = time.monotonic()
+
+        if (len(self._rows) >= self.flush_every or
+                time.monotonic() - self._pending_since >= self.flush_interval):
+            self.flush()
+
+    def checkpoint(self, ultimo_indice):
+        """Gravar imediatamente o ponto de retomada junto com o que estiver pendente"""
+        self._ultimo_indice = ultimo_indice
+        self.flush()
+
+    def flush(self):
+        """Gravar linhas e progresso pendentes em uma única transação"""
+        if not self._rows and not self._enviados and not self._falhas and self._ultimo_indice is None:
+            return
+
+        conn = self.db.conn
+        cursor = conn.cursor()
+
+        try:
+            if self._rows:
+                columns = ', '.join(['campanha_id'] + self.log_columns + ['data_envio'])
+                placeholders = ', '.join(['?'] * (len(self.log_columns) + 2))
+                cursor.executemany(
+                    f'INSERT INTO {self.logs_table} ({columns}) VALUES ({placeholders})',
+                    self._rows
+                )
+
+            if self._ultimo_indice is not None:
+                cursor.execute(f'''
+                    UPDATE {self.campaigns_table} SET
+                        total_enviados = total_enviados + ?,
+                        total_falhas = total_falhas + ?,
+                        ultimo_indice = ?,
+                        data_atualizacao = CURRENT_TIMESTAMP
+                    WHERE id = ?
+                ''', (self._enviados, self._falhas, self._ultimo_indice, self.campanha_id))
+            else:
+                cursor.execute(f'''
+                    UPDATE {self.campaigns_table} SET
+                        total_enviados = total_enviados + ?,
+                        total_falhas = total_falhas + ?,
+                        data_atualizacao = CURRENT_TIMESTAMP
+                    WHERE id = ?
+                ''', (self._enviados, self._falhas, self.campanha_id))
+
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+        self._rows = []
+        self._enviados = 0
+        self._falhas = 0
+        self._ultimo_indice = None
+        self._pending_since = None
+
+    def close(self):
+        """Gravar o que estiver pendente"""
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
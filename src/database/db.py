@@ -1,10 +1,96 @@
 import sqlite3
 import os
+import re
+import json
 from datetime import datetime
 from pathlib import Path
 import threading
 
 
+# Campos de contato contados nas estatísticas (coluna em empresas -> contador)
+STATS_CONTACT_FIELDS = [
+    'email', 'telefone', 'whatsapp', 'website',
+    'instagram', 'facebook', 'linkedin', 'twitter'
+]
+
+
+# Colunas de empresas indexadas na busca de texto completo (empresas_fts)
+FTS_COLUMNS = ['nome', 'endereco', 'setor', 'cidade']
+
+
+# Validade padrão da verificação de existência de um número no WhatsApp
+NUMBER_CHECK_TTL_DAYS = 30
+
+
+# Colunas gravadas pelo upsert de empresas (whatsapp_norm é derivada de whatsapp)
+UPSERT_COLUMNS = [
+    'nome', 'setor', 'cidade', 'endereco', 'telefone', 'whatsapp', 'whatsapp_norm',
+    'email', 'website', 'instagram', 'facebook', 'linkedin', 'twitter',
+    'google_maps_url', 'rating', 'total_reviews',
+    'horario_funcionamento', 'latitude', 'longitude'
+]
+
+# Campos de contato que, preenchendo um valor vazio, contam como atualização
+UPSERT_CONTACT_FIELDS = ['telefone', 'whatsapp', 'email', 'website', 'instagram', 'facebook', 'linkedin', 'twitter']
+
+
+# Empresas raspadas há menos dias que isto não são visitadas de novo pelo scraper
+PLACE_TTL_DAYS = 7
+
+# Resultados de visita em que os dados do lugar estão em empresas; os demais
+# (ex.: 'no_contact', reprovado nos filtros de contato) não contam como recentes
+PERSISTED_PLACE_RESULTS = ('saved', 'updated', 'skipped')
+
+# Identificadores de lugar nos URLs do Google Maps, do mais ao menos comum:
+# feature id (!1s0x...:0x...), place id (!19sChIJ...) e ?cid=
+PLACE_ID_PATTERNS = [
+    re.compile(r'!1s(0x[0-9a-f]+:0x[0-9a-f]+)', re.IGNORECASE),
+    re.compile(r'!19s(ChIJ[\w-]+)'),
+    re.compile(r'[?&]cid=(\d+)'),
+]
+
+
+# Limite conservador de parâmetros por statement (SQLITE_MAX_VARIABLE_NUMBER antigo = 999)
+SQLITE_CHUNK_SIZE = 500
+
+
+def chunked(items, size=SQLITE_CHUNK_SIZE):
+    """Dividir uma lista em blocos para binding de parâmetros"""
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def fts_prefix_query(text):
+    """
+    Converter texto livre em expressão MATCH do FTS5 (todos os termos, por prefixo)
+
+    Cada termo vira uma string entre aspas seguida de *, então caracteres
+    especiais da sintaxe do FTS5 digitados pelo usuário não causam erro.
+
+    Returns:
+        str | None: Expressão MATCH ou None se não houver termos
+    """
+    terms = ['"' + term.replace('"', '""') + '"*' for term in (text or '').split()]
+    return ' '.join(terms) or None
+
+
+def normalize_phone(phone):
+    """Manter apenas os dígitos do telefone (forma canônica usada nas buscas)"""
+    if not phone:
+        return None
+    digits = ''.join(filter(str.isdigit, str(phone)))
+    return digits or None
+
+
+def parse_place_id(url):
+    """Identificador canônico do lugar em um URL do Google Maps (ou None)"""
+    for pattern in PLACE_ID_PATTERNS:
+        match = pattern.search(url or '')
+        if match:
+            return match.group(1).lower() if match.group(1).startswith('0x') else match.group(1)
+    return None
+
+
 class Database:
     def __init__(self, db_path='./database/empresas.db'):
         # Criar diretório se não existir
@@ -45,6 +131,7 @@ class Database:
                 endereco TEXT,
                 telefone TEXT,
                 whatsapp TEXT,
+                whatsapp_norm TEXT,
                 email TEXT,
                 website TEXT,
                 instagram TEXT,
@@ -80,6 +167,20 @@ class Database:
             )
         ''')
 
+        # Progresso por URL de empresa de cada busca (ScraperPool)
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS search_checkpoint_urls (
+                setor TEXT NOT NULL,
+                cidade TEXT NOT NULL,
+                url TEXT NOT NULL,
+                posicao INTEGER DEFAULT 0,
+                status TEXT DEFAULT 'pendente',
+                resultado TEXT,
+                data_atualizacao TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (setor, cidade, url)
+            )
+        ''')
+
         # Tabela de templates de mensagens
         self.cursor.execute('''
             CREATE TABLE IF NOT EXISTS message_templates (
@@ -150,6 +251,15 @@ class Database:
             ON whatsapp_blocked(telefone)
         ''')
 
+        # Cache da verificação de existência dos números no WhatsApp (com validade)
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS whatsapp_number_checks (
+                telefone TEXT PRIMARY KEY,
+                existe INTEGER NOT NULL,
+                data_verificacao TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+
         # Tabela de campanhas de áudio PTT
         self.cursor.execute('''
             CREATE TABLE IF NOT EXISTS audio_campaigns (
@@ -222,12 +332,59 @@ class Database:
             )
         ''')
 
+        # Fila persistente de campanhas (processada pelos CampaignWorker)
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS campaign_jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                kind TEXT NOT NULL,
+                campanha_id INTEGER,
+                payload TEXT NOT NULL,
+                status TEXT DEFAULT 'pendente',
+                prioridade INTEGER DEFAULT 0,
+                worker_id TEXT,
+                heartbeat TIMESTAMP,
+                tentativas INTEGER DEFAULT 0,
+                erro TEXT,
+                data_disponivel TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                data_criacao TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                data_inicio TIMESTAMP,
+                data_fim TIMESTAMP
+            )
+        ''')
+        self.cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_campaign_jobs_status
+            ON campaign_jobs(status, kind, prioridade, id)
+        ''')
+
         # Criar índices para otimizar buscas
         self.cursor.execute('CREATE INDEX IF NOT EXISTS idx_setor ON empresas(setor)')
         self.cursor.execute('CREATE INDEX IF NOT EXISTS idx_cidade ON empresas(cidade)')
         self.cursor.execute('CREATE INDEX IF NOT EXISTS idx_email ON empresas(email)')
         self.cursor.execute('CREATE INDEX IF NOT EXISTS idx_nome ON empresas(nome)')
         self.cursor.execute('CREATE INDEX IF NOT EXISTS idx_nome_endereco ON empresas(nome, endereco)')
+        self.cursor.execute('CREATE INDEX IF NOT EXISTS idx_data_criacao ON empresas(data_criacao, id)')
+
+        # Contadores materializados por setor/cidade (mantidos por triggers)
+        self._create_stats_table()
+
+        # Índice de texto completo para a busca por nome/endereço/setor/cidade
+        self.has_fts = self._create_fts_table()
+
+        # Telefone normalizado (apenas dígitos) para JOINs indexados com whatsapp_blocked
+        self._migrate_whatsapp_norm()
+        self.cursor.execute('CREATE INDEX IF NOT EXISTS idx_whatsapp_norm ON empresas(whatsapp_norm)')
+
+        # Lugares já visitados pelo scraper (por place id), para não recarregar empresas recentes
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS places_index (
+                place_id TEXT PRIMARY KEY,
+                google_maps_url TEXT,
+                nome TEXT,
+                resultado TEXT,
+                last_scraped_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        self._migrate_places_index()
 
         # Otimizações de performance do SQLite
         self.cursor.execute('PRAGMA journal_mode=WAL')  # Write-Ahead Logging para melhor concorrência
@@ -237,16 +394,223 @@ class Database:
 
         self.conn.commit()
 
+    def _create_stats_table(self):
+        """Criar tabela empresas_stats e os triggers que a mantêm atualizada"""
+        cursor = self.cursor
+        counters = ',\n'.join(f'                com_{field} INTEGER DEFAULT 0' for field in STATS_CONTACT_FIELDS)
+
+        cursor.execute(f'''
+            CREATE TABLE IF NOT EXISTS empresas_stats (
+                setor TEXT NOT NULL,
+                cidade TEXT NOT NULL,
+                total INTEGER DEFAULT 0,
+{counters},
+                PRIMARY KEY (setor, cidade)
+            )
+        ''')
+
+        def delta(row, sign):
+            return ',\n'.join(
+                f"                    com_{field} = com_{field} {sign} (COALESCE({row}.{field}, '') != '')"
+                for field in STATS_CONTACT_FIELDS
+            )
+
+        # Dentro de um trigger, INSERT OR IGNORE herda a resolução de conflito do
+        # comando externo e falha sob INSERT ... ON CONFLICT (upsert_empresas);
+        # ON CONFLICT DO NOTHING não. Bancos antigos têm a versão anterior.
+        cursor.execute('DROP TRIGGER IF EXISTS trg_empresas_stats_insert')
+        cursor.execute('DROP TRIGGER IF EXISTS trg_empresas_stats_update')
+
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_empresas_stats_insert
+            AFTER INSERT ON empresas
+            BEGIN
+                INSERT INTO empresas_stats (setor, cidade) VALUES (NEW.setor, NEW.cidade) ON CONFLICT DO NOTHING;
+                UPDATE empresas_stats SET
+                    total = total + 1,
+{delta('NEW', '+')}
+                WHERE setor = NEW.setor AND cidade = NEW.cidade;
+            END
+        ''')
+
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_empresas_stats_delete
+            AFTER DELETE ON empresas
+            BEGIN
+                UPDATE empresas_stats SET
+                    total = total - 1,
+{delta('OLD', '-')}
+                WHERE setor = OLD.setor AND cidade = OLD.cidade;
+            END
+        ''')
+
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_empresas_stats_update
+            AFTER UPDATE OF setor, cidade, {', '.join(STATS_CONTACT_FIELDS)} ON empresas
+            BEGIN
+                UPDATE empresas_stats SET
+                    total = total - 1,
+{delta('OLD', '-')}
+                WHERE setor = OLD.setor AND cidade = OLD.cidade;
+                INSERT INTO empresas_stats (setor, cidade) VALUES (NEW.setor, NEW.cidade) ON CONFLICT DO NOTHING;
+                UPDATE empresas_stats SET
+                    total = total + 1,
+{delta('NEW', '+')}
+                WHERE setor = NEW.setor AND cidade = NEW.cidade;
+            END
+        ''')
+
+        # Banco antigo (tabela recém-criada): preencher os contadores uma vez
+        cursor.execute('SELECT EXISTS(SELECT 1 FROM empresas_stats) AS has_stats, EXISTS(SELECT 1 FROM empresas) AS has_empresas')
+        row = cursor.fetchone()
+        if row['has_empresas'] and not row['has_stats']:
+            self.rebuild_empresas_stats()
+
+    def _create_fts_table(self):
+        """
+        Criar tabela FTS5 empresas_fts (conteúdo externo em empresas) e seus triggers
+
+        Returns:
+            bool: False se o SQLite não tiver FTS5 (a busca volta a usar LIKE)
+        """
+        cursor = self.cursor
+        columns = ', '.join(FTS_COLUMNS)
+        new_values = ', '.join(f'NEW.{col}' for col in FTS_COLUMNS)
+        old_values = ', '.join(f'OLD.{col}' for col in FTS_COLUMNS)
+
+        try:
+            cursor.execute(f'''
+                CREATE VIRTUAL TABLE IF NOT EXISTS empresas_fts USING fts5(
+                    {columns},
+                    content='empresas',
+                    content_rowid='id',
+                    tokenize='unicode61 remove_diacritics 2'
+                )
+            ''')
+        except sqlite3.OperationalError as e:
+            print(f"⚠️  FTS5 indisponível, busca usará LIKE: {e}")
+            return False
+
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_empresas_fts_insert
+            AFTER INSERT ON empresas
+            BEGIN
+                INSERT INTO empresas_fts (rowid, {columns}) VALUES (NEW.id, {new_values});
+            END
+        ''')
+
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_empresas_fts_delete
+            AFTER DELETE ON empresas
+            BEGIN
+                INSERT INTO empresas_fts (empresas_fts, rowid, {columns}) VALUES ('delete', OLD.id, {old_values});
+            END
+        ''')
+
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_empresas_fts_update
+            AFTER UPDATE OF {columns} ON empresas
+            BEGIN
+                INSERT INTO empresas_fts (empresas_fts, rowid, {columns}) VALUES ('delete', OLD.id, {old_values});
+                INSERT INTO empresas_fts (rowid, {columns}) VALUES (NEW.id, {new_values});
+            END
+        ''')
+
+        # Banco antigo (índice recém-criado): indexar as empresas existentes uma vez
+        cursor.execute('SELECT EXISTS(SELECT 1 FROM empresas_fts_docsize) AS has_fts, EXISTS(SELECT 1 FROM empresas) AS has_empresas')
+        row = cursor.fetchone()
+        if row['has_empresas'] and not row['has_fts']:
+            self.rebuild_empresas_fts()
+
+        return True
+
+    def rebuild_empresas_fts(self):
+        """Reconstruir o índice FTS5 a partir de empresas"""
+        self.cursor.execute("INSERT INTO empresas_fts (empresas_fts) VALUES ('rebuild')")
+        self.conn.commit()
+
+    def rebuild_empresas_stats(self):
+        """Recalcular empresas_stats a partir de empresas (uma única varredura)"""
+        cursor = self.cursor
+        counters = ', '.join(f'com_{field}' for field in STATS_CONTACT_FIELDS)
+        sums = ',\n'.join(
+            f"                SUM(CASE WHEN {field} IS NOT NULL AND {field} != '' THEN 1 ELSE 0 END)"
+            for field in STATS_CONTACT_FIELDS
+        )
+
+        cursor.execute('DELETE FROM empresas_stats')
+        cursor.execute(f'''
+            INSERT INTO empresas_stats (setor, cidade, total, {counters})
+            SELECT
+                setor,
+                cidade,
+                COUNT(*),
+{sums}
+            FROM empresas
+            GROUP BY setor, cidade
+        ''')
+        self.conn.commit()
+
+    def _migrate_whatsapp_norm(self):
+        """Adicionar e preencher a coluna whatsapp_norm em bancos antigos"""
+        cursor = self.cursor
+        cursor.execute('PRAGMA table_info(empresas)')
+        columns = [row[1] for row in cursor.fetchall()]
+
+        if 'whatsapp_norm' not in columns:
+            cursor.execute('ALTER TABLE empresas ADD COLUMN whatsapp_norm TEXT')
+
+        # Backfill: normalizar em Python para usar a mesma regra do insert/update
+        cursor.execute('''
+            SELECT id, whatsapp FROM empresas
+            WHERE whatsapp IS NOT NULL AND whatsapp != '' AND whatsapp_norm IS NULL
+        ''')
+        pendentes = [(normalize_phone(row['whatsapp']), row['id']) for row in cursor.fetchall()]
+
+        if pendentes:
+            cursor.executemany('UPDATE empresas SET whatsapp_norm = ? WHERE id = ?', pendentes)
+            print(f"🔄 whatsapp_norm preenchido para {len(pendentes)} empresas")
+
+        self.conn.commit()
+
+    def _migrate_places_index(self):
+        """Preencher places_index a partir dos google_maps_url já salvos (uma vez)"""
+        cursor = self.cursor
+        cursor.execute('SELECT 1 FROM places_index LIMIT 1')
+        if cursor.fetchone():
+            return
+
+        cursor.execute('''
+            SELECT google_maps_url, nome, COALESCE(data_atualizacao, data_criacao) AS scraped_at
+            FROM empresas WHERE google_maps_url IS NOT NULL AND google_maps_url != ''
+        ''')
+        rows = [
+            (place_id, row['google_maps_url'], row['nome'], row['scraped_at'])
+            for row in cursor.fetchall()
+            for place_id in [parse_place_id(row['google_maps_url'])]
+            if place_id
+        ]
+
+        if rows:
+            cursor.executemany('''
+                INSERT OR IGNORE INTO places_index (place_id, google_maps_url, nome, resultado, last_scraped_at)
+                VALUES (?, ?, ?, 'saved', ?)
+            ''', rows)
+            print(f"🔄 places_index preenchido com {len(rows)} lugares")
+
+        self.conn.commit()
+
     def insert_empresa(self, empresa_data):
         """Inserir empresa no banco de dados"""
         try:
-            self.cursor.execute('''
+            cursor = self._get_cursor()
+            cursor.execute('''
                 INSERT OR IGNORE INTO empresas (
-                    nome, setor, cidade, endereco, telefone, whatsapp,
+                    nome, setor, cidade, endereco, telefone, whatsapp, whatsapp_norm,
                     email, website, instagram, facebook, linkedin, twitter,
                     google_maps_url, rating, total_reviews,
                     horario_funcionamento, latitude, longitude
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
             ''', (
                 empresa_data.get('nome'),
                 empresa_data.get('setor'),
@@ -254,6 +618,7 @@ class Database:
                 empresa_data.get('endereco'),
                 empresa_data.get('telefone'),
                 empresa_data.get('whatsapp'),
+                normalize_phone(empresa_data.get('whatsapp')),
                 empresa_data.get('email'),
                 empresa_data.get('website'),
                 empresa_data.get('instagram'),
@@ -268,7 +633,7 @@ class Database:
                 empresa_data.get('longitude')
             ))
             self.conn.commit()
-            return self.cursor.lastrowid
+            return cursor.lastrowid if cursor.rowcount else None
         except sqlite3.IntegrityError:
             # Empresa já existe
             return None
@@ -276,12 +641,170 @@ class Database:
             print(f"❌ Erro ao inserir empresa: {e}")
             return None
 
+    def _find_empresas_by_key(self, cursor, keys):
+        """
+        Localizar empresas por (nome, endereco) como o upsert: nome + endereço,
+        ou a primeira empresa com o nome quando não há endereço
+
+        Returns:
+            dict: {(nome, endereco): {'id': ..., <campos de contato>}}
+        """
+        columns = ', '.join(['id', 'nome', 'endereco'] + UPSERT_CONTACT_FIELDS)
+        com_endereco = [key for key in keys if key[1]]
+        sem_endereco = [key[0] for key in keys if not key[1]]
+        found = {}
+
+        for chunk in chunked(com_endereco, SQLITE_CHUNK_SIZE // 2):
+            pairs = ','.join(['(?, ?)'] * len(chunk))
+            cursor.execute(
+                f'SELECT {columns} FROM empresas WHERE (nome, endereco) IN (VALUES {pairs})',
+                [value for key in chunk for value in key]
+            )
+            found.update({(row['nome'], row['endereco']): dict(row) for row in cursor.fetchall()})
+
+        for chunk in chunked(sem_endereco):
+            placeholders = ','.join(['?' for _ in chunk])
+            cursor.execute(f'''
+                SELECT {columns} FROM empresas WHERE id IN (
+                    SELECT MIN(id) FROM empresas WHERE nome IN ({placeholders}) GROUP BY nome
+                )
+            ''', chunk)
+            found.update({(row['nome'], None): dict(row) for row in cursor.fetchall()})
+
+        return found
+
+    def upsert_empresas(self, batch):
+        """
+        Inserir ou completar empresas em lote (uma transação)
+
+        Empresas novas são inseridas; existentes (mesmo nome + endereço, ou
+        mesmo nome quando não há endereço) só têm preenchidos os campos vazios,
+        exceto rating/total de avaliações, que recebem o valor mais recente.
+
+        Args:
+            batch (list): Dicts de empresas (formato do scraper)
+
+        Returns:
+            dict: {'saved': n, 'updated': n, 'skipped': n, 'results': [...]}, com
+                  'results' na ordem do lote: {'status': ..., 'id': ...} por empresa
+        """
+        counts = {'saved': 0, 'updated': 0, 'skipped': 0}
+
+        # Uma linha por empresa do lote (repetidas são combinadas, primeiro valor não vazio vence)
+        keys = []
+        rows = {}
+        for empresa in batch:
+            if not empresa.get('nome'):
+                keys.append(None)
+                continue
+            row = {column: empresa.get(column) for column in UPSERT_COLUMNS}
+            row['setor'] = row['setor'] or ''
+            row['cidade'] = row['cidade'] or ''
+            row['endereco'] = row['endereco'] or None
+            row['whatsapp_norm'] = normalize_phone(row['whatsapp'])
+
+            key = (row['nome'], row['endereco'])
+            keys.append(key)
+            if key in rows:
+                rows[key] = {column: rows[key][column] or row[column] for column in UPSERT_COLUMNS}
+            else:
+                rows[key] = row
+
+        # Preencher só o que está vazio; "mudou" = algum contato vazio recebeu valor
+        fill = ',\n'.join(
+            f"{column} = COALESCE(NULLIF(empresas.{column}, ''), excluded.{column})"
+            for column in UPSERT_COLUMNS if column not in ('nome', 'endereco', 'setor', 'cidade', 'rating', 'total_reviews')
+        )
+        changed = ' OR '.join(
+            f"((empresas.{column} IS NULL OR empresas.{column} = '') AND excluded.{column} IS NOT NULL AND excluded.{column} != '')"
+            for column in UPSERT_CONTACT_FIELDS
+        )
+        values = lambda row: [row[column] for column in UPSERT_COLUMNS]
+
+        statuses = {}
+        ids = {}
+        cursor = self._get_cursor()
+        try:
+            if rows:
+                existing = self._find_empresas_by_key(cursor, list(rows))
+                for key, row in rows.items():
+                    if key not in existing:
+                        statuses[key] = 'saved'
+                    elif any(row[column] and not existing[key][column] for column in UPSERT_CONTACT_FIELDS):
+                        statuses[key] = 'updated'
+                    else:
+                        statuses[key] = 'skipped'
+                    if key in existing:
+                        ids[key] = existing[key]['id']
+
+                # Empresas sem nada novo não são reescritas
+                changed_rows = [(key, row) for key, row in rows.items() if statuses[key] != 'skipped']
+
+                # Com endereço: INSERT ... ON CONFLICT(nome, endereco)
+                com_endereco = [row for key, row in changed_rows if key[1]]
+                if com_endereco:
+                    cursor.executemany(f'''
+                        INSERT INTO empresas ({', '.join(UPSERT_COLUMNS)})
+                        VALUES ({', '.join('?' * len(UPSERT_COLUMNS))})
+                        ON CONFLICT(nome, endereco) DO UPDATE SET
+                            {fill},
+                            rating = COALESCE(excluded.rating, rating),
+                            total_reviews = COALESCE(excluded.total_reviews, total_reviews),
+                            data_atualizacao = CURRENT_TIMESTAMP
+                        WHERE {changed}
+                    ''', [values(row) for row in com_endereco])
+
+                # Sem endereço: NULL não conflita no UNIQUE, então a empresa é localizada pelo nome
+                novas = [row for key, row in changed_rows if not key[1] and key not in ids]
+                if novas:
+                    cursor.executemany(f'''
+                        INSERT INTO empresas ({', '.join(UPSERT_COLUMNS)})
+                        VALUES ({', '.join('?' * len(UPSERT_COLUMNS))})
+                    ''', [values(row) for row in novas])
+
+                atualizar = [(key, row) for key, row in changed_rows if not key[1] and key in ids]
+                if atualizar:
+                    # Mesmo SET/WHERE do upsert, com excluded.* vindo de uma subconsulta
+                    cursor.executemany(f'''
+                        UPDATE empresas SET
+                            {fill.replace('excluded.', 'novo.')},
+                            rating = COALESCE(novo.rating, empresas.rating),
+                            total_reviews = COALESCE(novo.total_reviews, empresas.total_reviews),
+                            data_atualizacao = CURRENT_TIMESTAMP
+                        FROM (SELECT {', '.join(f'? AS {column}' for column in UPSERT_COLUMNS)}) AS novo
+                        WHERE empresas.id = ? AND ({changed.replace('excluded.', 'novo.')})
+                    ''', [values(row) + [ids[key]] for key, row in atualizar])
+
+                # IDs das empresas inseridas
+                inseridas = [key for key in rows if statuses[key] == 'saved']
+                if inseridas:
+                    ids.update({key: row['id'] for key, row in self._find_empresas_by_key(cursor, inseridas).items()})
+
+                self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+
+        # Resultado por empresa do lote: repetidas e sem nome contam como ignoradas
+        results = []
+        seen = set()
+        for key in keys:
+            if key is None or key in seen:
+                results.append({'status': 'skipped', 'id': ids.get(key)})
+            else:
+                seen.add(key)
+                results.append({'status': statuses[key], 'id': ids.get(key)})
+            counts[results[-1]['status']] += 1
+
+        return {**counts, 'results': results}
+
     def update_empresa(self, empresa_id, empresa_data):
         """Atualizar dados de uma empresa"""
         self.cursor.execute('''
             UPDATE empresas SET
                 telefone = ?,
                 whatsapp = ?,
+                whatsapp_norm = ?,
                 email = ?,
                 website = ?,
                 instagram = ?,
@@ -296,6 +819,7 @@ class Database:
         ''', (
             empresa_data.get('telefone'),
             empresa_data.get('whatsapp'),
+            normalize_phone(empresa_data.get('whatsapp')),
             empresa_data.get('email'),
             empresa_data.get('website'),
             empresa_data.get('instagram'),
@@ -309,6 +833,35 @@ class Database:
         ))
         self.conn.commit()
 
+    def update_empresa_email(self, empresa_id, email):
+        """
+        Preencher o email de uma empresa (apenas se ainda estiver vazio)
+
+        Returns:
+            bool: True se a empresa foi atualizada
+        """
+        cursor = self._get_cursor()
+        cursor.execute('''
+            UPDATE empresas SET
+                email = ?,
+                data_atualizacao = CURRENT_TIMESTAMP
+            WHERE id = ? AND (email IS NULL OR email = '')
+        ''', (email, empresa_id))
+        self.conn.commit()
+        return cursor.rowcount > 0
+
+    def get_empresas_sem_email(self, limit=500):
+        """Empresas com website e sem email (para o enriquecimento de emails)"""
+        cursor = self._get_cursor()
+        cursor.execute('''
+            SELECT id, nome, endereco, website FROM empresas
+            WHERE website IS NOT NULL AND website != ''
+              AND (email IS NULL OR email = '')
+            ORDER BY id DESC
+            LIMIT ?
+        ''', (limit,))
+        return [dict(row) for row in cursor.fetchall()]
+
     def get_empresas_by_setor(self, setor):
         """Buscar empresas por setor"""
         self.cursor.execute(
@@ -346,19 +899,59 @@ class Database:
         return dict(row) if row else None
 
     def get_stats(self):
-        """Obter estatísticas das empresas"""
-        self.cursor.execute('''
+        """Obter estatísticas das empresas por setor e cidade (contadores materializados)"""
+        cursor = self._get_cursor()  # Usar cursor thread-safe
+        cursor.execute('''
             SELECT
                 setor,
                 cidade,
-                COUNT(*) as total,
-                COUNT(CASE WHEN email IS NOT NULL AND email != '' THEN 1 END) as com_email,
-                COUNT(CASE WHEN telefone IS NOT NULL AND telefone != '' THEN 1 END) as com_telefone,
-                COUNT(CASE WHEN whatsapp IS NOT NULL AND whatsapp != '' THEN 1 END) as com_whatsapp
-            FROM empresas
-            GROUP BY setor, cidade
+                total,
+                com_email,
+                com_telefone,
+                com_whatsapp
+            FROM empresas_stats
+            WHERE total > 0
+            ORDER BY setor, cidade
         ''')
-        return [dict(row) for row in self.cursor.fetchall()]
+        return [dict(row) for row in cursor.fetchall()]
+
+    def get_totals(self, fresh=False):
+        """
+        Obter totais gerais de empresas e de cada campo de contato
+
+        Args:
+            fresh (bool): Se True, recalcula em uma única varredura de empresas
+                em vez de somar os contadores materializados
+
+        Returns:
+            dict: total e com_<campo> para cada campo de contato
+        """
+        if fresh:
+            sums = ',\n'.join(
+                f"                COALESCE(SUM(CASE WHEN {field} IS NOT NULL AND {field} != '' THEN 1 ELSE 0 END), 0) as com_{field}"
+                for field in STATS_CONTACT_FIELDS
+            )
+            query = f'''
+                SELECT
+                    COUNT(*) as total,
+{sums}
+                FROM empresas
+            '''
+        else:
+            sums = ',\n'.join(
+                f'                COALESCE(SUM(com_{field}), 0) as com_{field}'
+                for field in STATS_CONTACT_FIELDS
+            )
+            query = f'''
+                SELECT
+                    COALESCE(SUM(total), 0) as total,
+{sums}
+                FROM empresas_stats
+            '''
+
+        cursor = self.cursor
+        cursor.execute(query)
+        return dict(cursor.fetchone())
 
     def close(self):
         """Fechar conexão com o banco de dados"""
@@ -448,6 +1041,7 @@ class Database:
         """Resetar checkpoint para começar do zero"""
         cursor = self.cursor
         cursor.execute('DELETE FROM search_checkpoints WHERE setor = ? AND cidade = ?', (setor, cidade))
+        cursor.execute('DELETE FROM search_checkpoint_urls WHERE setor = ? AND cidade = ?', (setor, cidade))
         self.conn.commit()
 
     def get_all_checkpoints(self):
@@ -456,6 +1050,146 @@ class Database:
         cursor.execute('SELECT * FROM search_checkpoints ORDER BY data_atualizacao DESC')
         return [dict(row) for row in cursor.fetchall()]
 
+    def get_fresh_place_ids(self, place_ids, ttl_days=PLACE_TTL_DAYS):
+        """
+        Filtrar os lugares raspados dentro da validade e já gravados em empresas
+
+        Args:
+            place_ids (list): Identificadores (parse_place_id); None é ignorado
+            ttl_days (float): Validade em dias
+
+        Returns:
+            set: place_ids salvos/atualizados há menos de ttl_days
+        """
+        ids = list(dict.fromkeys(place_id for place_id in place_ids if place_id))
+        cursor = self._get_cursor()
+        fresh = set()
+        results = ','.join(['?' for _ in PERSISTED_PLACE_RESULTS])
+
+        for chunk in chunked(ids, SQLITE_CHUNK_SIZE - len(PERSISTED_PLACE_RESULTS) - 1):
+            placeholders = ','.join(['?' for _ in chunk])
+            cursor.execute(f'''
+                SELECT place_id FROM places_index
+                WHERE place_id IN ({placeholders})
+                AND resultado IN ({results})
+                AND last_scraped_at >= datetime('now', ?)
+            ''', chunk + list(PERSISTED_PLACE_RESULTS) + [f'-{ttl_days} days'])
+            fresh.update(row[0] for row in cursor.fetchall())
+
+        return fresh
+
+    def mark_place_scraped(self, url, nome=None, resultado=None):
+        """Registrar a visita a um lugar (URL sem place id é ignorado)"""
+        return self.mark_places_scraped([(url, nome, resultado)]) > 0
+
+    def mark_places_scraped(self, places):
+        """
+        Registrar a visita a vários lugares em uma única transação
+
+        Args:
+            places (list): [(url, nome, resultado), ...] (URLs sem place id são ignorados)
+
+        Returns:
+            int: Quantidade de lugares registrados
+        """
+        rows = [
+            (parse_place_id(url), url, nome, resultado)
+            for url, nome, resultado in places
+            if parse_place_id(url)
+        ]
+        if not rows:
+            return 0
+
+        cursor = self._get_cursor()
+        cursor.executemany('''
+            INSERT INTO places_index (place_id, google_maps_url, nome, resultado, last_scraped_at)
+            VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)
+            ON CONFLICT(place_id) DO UPDATE SET
+                google_maps_url = excluded.google_maps_url,
+                nome = COALESCE(excluded.nome, places_index.nome),
+                resultado = excluded.resultado,
+                last_scraped_at = excluded.last_scraped_at
+        ''', rows)
+        self.conn.commit()
+        return len(rows)
+
+    def add_checkpoint_urls(self, setor, cidade, urls):
+        """
+        Registrar os URLs de empresas encontrados em uma busca
+
+        URLs já registrados mantêm o status atual (retomada da busca).
+
+        Returns:
+            int: Quantidade de URLs novos
+        """
+        cursor = self._get_cursor()
+        cursor.execute(
+            'SELECT COALESCE(MAX(posicao), -1) FROM search_checkpoint_urls WHERE setor = ? AND cidade = ?',
+            (setor, cidade)
+        )
+        inicio = cursor.fetchone()[0] + 1
+
+        cursor.executemany('''
+            INSERT OR IGNORE INTO search_checkpoint_urls (setor, cidade, url, posicao)
+            VALUES (?, ?, ?, ?)
+        ''', [(setor, cidade, url, inicio + idx) for idx, url in enumerate(urls)])
+        novos = cursor.rowcount
+        self.conn.commit()
+        return novos
+
+    def get_checkpoint_urls(self, setor, cidade, status=None):
+        """
+        Listar URLs de uma busca na ordem em que foram encontrados
+
+        Args:
+            status (str|list): Filtrar por status ('pendente', 'processado', 'erro')
+        """
+        query = 'SELECT url FROM search_checkpoint_urls WHERE setor = ? AND cidade = ?'
+        params = [setor, cidade]
+        if status:
+            statuses = [status] if isinstance(status, str) else list(status)
+            query += f" AND status IN ({','.join('?' * len(statuses))})"
+            params.extend(statuses)
+        query += ' ORDER BY posicao'
+
+        cursor = self._get_cursor()
+        cursor.execute(query, params)
+        return [row[0] for row in cursor.fetchall()]
+
+    def mark_checkpoint_url(self, setor, cidade, url, status, resultado=None):
+        """Atualizar o status de um URL da busca (ex.: 'processado' com resultado 'saved')"""
+        self.mark_checkpoint_urls([(setor, cidade, url, status, resultado)])
+
+    def mark_checkpoint_urls(self, entries):
+        """
+        Atualizar o status de vários URLs de busca em uma única transação
+
+        Args:
+            entries (list): [(setor, cidade, url, status, resultado), ...]
+        """
+        if not entries:
+            return
+
+        cursor = self._get_cursor()
+        cursor.executemany('''
+            UPDATE search_checkpoint_urls SET
+                status = ?,
+                resultado = ?,
+                data_atualizacao = CURRENT_TIMESTAMP
+            WHERE setor = ? AND cidade = ? AND url = ?
+        ''', [(status, resultado, setor, cidade, url) for setor, cidade, url, status, resultado in entries])
+        self.conn.commit()
+
+    def get_checkpoint_url_counts(self, setor, cidade):
+        """Contagem de URLs da busca por status"""
+        cursor = self._get_cursor()
+        cursor.execute('''
+            SELECT status, COUNT(*) FROM search_checkpoint_urls
+            WHERE setor = ? AND cidade = ?
+            GROUP BY status
+        ''', (setor, cidade))
+        return {status: total for status, total in cursor.fetchall()}
+
     # ==================== MÉTODOS DE TEMPLATES ====================
 
     def create_template(self, nome, mensagem, descricao=''):
@@ -665,17 +1399,23 @@ class Database:
         result = cursor.fetchone()
         return result['count'] > 0 if result else False
 
-    def get_empresas_nao_enviadas(self, campanha_id, empresas_ids):
-        """Filtrar empresas que ainda não receberam mensagem nesta campanha"""
+    def get_empresas_nao_enviadas(self, campanha_id, empresas_ids, apenas_sucesso=True):
+        """
+        Filtrar empresas que ainda não receberam mensagem nesta campanha
+
+        Com apenas_sucesso=False, empresas com qualquer log na campanha
+        (erro, nao_existe...) também ficam de fora.
+        """
         cursor = self.cursor
         placeholders = ','.join(['?' for _ in empresas_ids])
+        status_filter = "AND status = 'sucesso'" if apenas_sucesso else ''
 
         cursor.execute(f'''
             SELECT e.* FROM empresas e
             WHERE e.id IN ({placeholders})
             AND e.id NOT IN (
                 SELECT empresa_id FROM whatsapp_logs
-                WHERE campanha_id = ? AND status = 'sucesso'
+                WHERE campanha_id = ? {status_filter}
             )
         ''', empresas_ids + [campanha_id])
 
@@ -773,3 +1513,366 @@ class Database:
         cursor.execute('SELECT COUNT(*) as count FROM whatsapp_blocked')
         result = cursor.fetchone()
         return result['count'] if result else 0
+
+    # ==================== MÉTODOS DA FILA DE CAMPANHAS ====================
+
+    def enqueue_job(self, kind, payload, campanha_id=None, prioridade=0):
+        """
+        Enfileirar uma campanha para os workers
+
+        Args:
+            kind (str): Tipo da campanha ('whatsapp', 'audio' ou 'sequence')
+            payload (dict): Parâmetros da campanha (serializados em JSON)
+            campanha_id (int): Campanha já criada/retomada (opcional)
+            prioridade (int): Jobs de maior prioridade são executados primeiro
+
+        Returns:
+            int: ID do job
+        """
+        cursor = self._get_cursor()
+        cursor.execute('''
+            INSERT INTO campaign_jobs (kind, campanha_id, payload, prioridade)
+            VALUES (?, ?, ?, ?)
+        ''', (kind, campanha_id, json.dumps(payload), prioridade))
+        self.conn.commit()
+        return cursor.lastrowid
+
+    def claim_job(self, worker_id, kinds, stale_after=60):
+        """
+        Reservar o próximo job disponível para um worker
+
+        Disponíveis são os jobs pendentes e os que estão em execução sem
+        heartbeat há mais de `stale_after` segundos (worker que caiu). A
+        reserva é um UPDATE condicional: se outro worker reservar o mesmo job
+        antes, o próximo candidato é tentado.
+
+        Args:
+            worker_id (str): Identificador do worker
+            kinds (list): Tipos de campanha que o worker executa
+            stale_after (float): Segundos sem heartbeat para retomar um job
+
+        Returns:
+            dict | None: Job reservado (payload já decodificado)
+        """
+        cursor = self._get_cursor()
+        placeholders = ','.join(['?' for _ in kinds])
+        stale = f'-{stale_after} seconds'
+        disponivel = '''
+            (status = 'pendente' AND data_disponivel <= CURRENT_TIMESTAMP)
+            OR (status = 'executando' AND heartbeat < datetime('now', ?))
+        '''
+
+        while True:
+            cursor.execute(f'''
+                SELECT id FROM campaign_jobs
+                WHERE kind IN ({placeholders}) AND ({disponivel})
+                ORDER BY prioridade DESC, id
+                LIMIT 1
+            ''', list(kinds) + [stale])
+            row = cursor.fetchone()
+            if not row:
+                return None
+
+            cursor.execute(f'''
+                UPDATE campaign_jobs SET
+                    status = 'executando',
+                    worker_id = ?,
+                    heartbeat = CURRENT_TIMESTAMP,
+                    tentativas = tentativas + 1,
+                    data_inicio = COALESCE(data_inicio, CURRENT_TIMESTAMP)
+                WHERE id = ? AND ({disponivel})
+            ''', (worker_id, row['id'], stale))
+            claimed = cursor.rowcount == 1
+            self.conn.commit()
+
+            if claimed:
+                return self.get_job(row['id'])
+
+    def heartbeat_job(self, job_id, worker_id):
+        """
+        Registrar que o worker continua executando o job
+
+        Returns:
+            bool: False se o job foi cancelado ou assumido por outro worker
+        """
+        cursor = self._get_cursor()
+        cursor.execute('''
+            UPDATE campaign_jobs SET heartbeat = CURRENT_TIMESTAMP
+            WHERE id = ? AND worker_id = ? AND status = 'executando'
+        ''', (job_id, worker_id))
+        self.conn.commit()
+        return cursor.rowcount == 1
+
+    def finish_job(self, job_id, worker_id, status, erro=None):
+        """Encerrar um job ('concluido', 'pausado' ou 'erro'); jobs cancelados não mudam"""
+        cursor = self._get_cursor()
+        cursor.execute('''
+            UPDATE campaign_jobs SET
+                status = ?,
+                erro = ?,
+                data_fim = CURRENT_TIMESTAMP
+            WHERE id = ? AND worker_id = ? AND status = 'executando'
+        ''', (status, erro, job_id, worker_id))
+        self.conn.commit()
+
+    def release_job(self, job_id, worker_id, retry_in=60, erro=None):
+        """Devolver um job à fila para nova tentativa depois de `retry_in` segundos"""
+        cursor = self._get_cursor()
+        cursor.execute('''
+            UPDATE campaign_jobs SET
+                status = 'pendente',
+                worker_id = NULL,
+                erro = ?,
+                data_disponivel = datetime('now', ?)
+            WHERE id = ? AND worker_id = ? AND status = 'executando'
+        ''', (erro, f'+{retry_in} seconds', job_id, worker_id))
+        self.conn.commit()
+
+    def set_job_campaign(self, job_id, campanha_id):
+        """Associar ao job a campanha criada na primeira execução (usada ao retomar)"""
+        cursor = self._get_cursor()
+        cursor.execute('UPDATE campaign_jobs SET campanha_id = ? WHERE id = ?', (campanha_id, job_id))
+        self.conn.commit()
+
+    def update_job_payload(self, job_id, payload):
+        """Atualizar os parâmetros de um job (ex.: IDs externos para retomar)"""
+        cursor = self._get_cursor()
+        cursor.execute('UPDATE campaign_jobs SET payload = ? WHERE id = ?', (json.dumps(payload), job_id))
+        self.conn.commit()
+
+    def cancel_job(self, job_id):
+        """
+        Cancelar um job pendente ou em execução
+
+        Um job em execução percebe o cancelamento no próximo heartbeat.
+
+        Returns:
+            bool: True se o job foi cancelado
+        """
+        cursor = self._get_cursor()
+        cursor.execute('''
+            UPDATE campaign_jobs SET status = 'cancelado', data_fim = CURRENT_TIMESTAMP
+            WHERE id = ? AND status IN ('pendente', 'executando')
+        ''', (job_id,))
+        self.conn.commit()
+        return cursor.rowcount > 0
+
+    def get_job(self, job_id):
+        """Obter job por ID (payload decodificado)"""
+        cursor = self._get_cursor()
+        cursor.execute('SELECT * FROM campaign_jobs WHERE id = ?', (job_id,))
+        row = cursor.fetchone()
+        if not row:
+            return None
+        job = dict(row)
+        job['payload'] = json.loads(job['payload'])
+        return job
+
+    def get_jobs(self, status=None, limit=100):
+        """Listar jobs da fila (mais recentes primeiro), sem o payload"""
+        cursor = self._get_cursor()
+        query = '''
+            SELECT id, kind, campanha_id, status, prioridade, worker_id, heartbeat,
+                   tentativas, erro, data_disponivel, data_criacao, data_inicio, data_fim
+            FROM campaign_jobs
+        '''
+        params = []
+        if status:
+            query += ' WHERE status = ?'
+            params.append(status)
+        query += ' ORDER BY id DESC LIMIT ?'
+        params.append(limit)
+        cursor.execute(query, params)
+        return [dict(row) for row in cursor.fetchall()]
+
+    # ==================== MÉTODOS DE VERIFICAÇÃO DE NÚMEROS ====================
+
+    def get_number_checks(self, numeros, ttl_days=NUMBER_CHECK_TTL_DAYS):
+        """
+        Obter verificações de existência ainda válidas
+
+        Args:
+            numeros (list): Números em qualquer formato
+            ttl_days (float): Validade da verificação em dias
+
+        Returns:
+            dict: {numero_normalizado: existe} para números verificados dentro da validade
+        """
+        normalizados = list(dict.fromkeys(n for n in map(normalize_phone, numeros) if n))
+        cursor = self._get_cursor()
+        resultado = {}
+
+        for chunk in chunked(normalizados):
+            placeholders = ','.join(['?' for _ in chunk])
+            cursor.execute(f'''
+                SELECT telefone, existe FROM whatsapp_number_checks
+                WHERE telefone IN ({placeholders})
+                AND data_verificacao >= datetime('now', ?)
+            ''', chunk + [f'-{ttl_days} days'])
+            resultado.update({row['telefone']: bool(row['existe']) for row in cursor.fetchall()})
+
+        return resultado
+
+    def save_number_checks(self, verificacoes):
+        """
+        Gravar verificações de existência (substitui as anteriores)
+
+        Args:
+            verificacoes (dict): {numero: existe}
+        """
+        rows = [
+            (numero, int(bool(existe)))
+            for numero, existe in ((normalize_phone(n), e) for n, e in verificacoes.items())
+            if numero
+        ]
+        if not rows:
+            return 0
+
+        cursor = self._get_cursor()
+        cursor.executemany('''
+            INSERT INTO whatsapp_number_checks (telefone, existe, data_verificacao)
+            VALUES (?, ?, CURRENT_TIMESTAMP)
+            ON CONFLICT(telefone) DO UPDATE SET
+                existe = excluded.existe,
+                data_verificacao = excluded.data_verificacao
+        ''', rows)
+        self.conn.commit()
+        return len(rows)
+
+    def get_number_checks_stats(self, ttl_days=NUMBER_CHECK_TTL_DAYS):
+        """Contar verificações válidas (existentes e inexistentes)"""
+        cursor = self._get_cursor()
+        cursor.execute('''
+            SELECT
+                COUNT(*) as total,
+                COALESCE(SUM(existe), 0) as existentes,
+                COUNT(*) - COALESCE(SUM(existe), 0) as inexistentes
+            FROM whatsapp_number_checks
+            WHERE data_verificacao >= datetime('now', ?)
+        ''', (f'-{ttl_days} days',))
+        return dict(cursor.fetchone())
+
+    # ==================== MÉTODOS DE CONSULTA EM LOTE ====================
+
+    def resolve_numbers(self, numeros):
+        """
+        Resolver uma lista de números em lote (empresa, bloqueio e último envio)
+
+        Os números são carregados em uma tabela temporária e resolvidos com um
+        único SELECT, em vez de várias consultas por número.
+
+        Args:
+            numeros (list): Números em qualquer formato
+
+        Returns:
+            dict: {numero_normalizado: dados} apenas para números válidos
+        """
+        normalizados = list(dict.fromkeys(n for n in map(normalize_phone, numeros) if n))
+        if not normalizados:
+            return {}
+
+        cursor = self._get_cursor()
+        cursor.execute('CREATE TEMP TABLE IF NOT EXISTS lookup_numeros (numero TEXT PRIMARY KEY)')
+        cursor.execute('DELETE FROM lookup_numeros')
+
+        for chunk in chunked(normalizados):
+            placeholders = ','.join(['(?)' for _ in chunk])
+            cursor.execute(f'INSERT OR IGNORE INTO lookup_numeros (numero) VALUES {placeholders}', chunk)
+
+        cursor.execute('''
+            SELECT
+                n.numero,
+                e.id AS empresa_id,
+                e.nome,
+                e.setor,
+                e.cidade,
+                e.email,
+                wb.telefone IS NOT NULL AS bloqueado,
+                wb.motivo AS motivo_bloqueio,
+                (
+                    SELECT MAX(wl.data_envio) FROM whatsapp_logs wl
+                    WHERE wl.empresa_id = e.id AND wl.status = 'sucesso'
+                ) AS data_envio
+            FROM lookup_numeros n
+            LEFT JOIN empresas e ON e.id = (
+                SELECT MIN(id) FROM empresas WHERE whatsapp_norm = n.numero
+            )
+            LEFT JOIN whatsapp_blocked wb ON wb.telefone = n.numero
+        ''')
+        resultado = {row['numero']: dict(row) for row in cursor.fetchall()}
+
+        cursor.execute('DELETE FROM lookup_numeros')
+        self.conn.commit()
+        return resultado
+
+    def resolve_campaign_targets(self, empresa_ids, block_resend=False):
+        """
+        Separar os alvos de uma campanha em válidos, bloqueados e já enviados
+
+        Empresa, bloqueio e histórico de envio são resolvidos com uma consulta
+        por bloco de IDs (IN em blocos de SQLITE_CHUNK_SIZE), em vez de três
+        consultas por empresa.
+
+        Args:
+            empresa_ids (list): IDs das empresas selecionadas
+            block_resend (bool): Tratar como já enviadas as empresas com envio
+                bem-sucedido em qualquer campanha
+
+        Returns:
+            dict: 'validas' (empresas, na ordem de empresa_ids), 'bloqueadas',
+                'ja_enviadas', 'sem_whatsapp' (empresas) e 'nao_encontradas' (IDs)
+        """
+        cursor = self._get_cursor()
+        ids = list(dict.fromkeys(empresa_ids))
+        encontradas = {}
+
+        ja_enviada = '''
+            EXISTS(
+                SELECT 1 FROM whatsapp_logs wl
+                WHERE wl.empresa_id = e.id AND wl.status = 'sucesso'
+            )
+        ''' if block_resend else '0'
+
+        for chunk in chunked(ids):
+            placeholders = ','.join(['?' for _ in chunk])
+            cursor.execute(f'''
+                SELECT
+                    e.*,
+                    wb.telefone IS NOT NULL AS _bloqueada,
+                    {ja_enviada} AS _ja_enviada
+                FROM empresas e
+                LEFT JOIN whatsapp_blocked wb ON wb.telefone = e.whatsapp_norm
+                WHERE e.id IN ({placeholders})
+            ''', chunk)
+
+            for row in cursor.fetchall():
+                encontradas[str(row['id'])] = dict(row)  # IDs podem chegar como texto
+
+        resultado = {
+            'validas': [],
+            'bloqueadas': [],
+            'ja_enviadas': [],
+            'sem_whatsapp': [],
+            'nao_encontradas': []
+        }
+
+        for empresa_id in empresa_ids:
+            empresa = encontradas.get(str(empresa_id))
+            if not empresa:
+                resultado['nao_encontradas'].append(empresa_id)
+                continue
+
+            empresa = dict(empresa)
+            bloqueada = empresa.pop('_bloqueada')
+            ja_enviada_flag = empresa.pop('_ja_enviada')
+
+            if not empresa.get('whatsapp') or not str(empresa['whatsapp']).strip():
+                resultado['sem_whatsapp'].append(empresa)
+            elif bloqueada:
+                resultado['bloqueadas'].append(empresa)
+            elif ja_enviada_flag:
+                resultado['ja_enviadas'].append(empresa)
+            else:
+                resultado['validas'].append(empresa)
+
+        return resultado
@@ -0,0 +1,188 @@
+from functools import lru_cache
+
+from database.db import STATS_CONTACT_FIELDS, fts_prefix_query
+
+
+# Maior code point válido: limite superior da faixa usada no filtro por prefixo
+PREFIX_UPPER_BOUND = '\U0010ffff'
+
+# Modos de comparação aceitos para setor/cidade
+MATCH_MODES = ('auto', 'exact', 'prefix', 'contains')
+
+
+@lru_cache(maxsize=256)
+def _compile_sql(select, from_clause, alias, shape):
+    """
+    Gerar o SQL para um formato de filtros (cacheado)
+
+    O formato descreve apenas quais predicados existem e de que tipo, nunca os
+    valores. Consultas com o mesmo formato produzem exatamente o mesmo texto SQL,
+    então o sqlite3 também reaproveita o statement preparado da conexão.
+    """
+    query = f'SELECT {select} FROM {from_clause} WHERE 1=1'
+
+    for kind, arg in shape:
+        if kind == 'exact':
+            query += f' AND {alias}{arg} = ?'
+        elif kind == 'prefix':
+            query += f' AND {alias}{arg} >= ? AND {alias}{arg} < ?'
+        elif kind == 'contains':
+            query += f' AND {alias}{arg} LIKE ?'
+        elif kind == 'has':
+            query += f" AND {alias}{arg} IS NOT NULL AND {alias}{arg} != ''"
+        elif kind == 'fts':
+            query += f' AND {alias}id IN (SELECT rowid FROM empresas_fts WHERE empresas_fts MATCH ?)'
+        elif kind == 'search':
+            query += f' AND ({alias}nome LIKE ? OR {alias}endereco LIKE ?)'
+        elif kind == 'search_numero':
+            query += f' AND {alias}whatsapp_norm LIKE ?'
+        elif kind == 'where':
+            query += f' AND {arg}'
+
+    return query
+
+
+class EmpresaQuery:
+    """
+    Filtros de empresas traduzidos para SQL que aproveita os índices
+
+    - setor/cidade: igualdade (idx_setor/idx_cidade) quando o valor existe no
+      banco, como os enviados a partir de /api/setores e /api/cidades; faixa
+      por prefixo quando pedido; LIKE '%x%' apenas para texto livre
+    - has(<campo>): campo de contato preenchido
+    - search: texto livre no índice FTS5 (nome, endereço, setor e cidade, sem
+      acentos, por prefixo de cada termo); LIKE em nome/endereço sem FTS5
+    - search_numero: dígitos contidos no WhatsApp normalizado
+
+    Exemplo:
+        query, params = EmpresaQuery(db).setor('pizzaria').has('whatsapp').build()
+    """
+
+    def __init__(self, db, alias=''):
+        """
+        Args:
+            db (Database): Banco usado para reconhecer valores conhecidos
+            alias (str): Prefixo das colunas de empresas (ex.: 'e.')
+        """
+        self.db = db
+        self.alias = alias
+        self._shape = []
+        self._params = []
+
+    @classmethod
+    def from_args(cls, db, args, alias='', defaults=None):
+        """
+        Montar os filtros a partir da query string
+
+        Args:
+            db (Database): Banco de dados
+            args: request.args (ou dict equivalente)
+            alias (str): Prefixo das colunas de empresas
+            defaults (dict): Valores padrão para parâmetros ausentes
+
+        Returns:
+            EmpresaQuery: Builder com os filtros aplicados
+        """
+        defaults = defaults or {}
+
+        def arg(name):
+            return args.get(name, defaults.get(name, ''))
+
+        query = cls(db, alias)
+        query.setor(arg('setor'), arg('setor_match') or 'auto')
+        query.cidade(arg('cidade'), arg('cidade_match') or 'auto')
+
+        for field in STATS_CONTACT_FIELDS:
+            if arg(f'has_{field}') == 'true':
+                query.has(field)
+
+        query.search(arg('search'))
+        query.search_numero(arg('search_numero'))
+        return query
+
+    def setor(self, value, match='auto'):
+        """Filtrar por setor"""
+        return self._text_filter('setor', value, match)
+
+    def cidade(self, value, match='auto'):
+        """Filtrar por cidade"""
+        return self._text_filter('cidade', value, match)
+
+    def has(self, field):
+        """Exigir campo de contato preenchido"""
+        if field not in STATS_CONTACT_FIELDS:
+            raise ValueError(f'Campo de contato inválido: {field}')
+        self._shape.append(('has', field))
+        return self
+
+    def search(self, text):
+        """Buscar texto livre (FTS5 quando disponível, senão LIKE em nome/endereço)"""
+        if not text:
+            return self
+
+        if getattr(self.db, 'has_fts', False):
+            match = fts_prefix_query(text)
+            if match:
+                self._shape.append(('fts', None))
+                self._params.append(match)
+        else:
+            self._shape.append(('search', None))
+            self._params.extend([f'%{text}%', f'%{text}%'])
+        return self
+
+    def search_numero(self, numero):
+        """Buscar por parte do número de WhatsApp (apenas dígitos)"""
+        numero_limpo = ''.join(filter(str.isdigit, numero or ''))
+        if numero_limpo:
+            self._shape.append(('search_numero', None))
+            self._params.append(f'%{numero_limpo}%')
+        return self
+
+    def where(self, clause, *params):
+        """Adicionar predicado extra (SQL fixo, valores sempre via parâmetros)"""
+        self._shape.append(('where', clause))
+        self._params.extend(params)
+        return self
+
+    def build(self, select='*', from_clause='empresas', from_params=()):
+        """
+        Gerar a consulta final
+
+        O SQL termina na cláusula WHERE, permitindo acrescentar ORDER BY,
+        LIMIT ou predicados de paginação.
+
+        Args:
+            select (str): Colunas do SELECT
+            from_clause (str): FROM com eventuais JOINs
+            from_params (tuple): Parâmetros usados no FROM/JOINs
+
+        Returns:
+            tuple: (query, params)
+        """
+        query = _compile_sql(select, from_clause, self.alias, tuple(self._shape))
+        return query, list(from_params) + self._params
+
+    def _text_filter(self, column, value, match):
+        if not value:
+            return self
+
+        if match not in MATCH_MODES:
+            raise ValueError(f'Modo de comparação inválido: {match}')
+
+        if match == 'auto':
+            match = 'exact' if self._is_known(column, value) else 'contains'
+
+        self._shape.append((match, column))
+        if match == 'exact':
+            self._params.append(value)
+        elif match == 'prefix':
+            self._params.extend([value, value + PREFIX_UPPER_BOUND])
+        else:
+            self._params.append(f'%{value}%')
+        return self
+
+    def _is_known(self, column, value):
+        """Verificar (via índice) se o valor existe exatamente no banco"""
+        cursor = self.db.cursor
+        cursor.execute(f'SELECT EXISTS(SELECT 1 FROM empresas WHERE {column} = ?)', (value,))
+        return bool(cursor.fetchone()[0])
@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Enriquecimento assíncrono de emails a partir dos websites das empresas
+- Etapa separada do Selenium: a empresa é salva na hora e o email chega depois
+- asyncio + aiohttp com concorrência total e por host limitadas
+- Pool de conexões compartilhado e cache de resultado por website
+"""
+
+import os
+import re
+import sys
+import asyncio
+import threading
+from urllib.parse import urlparse
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+# Adicionar src ao path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from utils.logger import Logger
+
+logger = Logger()
+
+DEFAULT_CONCURRENCY = 20  # Requisições simultâneas no total
+DEFAULT_PER_HOST = 2  # Requisições simultâneas por host
+DEFAULT_TIMEOUT = 5  # Segundos por website
+MAX_PAGE_BYTES = 10000  # Apenas o início da página é analisado
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+EMAIL_PATTERN = re.compile(r'\b[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}\b')
+IGNORED_EMAIL_TERMS = ('example', 'test', 'sample', 'domain', 'noreply', 'no-reply')
+
+
+def find_email(page_text):
+    """Primeiro email do texto que não seja de exemplo (ou None)"""
+    match = EMAIL_PATTERN.search(page_text or '')
+    if match:
+        email = match.group()
+        if not any(term in email.lower() for term in IGNORED_EMAIL_TERMS):
+            return email
+    return None
+
+
+def website_domain(website_url):
+    """Domínio usado como chave do cache (sem 'www.')"""
+    if not website_url:
+        return None
+    if '://' not in website_url:
+        website_url = f'http://{website_url}'
+    host = (urlparse(website_url).hostname or '').lower()
+    return host[4:] if host.startswith('www.') else host or None
+
+
+def website_cache_key(website_url):
+    """
+    Chave do cache de um website
+
+    A raiz do site usa só o domínio; páginas internas (instagram.com/loja,
+    linktr.ee/loja, wixsite.com/loja...) usam a URL normalizada, para que
+    empresas diferentes no mesmo host não recebam o email uma da outra.
+    """
+    domain = website_domain(website_url)
+    if not domain:
+        return None
+    if '://' not in website_url:
+        website_url = f'http://{website_url}'
+    parsed = urlparse(website_url)
+    path = parsed.path.rstrip('/')
+    if not path and not parsed.query:
+        return domain
+    return f'{domain}{path}?{parsed.query}' if parsed.query else f'{domain}{path}'
+
+
+class EmailEnricher:
+    """
+    Buscar emails nos websites das empresas em segundo plano
+
+    Um event loop asyncio roda em uma thread própria com uma única
+    aiohttp.ClientSession. submit() retorna na hora; quando o email é
+    encontrado, a empresa é atualizada no banco (email só é preenchido se
+    estiver vazio) e o dict da empresa recebe o email.
+
+    Cada website (domínio, se for a raiz do site) é baixado uma vez só: o
+    resultado (inclusive "sem email") fica em cache e pedidos simultâneos
+    aguardam o mesmo download.
+
+    Exemplo:
+        enricher = EmailEnricher(db)
+        enricher.start()
+        enricher.submit({'id': 42, 'nome': 'Padaria', 'website': 'https://...'})
+        enricher.close()  # aguarda os pendentes
+    """
+
+    def __init__(self, db=None, concurrency=DEFAULT_CONCURRENCY, per_host=DEFAULT_PER_HOST,
+                 timeout=DEFAULT_TIMEOUT, on_result=None):
+        """
+        Args:
+            db (Database): Banco onde o email é gravado (opcional)
+            concurrency (int): Limite de requisições simultâneas
+            per_host (int): Limite de requisições simultâneas por host
+            timeout (float): Timeout total por website (segundos)
+            on_result (callable): on_result(business_data, email) após cada busca
+        """
+        if aiohttp is None:
+            raise RuntimeError('aiohttp não instalado (pip install aiohttp)')
+
+        self.db = db
+        self.concurrency = concurrency
+        self.per_host = per_host
+        self.timeout = timeout
+        self.on_result = on_result
+
+        self.cache = {}  # website_cache_key -> email (ou None)
+        self.stats = {'submitted': 0, 'fetched': 0, 'cache_hits': 0, 'found': 0, 'errors': 0}
+
+        self._loop = None
+        self._thread = None
+        self._session = None
+        self._inflight = {}  # website_cache_key -> Future do download em andamento
+        self._pending = 0
+        self._idle = threading.Condition()
+        self._ready = threading.Event()
+
+    @staticmethod
+    def available():
+        """Indica se o aiohttp está instalado"""
+        return aiohttp is not None
+
+    def start(self):
+        """Iniciar o event loop em segundo plano"""
+        if self._thread:
+            return
+        self._thread = threading.Thread(target=self._run_loop, daemon=True)
+        self._thread.start()
+        self._ready.wait()
+
+    def _run_loop(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_until_complete(self._open_session())
+        self._ready.set()
+        self._loop.run_forever()
+
+        self._loop.run_until_complete(self._session.close())
+        self._loop.close()
+
+    async def _open_session(self):
+        connector = aiohttp.TCPConnector(
+            limit=self.concurrency,
+            limit_per_host=self.per_host,
+            ttl_dns_cache=300,
+            ssl=False  # Ignora SSL para sites com certificado inválido
+        )
+        self._session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+            headers={'User-Agent': USER_AGENT}
+        )
+
+    def submit(self, business_data):
+        """
+        Agendar a busca do email de uma empresa já salva
+
+        Args:
+            business_data (dict): Empresa com 'website' (e 'id' da empresa salva, para o banco)
+
+        Returns:
+            bool: True se a busca foi agendada
+        """
+        if not business_data.get('website') or business_data.get('email'):
+            return False
+        if not self._thread:
+            self.start()
+
+        with self._idle:
+            self._pending += 1
+        self.stats['submitted'] += 1
+        asyncio.run_coroutine_threadsafe(self._enrich(business_data), self._loop)
+        return True
+
+    async def _enrich(self, business_data):
+        email = None
+        try:
+            email = await self.find_email(business_data['website'])
+            if email:
+                business_data['email'] = email
+                if self.db and business_data.get('id'):
+                    self.db.update_empresa_email(business_data['id'], email)
+                print(f"   📧 Email encontrado para {business_data.get('nome')}: {email}")
+            if self.on_result:
+                self.on_result(business_data, email)
+        except Exception as e:
+            self.stats['errors'] += 1
+            logger.error(f"Erro ao gravar email de {business_data.get('nome')}: {e}")
+        finally:
+            with self._idle:
+                self._pending -= 1
+                self._idle.notify_all()
+
+    async def find_email(self, website_url):
+        """Email do website (com cache e download único por website_cache_key)"""
+        key = website_cache_key(website_url)
+        if key in self.cache:
+            self.stats['cache_hits'] += 1
+            return self.cache[key]
+
+        if key in self._inflight:
+            self.stats['cache_hits'] += 1
+            return await self._inflight[key]
+
+        future = self._loop.create_future()
+        self._inflight[key] = future
+        try:
+            email = await self._fetch_email(website_url)
+            self.cache[key] = email
+            future.set_result(email)
+            return email
+        finally:
+            if not future.done():
+                future.set_result(None)
+            del self._inflight[key]
+
+    async def _fetch_email(self, website_url):
+        if '://' not in website_url:
+            website_url = f'http://{website_url}'
+
+        self.stats['fetched'] += 1
+        try:
+            async with self._session.get(website_url, allow_redirects=True) as response:
+                if response.status != 200:
+                    return None
+                page = await response.content.read(MAX_PAGE_BYTES)
+        except Exception:
+            # Silenciar erros ao acessar website (timeout, SSL, etc)
+            self.stats['errors'] += 1
+            return None
+
+        email = find_email(page.decode('utf-8', errors='ignore'))
+        if email:
+            self.stats['found'] += 1
+        return email
+
+    def fetch_email(self, website_url):
+        """
+        Buscar o email de um website aguardando o resultado (mesmo cache e limites)
+
+        Usado quando o email decide o filtro de contatos e não pode ficar para depois.
+
+        Returns:
+            str: Email encontrado ou None
+        """
+        if not self._thread:
+            self.start()
+        future = asyncio.run_coroutine_threadsafe(self.find_email(website_url), self._loop)
+        try:
+            return future.result(self.timeout + 5)
+        except Exception as e:
+            logger.error(f'Erro ao buscar email de {website_url}: {e}')
+            return None
+
+    def join(self, timeout=None):
+        """
+        Aguardar as buscas pendentes
+
+        Returns:
+            bool: True se não restaram buscas pendentes
+        """
+        with self._idle:
+            return self._idle.wait_for(lambda: self._pending == 0, timeout)
+
+    def close(self, wait=True, timeout=None):
+        """Encerrar o event loop (por padrão após as buscas pendentes)"""
+        if not self._thread:
+            return
+        if wait:
+            self.join(timeout)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+        self._thread = None
+        logger.info(f'Enriquecimento de emails encerrado: {self.get_stats()}')
+
+    def get_stats(self):
+        """Estatísticas do enriquecimento"""
+        return {**self.stats, 'pending': self._pending, 'websites_cached': len(self.cache)}
+
+    def enrich_pending(self, limit=500):
+        """
+        Buscar emails das empresas já salvas que têm website e não têm email
+
+        Returns:
+            int: Quantidade de empresas agendadas
+        """
+        total = sum(1 for empresa in self.db.get_empresas_sem_email(limit) if self.submit(empresa))
+        self.join()
+        return total
@@ -6,20 +6,171 @@ from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
 from webdriver_manager.chrome import ChromeDriverManager
+import os
 import time
 import re
+import json
 import requests
 from bs4 import BeautifulSoup
 import urllib3
 
+try:
+    from lxml import html as lxml_html
+except ImportError:
+    lxml_html = None
+
+from database.db import parse_place_id, PLACE_TTL_DAYS
+from scraper.email_enricher import find_email
+
 # Desabilitar warnings de SSL
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
+# Campos de contato aceitos nos filtros required_contacts
+CONTACT_FIELDS = ('whatsapp', 'telefone', 'email', 'website', 'instagram', 'facebook', 'linkedin', 'twitter')
+
+# Requisições bloqueadas no Chrome via CDP (Network.setBlockedURLs, '*' é curinga):
+# tiles/imagens do mapa, fontes, telemetria/analytics e mídia. Os dados das empresas
+# vêm do HTML e dos XHR de /maps, que não são afetados
+DEFAULT_BLOCKED_URLS = (
+    # Tiles do mapa, Street View e fotos dos lugares
+    '*/maps/vt*', '*/kh/v=*', '*khms*.google.com/*', '*streetviewpixels-pa.googleapis.com/*',
+    '*.googleusercontent.com/*',
+    # Fontes
+    '*fonts.gstatic.com/*', '*fonts.googleapis.com/*', '*.woff*', '*.ttf*', '*.otf*',
+    # Telemetria e analytics
+    '*google-analytics.com/*', '*googletagmanager.com/*', '*doubleclick.net/*',
+    '*/gen_204*', '*/log204*', '*play.google.com/log*', '*/csi?*',
+    # Imagens e mídia
+    '*.png*', '*.jpg*', '*.jpeg*', '*.gif*', '*.webp*', '*.ico*', '*.mp4*', '*.webm*', '*.mp3*',
+)
+
+# Empresas processadas entre gravações no banco: o upsert das empresas, o
+# places_index e o checkpoint são gravados em lote a cada BATCH_COMMIT lugares
+BATCH_COMMIT = max(1, int(os.getenv('BATCH_COMMIT', 20)))
+
+# Espera máxima por novos resultados após cada scroll do feed (segundos) e
+# quantas esperas seguidas sem resultados novos encerram a coleta
+SCROLL_WAIT_TIMEOUT = 5
+SCROLL_MAX_STALLS = 3
+
+# Rolar o feed até o fim e aguardar (MutationObserver) novos resultados, o fim da
+# lista ou o timeout. arguments: feed, quantidade de links já lidos, timeout em ms.
+# Retorna apenas os hrefs novos, para a coleta ser incremental sem find_elements
+SCROLL_AND_WAIT_SCRIPT = """
+const [feed, offset, timeoutMs] = arguments;
+const done = arguments[arguments.length - 1];
+const selector = 'a[href*="/maps/place/"]';
+const atEnd = () => !!feed.querySelector('span.HlvSq')
+    || /final da lista|end of the list/i.test(feed.lastElementChild ? feed.lastElementChild.textContent : '');
+const before = feed.querySelectorAll(selector).length;
+let finished = false;
+const finish = (timedOut) => {
+    if (finished) return;
+    finished = true;
+    observer.disconnect();
+    clearTimeout(timer);
+    const anchors = Array.from(feed.querySelectorAll(selector));
+    const start = anchors.length >= offset ? offset : 0;
+    done({hrefs: anchors.slice(start).map(a => a.href), total: anchors.length, end: atEnd(), timed_out: timedOut});
+};
+const observer = new MutationObserver(() => {
+    if (feed.querySelectorAll(selector).length !== before || atEnd()) finish(false);
+});
+const timer = setTimeout(() => finish(true), timeoutMs);
+observer.observe(feed, {childList: true, subtree: true});
+feed.scrollTop = feed.scrollHeight;
+if (before > offset || atEnd()) finish(false);
+"""
+
+# Modos de extrair os dados da página da empresa: 'script' lê todos os campos e links
+# em um único execute_script, 'lxml' analisa o page_source em Python e 'webdriver'
+# faz um find_element por campo (e um get_attribute por link)
+EXTRACTION_MODES = ('script', 'lxml', 'webdriver')
+
+# Campos da página da empresa: (seletor CSS, XPath equivalente para o lxml, atributo ou None para o texto)
+_CLASS = "contains(concat(' ', normalize-space(@class), ' '), ' {} ')"
+PLACE_FIELDS = {
+    'nome': ('h1.DUwDvf', f"//h1[{_CLASS.format('DUwDvf')}]", None),
+    'endereco': (
+        'button[data-item-id="address"] div.fontBodyMedium',
+        f"//button[@data-item-id='address']//div[{_CLASS.format('fontBodyMedium')}]", None
+    ),
+    'telefone': (
+        'button[data-item-id^="phone:tel:"] div.fontBodyMedium',
+        f"//button[starts-with(@data-item-id, 'phone:tel:')]//div[{_CLASS.format('fontBodyMedium')}]", None
+    ),
+    'website': ('a[data-item-id="authority"]', "//a[@data-item-id='authority']", 'href'),
+    'rating': (
+        'div.F7nice span[aria-hidden="true"]',
+        f"//div[{_CLASS.format('F7nice')}]//span[@aria-hidden='true']", None
+    ),
+    'total_reviews': (
+        'div.F7nice span[aria-label*="avaliações"]',
+        f"//div[{_CLASS.format('F7nice')}]//span[contains(@aria-label, 'avaliações')]", None
+    ),
+    'horario_funcionamento': ('div[aria-label*="Horário"]', "//div[contains(@aria-label, 'Horário')]", 'aria-label'),
+}
+
+# Ler todos os campos (arguments[0] = {campo: [css, atributo]}) e links da página de uma vez
+PLACE_SNAPSHOT_SCRIPT = """
+const fields = {};
+for (const [field, [css, attr]] of Object.entries(arguments[0])) {
+    const el = document.querySelector(css);
+    fields[field] = !el ? null : attr === 'href' ? el.href : attr ? el.getAttribute(attr) : el.innerText;
+}
+return {fields: fields, links: Array.from(document.querySelectorAll('a[href]'), a => a.href), url: location.href};
+"""
+
+
+def summarize_network_stats(totals):
+    """Acrescentar as médias por empresa aos totais de tráfego"""
+    places = totals['places']
+    if not places:
+        return {**totals}
+    return {
+        **totals,
+        'avg_bytes': totals['bytes'] // places,
+        'avg_requests': round(totals['requests'] / places, 1),
+        'avg_blocked': round(totals['blocked'] / places, 1),
+        'avg_load_seconds': round(totals['load_seconds'] / places, 3)
+    }
+
 
 class GoogleMapsScraper:
-    def __init__(self, headless=True):
+    def __init__(self, headless=True, debugging_port=9222, email_enricher=None, extraction='script',
+                 blocked_urls=DEFAULT_BLOCKED_URLS, track_network=True, known_place_ttl_days=PLACE_TTL_DAYS):
+        """
+        Args:
+            headless (bool): Rodar o Chrome sem janela
+            debugging_port (int): Porta de depuração remota do Chrome (0 = porta livre
+                escolhida pelo Chrome, necessário com vários navegadores ao mesmo tempo;
+                None = não definir)
+            email_enricher (EmailEnricher): Buscar emails dos websites em segundo plano
+                (sem ele, o website é acessado durante a extração)
+            extraction (str): Modo de extrair os dados das empresas (ver EXTRACTION_MODES)
+            blocked_urls (list): Padrões de URL bloqueados via CDP (vazio = não bloquear)
+            track_network (bool): Medir bytes, requisições e tempo de carga de cada empresa
+                (log de performance do Chrome)
+            known_place_ttl_days (float): Pular empresas (place id) visitadas há menos
+                dias que isto, sem carregar a página (0/None = visitar sempre)
+        """
+        if extraction not in EXTRACTION_MODES:
+            raise ValueError(f'Modo de extração inválido: {extraction}')
+        if extraction == 'lxml' and lxml_html is None:
+            print("⚠️  lxml não instalado - usando extração por script")
+            extraction = 'script'
+
         self.driver = None
         self.headless = headless
+        self.debugging_port = debugging_port
+        self.email_enricher = email_enricher
+        self.extraction = extraction
+        self.blocked_urls = list(blocked_urls or [])
+        self.track_network = track_network
+        self.known_place_ttl_days = known_place_ttl_days
+        self._cdp_available = True  # Desativado se o driver não suportar execute_cdp_cmd
+        self.last_place_stats = None
+        self.network_stats = {'places': 0, 'bytes': 0, 'requests': 0, 'blocked': 0, 'load_seconds': 0.0}
         self.running = True
         self._setup_driver()
 
@@ -46,7 +197,8 @@ class GoogleMapsScraper:
         chrome_options.add_argument('--silent')
         # Argumentos essenciais para rodar em ambiente headless Linux
         chrome_options.add_argument('--disable-setuid-sandbox')
-        chrome_options.add_argument('--remote-debugging-port=9222')
+        if self.debugging_port is not None:
+            chrome_options.add_argument(f'--remote-debugging-port={self.debugging_port}')
         chrome_options.add_argument('--window-size=1920,1080')
         chrome_options.add_argument('--disable-background-networking')
         chrome_options.add_argument('--disable-background-timer-throttling')
@@ -86,6 +238,10 @@ class GoogleMapsScraper:
         }
         chrome_options.add_experimental_option('prefs', prefs)
 
+        # Eventos de rede (Network.*) para medir bytes e requisições bloqueadas por empresa
+        if self.track_network:
+            chrome_options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
+
         # User agent
         chrome_options.add_argument(
             'user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
@@ -179,6 +335,58 @@ class GoogleMapsScraper:
                 print(f"❌ Erro ao usar ChromeDriver do sistema: {str(e2)}")
                 raise Exception(f"Falha ao inicializar ChromeDriver. Verifique se o Chrome/Chromium está instalado corretamente.\nErro 1: {str(e)}\nErro 2: {str(e2)}")
 
+        if self.blocked_urls:
+            self.set_blocked_urls(self.blocked_urls)
+
+    def set_blocked_urls(self, patterns):
+        """
+        Definir os padrões de URL bloqueados pelo Chrome (lista vazia desbloqueia tudo)
+
+        Returns:
+            bool: False se o driver não suportar CDP
+        """
+        if not self._cdp_available:
+            return False
+        try:
+            self.driver.execute_cdp_cmd('Network.enable', {})
+            self.driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': list(patterns)})
+        except AttributeError:
+            self._cdp_available = False  # Driver sem suporte a CDP
+            print("⚠️  Driver sem suporte a CDP - bloqueio de requisições desativado")
+            return False
+
+        if patterns:
+            print(f"🚫 Bloqueando {len(patterns)} padrões de URL via CDP")
+        return True
+
+    def _read_network_log(self):
+        """
+        Consumir o log de performance do Chrome desde a última leitura
+
+        Returns:
+            dict: bytes recebidos, requisições e requisições bloqueadas (ou None sem log)
+        """
+        if not self.track_network:
+            return None
+        try:
+            entries = self.driver.get_log('performance')
+        except Exception:
+            self.track_network = False  # Driver sem log de performance
+            return None
+
+        stats = {'bytes': 0, 'requests': 0, 'blocked': 0}
+        for entry in entries:
+            message = json.loads(entry['message'])['message']
+            method = message.get('method')
+            params = message.get('params', {})
+            if method == 'Network.requestWillBeSent':
+                stats['requests'] += 1
+            elif method == 'Network.loadingFinished':
+                stats['bytes'] += int(params.get('encodedDataLength') or 0)
+            elif method == 'Network.loadingFailed' and params.get('blockedReason'):
+                stats['blocked'] += 1
+        return stats
+
     def search_businesses(self, setor, cidade, max_results=50, db=None, progress_callback=None, continue_from_checkpoint=True, required_contacts=None):
         """Buscar empresas no Google Maps"""
         search_query = f"{setor} em {cidade}"
@@ -221,39 +429,85 @@ class GoogleMapsScraper:
                 else:
                     return []
 
-        self.driver.get(search_url)
-        time.sleep(1)  # Reduzido de 3s para 1s
-
         businesses = []
         processed_count = 0
         saved_count = 0
         updated_count = 0
         skipped_count = 0
 
-        try:
-            # Localizar o painel de resultados
-            results_panel = WebDriverWait(self.driver, 10).until(
-                EC.presence_of_element_located((By.CSS_SELECTOR, 'div[role="feed"]'))
-            )
+        # Empresas aguardando gravação: (número, url, dados, atende aos filtros)
+        pending = []
+        flushed_count = 0
+        next_index = start_index
 
-            # Fazer scroll inicial para carregar mais resultados
-            print(f"📊 Fazendo scroll para carregar resultados...")
-            self._scroll_results(results_panel, max_results)
+        def flush_pending():
+            """Gravar as empresas pendentes em lote e avançar o checkpoint"""
+            nonlocal saved_count, updated_count, skipped_count, flushed_count
+            if processed_count == flushed_count:
+                return
 
-            # Obter todos os URLs das empresas ANTES de começar a processar
-            print(f"📊 Coletando URLs das empresas...")
-            business_urls = []
-            result_elements = self.driver.find_elements(By.CSS_SELECTOR, 'div[role="feed"] a[href*="/maps/place/"]')
+            matched = [business_data for _, _, business_data, ok in pending if ok]
+            if db and matched:
+                results = iter(db.upsert_empresas(matched)['results'])
+            else:
+                results = iter([{'status': 'saved', 'id': None}] * len(matched))
+
+            places = []
+            status = 'no_contact'
+            flush_saved = flush_updated = 0
+            for number, url, business_data, ok in pending:
+                status = 'no_contact'
+                if ok:
+                    result = next(results)
+                    status = result['status']
+                    if result['id'] is not None:
+                        business_data['id'] = result['id']
+
+                    if status == 'saved':
+                        saved_count += 1
+                        flush_saved += 1
+                        print(f"✅ [{number}] {business_data['nome']} - SALVO")
+                    elif status == 'updated':
+                        updated_count += 1
+                        flush_updated += 1
+                        print(f"🔄 [{number}] {business_data['nome']} - ATUALIZADO")
+                    else:
+                        skipped_count += 1
+                        print(f"⏭️  [{number}] {business_data['nome']} - JÁ EXISTE (sem novos dados)")
 
-            for element in result_elements[:max_results]:
-                try:
-                    url = element.get_attribute('href')
-                    if url and url not in business_urls:
-                        business_urls.append(url)
-                except:
-                    pass
+                    # Email do website chega depois, sem travar o navegador
+                    self.queue_email_enrichment(business_data)
+
+                places.append((url, business_data['nome'], status))
+
+            # Só lugares gravados em empresas contam como recentes (get_fresh_place_ids)
+            if db:
+                db.mark_places_scraped(places)
+                db.update_checkpoint_progress(
+                    setor, cidade,
+                    processados_increment=0,  # Já incrementamos manualmente acima
+                    salvos_increment=0,  # Já incrementamos manualmente acima
+                    ultimo_indice=next_index  # Próximo índice a processar
+                )
+
+            # Callback de progresso (um por lote gravado)
+            if progress_callback:
+                progress_callback({
+                    'processed': processed_count,
+                    'total': max_results,
+                    'saved': saved_count,
+                    'updated': updated_count,
+                    'skipped': skipped_count,
+                    'current_business': pending[-1][2]['nome'] if pending else '',
+                    'status': 'saved' if flush_saved else 'updated' if flush_updated else status
+                })
+
+            pending.clear()
+            flushed_count = processed_count
 
-            print(f"📊 Encontradas {len(business_urls)} empresas para processar")
+        try:
+            # Obter todos os URLs das empresas ANTES de começar a processar
+            business_urls = self.collect_business_urls(setor, cidade, max_results)
 
             # Criar ou atualizar checkpoint inicial
             if db:
@@ -301,89 +555,52 @@ class GoogleMapsScraper:
 
                 business_urls = business_urls[start_index:]
                 processed_count = start_index
+                flushed_count = start_index
                 if checkpoint:
                     saved_count = checkpoint['total_salvos']
                     updated_count = checkpoint.get('total_atualizados', 0)
 
+            # Empresas visitadas recentemente (places_index) não são carregadas de novo
+            fresh_places = set()
+            if db and self.known_place_ttl_days:
+                fresh_places = db.get_fresh_place_ids(map(parse_place_id, business_urls), self.known_place_ttl_days)
+                if fresh_places:
+                    print(f"⏭️  {len(fresh_places)} empresas visitadas há menos de {self.known_place_ttl_days} dias serão puladas")
+
             # Processar em chunks para evitar sobrecarga de memória
-            import os
             chunk_size = int(os.getenv('CHUNK_SIZE', 100))
             total_chunks = (len(business_urls) + chunk_size - 1) // chunk_size
-            print(f"📦 Processando em {total_chunks} chunks de {chunk_size} empresas\n")
+            print(f"📦 Processando em {total_chunks} chunks de {chunk_size} empresas (gravação a cada {BATCH_COMMIT})\n")
 
             # Processar cada URL diretamente
             for idx, url in enumerate(business_urls):
+                if processed_count - flushed_count >= BATCH_COMMIT:
+                    flush_pending()
+
                 if not self.running or processed_count >= max_results:
                     break
 
+                # Empresa conhecida e recente: pular sem driver.get
+                if parse_place_id(url) in fresh_places:
+                    skipped_count += 1
+                    processed_count += 1
+                    next_index = start_index + idx + 1
+                    print(f"⏭️  [{processed_count}] Empresa visitada recentemente - PULADA")
+                    continue
+
                 try:
                     chunk_num = (idx // chunk_size) + 1
                     actual_index = start_index + idx
                     print(f"🔄 [Chunk {chunk_num}/{total_chunks}] [{actual_index + 1}/{start_index + len(business_urls)}] Acessando empresa...")
 
-                    # Navegar diretamente para o URL da empresa
-                    self.driver.get(url)
-                    time.sleep(0.8)  # Reduzido de 2s para 0.8s
-
-                    # Extrair dados
-                    business_data = self._extract_business_data(setor, cidade)
+                    # Navegar diretamente para o URL da empresa e extrair dados
+                    business_data = self.scrape_place(url, setor, cidade)
 
                     if business_data and business_data.get('nome'):
                         # Verificar se tem pelo menos um dos contatos requeridos
-                        has_required_contact = False
-
-                        if required_contacts.get('whatsapp') and business_data.get('whatsapp'):
-                            has_required_contact = True
-                        if required_contacts.get('telefone') and business_data.get('telefone'):
-                            has_required_contact = True
-                        if required_contacts.get('email') and business_data.get('email'):
-                            has_required_contact = True
-                        if required_contacts.get('website') and business_data.get('website'):
-                            has_required_contact = True
-                        if required_contacts.get('instagram') and business_data.get('instagram'):
-                            has_required_contact = True
-                        if required_contacts.get('facebook') and business_data.get('facebook'):
-                            has_required_contact = True
-                        if required_contacts.get('linkedin') and business_data.get('linkedin'):
-                            has_required_contact = True
-                        if required_contacts.get('twitter') and business_data.get('twitter'):
-                            has_required_contact = True
-
-                        if has_required_contact:
+                        if self.passes_contact_filter(business_data, required_contacts):
                             businesses.append(business_data)
-
-                            # Salvar ou atualizar no banco de dados
-                            status = 'no_contact'
-                            if db:
-                                result = self._save_or_update_business(db, business_data)
-                                if result == 'saved':
-                                    saved_count += 1
-                                    status = 'saved'
-                                    print(f"✅ [{processed_count + 1}] {business_data['nome']} - SALVO")
-                                elif result == 'updated':
-                                    updated_count += 1
-                                    status = 'updated'
-                                    print(f"🔄 [{processed_count + 1}] {business_data['nome']} - ATUALIZADO")
-                                else:
-                                    skipped_count += 1
-                                    status = 'skipped'
-                                    print(f"⏭️  [{processed_count + 1}] {business_data['nome']} - JÁ EXISTE (sem novos dados)")
-                            else:
-                                saved_count += 1
-                                status = 'saved'
-                                print(f"✅ [{processed_count + 1}] {business_data['nome']}")
-
-                            # Callback de progresso
-                            if progress_callback:
-                                progress_callback({
-                                    'processed': processed_count + 1,
-                                    'total': max_results,
-                                    'saved': saved_count,
-                                    'updated': updated_count,
-                                    'skipped': skipped_count,
-                                    'current_business': business_data['nome'],
-                                    'status': status
-                                })
+                            pending.append((processed_count + 1, url, business_data, True))
                         else:
                             skipped_count += 1
                             # Mostrar quais contatos a empresa tem
@@ -407,18 +624,7 @@ class GoogleMapsScraper:
 
                             contacts_str = ', '.join(available_contacts) if available_contacts else 'Nenhum'
                             print(f"⏭️  [{processed_count + 1}] {business_data.get('nome')} - NÃO ATENDE FILTROS (tem: {contacts_str})")
-
-                            # Callback de progresso
-                            if progress_callback:
-                                progress_callback({
-                                    'processed': processed_count + 1,
-                                    'total': max_results,
-                                    'saved': saved_count,
-                                    'updated': updated_count,
-                                    'skipped': skipped_count,
-                                    'current_business': business_data.get('nome', 'Sem nome'),
-                                    'status': 'no_contact'
-                                })
+                            pending.append((processed_count + 1, url, business_data, False))
 
                 except Exception as e:
                     print(f"❌ Erro ao processar empresa: {str(e)}")
@@ -427,25 +633,24 @@ class GoogleMapsScraper:
 
                 # Incrementar contador de processados
                 processed_count += 1
-
-                # Atualizar checkpoint a cada empresa processada
-                if db:
-                    db.update_checkpoint_progress(
-                        setor, cidade,
-                        processados_increment=0,  # Já incrementamos manualmente acima
-                        salvos_increment=0,  # Já incrementamos manualmente acima
-                        ultimo_indice=actual_index + 1  # Próximo índice a processar
-                    )
+                next_index = start_index + idx + 1
 
                 # Delay mínimo entre empresas (removido para máxima velocidade)
                 # time.sleep(0.1)
 
+            # Gravar o último lote (fim da lista ou parada solicitada)
+            flush_pending()
+
             print(f"\n{'='*50}")
             print(f"📊 Resumo da busca:")
             print(f"   Total processados: {processed_count}")
             print(f"   💾 Salvos: {saved_count}")
             print(f"   🔄 Atualizados: {updated_count}")
             print(f"   ⏭️  Ignorados: {skipped_count}")
+            network = self.get_network_stats()
+            if network.get('avg_bytes') is not None:
+                print(f"   📶 Média por empresa: {network['avg_bytes'] / 1024:.0f} KB, "
+                      f"{network['avg_blocked']} bloqueadas, carga em {network['avg_load_seconds']:.2f}s")
             print(f"{'='*50}\n")
 
             # Marcar checkpoint como concluído
@@ -455,7 +660,11 @@ class GoogleMapsScraper:
 
         except TimeoutException:
             print("⏰ Timeout ao carregar resultados")
-            # Salvar checkpoint mesmo em caso de erro
+            # Gravar as empresas pendentes e salvar checkpoint mesmo em caso de erro
+            try:
+                flush_pending()
+            except Exception as flush_error:
+                print(f"❌ Erro ao gravar empresas pendentes: {flush_error}")
             if db:
                 db.create_or_update_checkpoint(
                     setor, cidade,
@@ -466,7 +675,11 @@ class GoogleMapsScraper:
                 )
         except Exception as e:
             print(f"❌ Erro durante a busca: {str(e)}")
-            # Salvar checkpoint mesmo em caso de erro
+            # Gravar as empresas pendentes e salvar checkpoint mesmo em caso de erro
+            try:
+                flush_pending()
+            except Exception as flush_error:
+                print(f"❌ Erro ao gravar empresas pendentes: {flush_error}")
             if db:
                 db.create_or_update_checkpoint(
                     setor, cidade,
@@ -478,50 +691,282 @@ class GoogleMapsScraper:
 
         return businesses
 
+    def collect_business_urls(self, setor, cidade, max_results=50):
+        """
+        Abrir a busca no Google Maps e coletar os URLs das empresas (sem visitá-los)
+
+        Returns:
+            list: URLs /maps/place/ na ordem dos resultados (sem repetições)
+
+        Raises:
+            TimeoutException: Se o painel de resultados não carregar
+        """
+        return list(self.iter_business_urls(setor, cidade, max_results))
+
+    def iter_business_urls(self, setor, cidade, max_results=50):
+        """
+        Abrir a busca e gerar os URLs das empresas à medida que o scroll os carrega
+
+        Permite começar a extrair os detalhes (em outros navegadores) antes do fim do scroll.
+
+        Raises:
+            TimeoutException: Se o painel de resultados não carregar
+        """
+        search_query = f"{setor} em {cidade}" if cidade else setor
+        search_url = f"https://www.google.com/maps/search/{search_query.replace(' ', '+')}"
+
+        self.driver.get(search_url)
+
+        # Localizar o painel de resultados
+        results_panel = WebDriverWait(self.driver, 10).until(
+            EC.presence_of_element_located((By.CSS_SELECTOR, 'div[role="feed"]'))
+        )
+
+        print(f"📊 Fazendo scroll e coletando URLs das empresas...")
+        total = 0
+        for url in self._scroll_results(results_panel, max_results):
+            total += 1
+            yield url
+
+        print(f"📊 Encontradas {total} empresas para processar")
+
+        # Tráfego da busca não entra nas estatísticas da primeira empresa
+        self._read_network_log()
+
+    def scrape_place(self, url, setor, cidade):
+        """Abrir a página de uma empresa e extrair seus dados"""
+        start = time.perf_counter()
+        self.driver.get(url)
+        load_seconds = time.perf_counter() - start
+
+        time.sleep(0.8)  # Reduzido de 2s para 0.8s
+        data = self._extract_business_data(setor, cidade)
+
+        self._record_place_stats(load_seconds)
+        return data
+
+    def _record_place_stats(self, load_seconds):
+        """Guardar o tráfego e o tempo de carga da última empresa (e acumular no total)"""
+        stats = self._read_network_log() or {}
+        stats['load_seconds'] = round(load_seconds, 3)
+        self.last_place_stats = stats
+
+        self.network_stats['places'] += 1
+        for key, value in stats.items():
+            self.network_stats[key] += value
+
+        if 'bytes' in stats:
+            print(f"   📶 {stats['bytes'] / 1024:.0f} KB em {stats['requests']} requisições "
+                  f"({stats['blocked']} bloqueadas), carga em {stats['load_seconds']:.2f}s")
+
+    def get_network_stats(self):
+        """Médias por empresa de bytes, requisições, bloqueios e tempo de carga"""
+        return summarize_network_stats(self.network_stats)
+
+    def benchmark_request_blocking(self, urls):
+        """
+        Comparar bytes e tempo de carga das mesmas empresas sem e com bloqueio
+
+        Requisições bloqueadas nunca são baixadas, então a economia é medida
+        carregando cada página nos dois modos, com o cache do navegador
+        desativado para a segunda passada não sair favorecida.
+
+        Args:
+            urls (list): URLs de empresas (ex.: collect_business_urls)
+
+        Returns:
+            dict: {'sem_bloqueio': {...}, 'com_bloqueio': {...}, 'economia': {...}} (médias por
+                empresa) ou None se o driver não tiver CDP ou log de performance
+        """
+        if not self.track_network or not self.set_blocked_urls([]):
+            print("⚠️  Medição indisponível: o driver precisa de CDP e do log de performance")
+            return None
+
+        self.driver.execute_cdp_cmd('Network.setCacheDisabled', {'cacheDisabled': True})
+        patterns = self.blocked_urls or list(DEFAULT_BLOCKED_URLS)
+        results = {}
+        for mode, blocked in (('sem_bloqueio', []), ('com_bloqueio', patterns)):
+            self.set_blocked_urls(blocked)
+            self._read_network_log()  # Descartar eventos anteriores
+
+            totals = {'bytes': 0, 'requests': 0, 'blocked': 0, 'load_seconds': 0.0}
+            for url in urls:
+                start = time.perf_counter()
+                self.driver.get(url)
+                load_seconds = time.perf_counter() - start
+                time.sleep(0.8)
+                stats = self._read_network_log() or {}
+                stats['load_seconds'] = load_seconds
+                for key in totals:
+                    totals[key] += stats.get(key, 0)
+
+            results[mode] = {key: round(value / max(len(urls), 1), 3) for key, value in totals.items()}
+            print(f"📶 {mode}: {results[mode]}")
+
+        self.driver.execute_cdp_cmd('Network.setCacheDisabled', {'cacheDisabled': False})
+        self.set_blocked_urls(self.blocked_urls)
+
+        base, blocked = results['sem_bloqueio'], results['com_bloqueio']
+        results['economia'] = {
+            'bytes': base['bytes'] - blocked['bytes'],
+            'load_seconds': round(base['load_seconds'] - blocked['load_seconds'], 3),
+            'bytes_pct': round((base['bytes'] - blocked['bytes']) / base['bytes'] * 100, 1) if base['bytes'] else 0.0,
+            'load_pct': round((base['load_seconds'] - blocked['load_seconds']) / base['load_seconds'] * 100, 1)
+            if base['load_seconds'] else 0.0
+        }
+        print(f"💰 Economia por empresa: {results['economia']['bytes'] / 1024:.0f} KB ({results['economia']['bytes_pct']}%) "
+              f"e {results['economia']['load_seconds']:.2f}s ({results['economia']['load_pct']}%)")
+        return results
+
+    @staticmethod
+    def has_required_contact(business_data, required_contacts):
+        """Verificar se a empresa tem pelo menos um dos contatos requeridos"""
+        return any(required_contacts.get(field) and business_data.get(field) for field in CONTACT_FIELDS)
+
+    def passes_contact_filter(self, business_data, required_contacts):
+        """
+        Filtro de contatos considerando o email ainda pendente
+
+        Se só o email do website pode fazer a empresa passar no filtro, ele é
+        buscado na hora (em vez de em segundo plano) para decidir.
+        """
+        if self.has_required_contact(business_data, required_contacts):
+            return True
+        if not (required_contacts.get('email') and business_data.get('email_pendente') and self.email_enricher):
+            return False
+
+        business_data['email'] = self.email_enricher.fetch_email(business_data['website'])
+        business_data['email_pendente'] = False
+        return bool(business_data['email'])
+
+    def queue_email_enrichment(self, business_data):
+        """Agendar a busca do email no website de uma empresa já salva"""
+        if self.email_enricher and business_data.get('email_pendente'):
+            self.email_enricher.submit(business_data)
+
     def _scroll_results(self, results_panel, max_results):
-        """Scroll no painel de resultados para carregar mais empresas"""
-        previous_height = 0
-        scroll_attempts = 0
-        max_scroll_attempts = 20
-        no_new_results_count = 0
-
-        while scroll_attempts < max_scroll_attempts:
-            # Contar resultados antes do scroll
-            result_count_before = len(self.driver.find_elements(By.CSS_SELECTOR, 'div[role="feed"] a[href*="/maps/place/"]'))
-
-            # Scroll até o final
-            self.driver.execute_script('arguments[0].scrollTop = arguments[0].scrollHeight', results_panel)
-            time.sleep(2)
-
-            # Verificar se carregou mais resultados
-            current_height = self.driver.execute_script('return arguments[0].scrollHeight', results_panel)
-            result_count_after = len(self.driver.find_elements(By.CSS_SELECTOR, 'div[role="feed"] a[href*="/maps/place/"]'))
-
-            # Detectar se Google Maps atingiu o limite
-            if current_height == previous_height and result_count_before == result_count_after:
-                scroll_attempts += 1
-                no_new_results_count += 1
-
-                # Se não carregou nada novo por 3 tentativas, provavelmente atingiu o limite do Google
-                if no_new_results_count >= 3:
-                    print(f"\n⚠️  Google Maps atingiu o limite de resultados ({result_count_after} empresas)")
-                    print(f"💡 Dica: Para encontrar mais empresas:")
-                    print(f"   • Divida por bairros/regiões")
-                    print(f"   • Use termos de busca mais específicos")
-                    print(f"   • Tente variações do setor\n")
-                    break
-            else:
-                scroll_attempts = 0
-                no_new_results_count = 0
+        """
+        Scroll no painel de resultados gerando os URLs novos de cada scroll
+
+        Cada scroll aguarda no navegador (MutationObserver) até chegarem novos
+        resultados, em vez de um intervalo fixo.
+        """
+        self.driver.set_script_timeout(SCROLL_WAIT_TIMEOUT + 5)
+
+        seen = set()
+        offset = 0
+        stalls = 0
+
+        while self.running and len(seen) < max_results:
+            batch = self.driver.execute_async_script(
+                SCROLL_AND_WAIT_SCRIPT, results_panel, offset, SCROLL_WAIT_TIMEOUT * 1000
+            )
+            offset = batch['total']
+
+            new_urls = 0
+            for url in batch['hrefs']:
+                if url and url not in seen and len(seen) < max_results:
+                    seen.add(url)
+                    new_urls += 1
+                    yield url
+
+            if batch['end']:
+                print(f"📌 Fim da lista de resultados ({len(seen)} empresas)")
+                break
 
-            previous_height = current_height
+            if new_urls:
+                stalls = 0
+                continue
 
-            # Verificar quantidade de resultados
-            if result_count_after >= max_results:
+            # Se não carregou nada novo por algumas esperas, provavelmente atingiu o limite do Google
+            stalls += 1
+            if stalls >= SCROLL_MAX_STALLS:
+                print(f"\n⚠️  Google Maps atingiu o limite de resultados ({len(seen)} empresas)")
+                print(f"💡 Dica: Para encontrar mais empresas:")
+                print(f"   • Divida por bairros/regiões")
+                print(f"   • Use termos de busca mais específicos")
+                print(f"   • Tente variações do setor\n")
                 break
 
     def _extract_business_data(self, setor, cidade):
-        """Extrair dados da empresa da página"""
+        """Extrair dados da empresa da página (conforme self.extraction)"""
+        if self.extraction == 'webdriver':
+            return self._extract_business_data_webdriver(setor, cidade)
+
+        try:
+            if self.extraction == 'lxml':
+                snapshot = self._snapshot_from_page_source()
+            else:
+                snapshot = self.driver.execute_script(
+                    PLACE_SNAPSHOT_SCRIPT,
+                    {field: [css, attr] for field, (css, _, attr) in PLACE_FIELDS.items()}
+                )
+            return self._parse_place_snapshot(snapshot, setor, cidade)
+        except Exception as e:
+            print(f"❌ Erro ao extrair dados: {str(e)}")
+            return None
+
+    def _snapshot_from_page_source(self):
+        """Ler campos e links do page_source com lxml (mesmo formato do PLACE_SNAPSHOT_SCRIPT)"""
+        url = self.driver.current_url
+        tree = lxml_html.fromstring(self.driver.page_source)
+        tree.make_links_absolute(url)
+
+        fields = {}
+        for field, (_, xpath, attr) in PLACE_FIELDS.items():
+            elements = tree.xpath(xpath)
+            if not elements:
+                fields[field] = None
+            elif attr:
+                fields[field] = elements[0].get(attr)
+            else:
+                fields[field] = elements[0].text_content().strip()
+
+        return {'fields': fields, 'links': tree.xpath('//a/@href'), 'url': url}
+
+    def _parse_place_snapshot(self, snapshot, setor, cidade):
+        """Montar os dados da empresa a partir dos valores brutos da página"""
+        fields = snapshot['fields']
+        data = {
+            'nome': fields.get('nome'),
+            'endereco': fields.get('endereco'),
+            'telefone': fields.get('telefone'),
+            'whatsapp': self._format_phone_to_whatsapp(fields['telefone']) if fields.get('telefone') else None,
+            'website': fields.get('website'),
+            'email': None
+        }
+
+        # Tentar extrair email do website (ou deixar para o enriquecimento assíncrono)
+        if data['website']:
+            if self.email_enricher:
+                data['email_pendente'] = True
+            else:
+                data['email'] = self._extract_email_from_website(data['website'])
+
+        # Redes Sociais - a partir de todos os links da página
+        data.update(self._classify_social_links(snapshot.get('links') or []))
+
+        try:
+            data['rating'] = float(fields['rating'].replace(',', '.')) if fields.get('rating') else None
+        except ValueError:
+            data['rating'] = None
+
+        reviews_num = re.sub(r'\D', '', fields.get('total_reviews') or '')
+        data['total_reviews'] = int(reviews_num) if reviews_num else None
+
+        data['horario_funcionamento'] = fields.get('horario_funcionamento')
+        data['google_maps_url'] = snapshot.get('url')
+
+        # Adicionar setor e cidade
+        data['setor'] = setor
+        data['cidade'] = cidade
+        data['latitude'] = None
+        data['longitude'] = None
+
+        return data
+
+    def _extract_business_data_webdriver(self, setor, cidade):
+        """Extrair dados da empresa da página (um find_element por campo)"""
         data = {}
 
         try:
@@ -559,8 +1004,12 @@ class GoogleMapsScraper:
                 ).get_attribute('href')
                 data['website'] = website
 
-                # Tentar extrair email do website
-                data['email'] = self._extract_email_from_website(website)
+                # Tentar extrair email do website (ou deixar para o enriquecimento assíncrono)
+                if self.email_enricher:
+                    data['email'] = None
+                    data['email_pendente'] = bool(website)
+                else:
+                    data['email'] = self._extract_email_from_website(website)
             except NoSuchElementException:
                 data['website'] = None
                 data['email'] = None
@@ -629,33 +1078,49 @@ class GoogleMapsScraper:
             # Buscar todos os links da página
             all_links = self.driver.find_elements(By.TAG_NAME, 'a')
 
+            hrefs = []
             for link in all_links:
                 try:
-                    href = link.get_attribute('href')
-                    if not href:
-                        continue
+                    hrefs.append(link.get_attribute('href'))
+                except:
+                    continue
 
-                    # Instagram
-                    if 'instagram.com' in href and not social_links['instagram']:
-                        social_links['instagram'] = href
+            social_links = self._classify_social_links(hrefs)
 
-                    # Facebook
-                    elif ('facebook.com' in href or 'fb.com' in href) and not social_links['facebook']:
-                        social_links['facebook'] = href
+        except Exception as e:
+            pass
 
-                    # LinkedIn
-                    elif 'linkedin.com' in href and not social_links['linkedin']:
-                        social_links['linkedin'] = href
+        return social_links
 
-                    # Twitter/X
-                    elif ('twitter.com' in href or 'x.com' in href) and not social_links['twitter']:
-                        social_links['twitter'] = href
+    @staticmethod
+    def _classify_social_links(hrefs):
+        """Primeiro link de cada rede social entre os links da página"""
+        social_links = {
+            'instagram': None,
+            'facebook': None,
+            'linkedin': None,
+            'twitter': None
+        }
 
-                except:
-                    continue
+        for href in hrefs:
+            if not href:
+                continue
 
-        except Exception as e:
-            pass
+            # Instagram
+            if 'instagram.com' in href and not social_links['instagram']:
+                social_links['instagram'] = href
+
+            # Facebook
+            elif ('facebook.com' in href or 'fb.com' in href) and not social_links['facebook']:
+                social_links['facebook'] = href
+
+            # LinkedIn
+            elif 'linkedin.com' in href and not social_links['linkedin']:
+                social_links['linkedin'] = href
+
+            # Twitter/X
+            elif ('twitter.com' in href or 'x.com' in href) and not social_links['twitter']:
+                social_links['twitter'] = href
 
         return social_links
 
@@ -692,16 +1157,7 @@ class GoogleMapsScraper:
             if response.status_code == 200:
                 # Usar apenas o texto bruto sem BeautifulSoup para ser mais rápido
                 page_text = response.text[:10000]  # Apenas primeiros 10KB (otimização)
-
-                # Regex para email (mais eficiente)
-                email_pattern = r'\b[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}\b'
-                match = re.search(email_pattern, page_text)
-
-                if match:
-                    email = match.group()
-                    # Filtrar emails de exemplo
-                    if not any(x in email.lower() for x in ['example', 'test', 'sample', 'domain', 'noreply', 'no-reply']):
-                        return email
+                return find_email(page_text)
 
         except Exception:
             # Silenciar erros ao acessar website (timeout, SSL, etc)
@@ -709,203 +1165,6 @@ class GoogleMapsScraper:
 
         return None
 
-    def _save_or_update_business(self, db, business_data):
-        """Salvar ou atualizar empresa no banco de dados"""
-        # Verificar se empresa já existe (apenas por nome se não tiver endereço)
-        nome = business_data.get('nome')
-        endereco = business_data.get('endereco')
-
-        cursor = db.cursor
-
-        if endereco:
-            # Se tem endereço, verifica nome + endereço
-            existing = cursor.execute(
-                'SELECT * FROM empresas WHERE nome = ? AND endereco = ?',
-                (nome, endereco)
-            ).fetchone()
-        else:
-            # Se não tem endereço, verifica apenas nome
-            existing = cursor.execute(
-                'SELECT * FROM empresas WHERE nome = ?',
-                (nome,)
-            ).fetchone()
-
-        if existing:
-            existing_dict = dict(existing)
-
-            # Verificar se há novos dados de contato para atualizar
-            has_new_data = False
-            updates = []
-
-            # Verificar cada campo individualmente
-            if business_data.get('telefone') and not existing_dict.get('telefone'):
-                has_new_data = True
-                updates.append(f"telefone: {business_data.get('telefone')}")
-
-            if business_data.get('whatsapp') and not existing_dict.get('whatsapp'):
-                has_new_data = True
-                updates.append(f"whatsapp: {business_data.get('whatsapp')}")
-
-            if business_data.get('email') and not existing_dict.get('email'):
-                has_new_data = True
-                updates.append(f"email: {business_data.get('email')}")
-
-            if business_data.get('website') and not existing_dict.get('website'):
-                has_new_data = True
-                updates.append(f"website: {business_data.get('website')}")
-
-            if business_data.get('instagram') and not existing_dict.get('instagram'):
-                has_new_data = True
-                updates.append(f"instagram: {business_data.get('instagram')}")
-
-            if business_data.get('facebook') and not existing_dict.get('facebook'):
-                has_new_data = True
-                updates.append(f"facebook: {business_data.get('facebook')}")
-
-            if business_data.get('linkedin') and not existing_dict.get('linkedin'):
-                has_new_data = True
-                updates.append(f"linkedin: {business_data.get('linkedin')}")
-
-            if business_data.get('twitter') and not existing_dict.get('twitter'):
-                has_new_data = True
-                updates.append(f"twitter: {business_data.get('twitter')}")
-
-            if has_new_data:
-                # Atualizar apenas os campos que estão vazios
-                cursor.execute('''
-                    UPDATE empresas SET
-                        telefone = COALESCE(telefone, ?),
-                        whatsapp = COALESCE(whatsapp, ?),
-                        email = COALESCE(email, ?),
-                        website = COALESCE(website, ?),
-                        instagram = COALESCE(instagram, ?),
-                        facebook = COALESCE(facebook, ?),
-                        linkedin = COALESCE(linkedin, ?),
-                        twitter = COALESCE(twitter, ?),
-                        rating = COALESCE(?, rating),
-                        total_reviews = COALESCE(?, total_reviews),
-                        horario_funcionamento = COALESCE(horario_funcionamento, ?),
-                        data_atualizacao = CURRENT_TIMESTAMP
-                    WHERE id = ?
-                ''', (
-                    business_data.get('telefone'),
-                    business_data.get('whatsapp'),
-                    business_data.get('email'),
-                    business_data.get('website'),
-                    business_data.get('instagram'),
-                    business_data.get('facebook'),
-                    business_data.get('linkedin'),
-                    business_data.get('twitter'),
-                    business_data.get('rating'),
-                    business_data.get('total_reviews'),
-                    business_data.get('horario_funcionamento'),
-                    existing_dict['id']
-                ))
-                db.conn.commit()
-                print(f"   📝 Atualizando: {', '.join(updates)}")
-                return 'updated'
-            else:
-                print(f"   ℹ️  Empresa já tem todos os dados disponíveis")
-                return 'skipped'
-        else:
-            # Inserir nova empresa
-            result = db.insert_empresa(business_data)
-            if result:
-                return 'saved'
-            else:
-                # Se insert_empresa retornou None/0, pode ser UNIQUE constraint
-                # Buscar empresa que pode ter sido ignorada e tentar atualizar
-                print(f"   ⚠️  INSERT ignorado (possível duplicata) - buscando para atualizar...")
-
-                # Tentar encontrar a empresa pelo nome (pode ter endereço levemente diferente)
-                cursor = db.cursor
-                similar = cursor.execute(
-                    'SELECT * FROM empresas WHERE nome = ?',
-                    (nome,)
-                ).fetchone()
-
-                if similar:
-                    similar_dict = dict(similar)
-                    print(f"   🔍 Empresa encontrada: {similar_dict['nome']} (ID: {similar_dict['id']})")
-                    print(f"      Endereço BD: {similar_dict.get('endereco', 'N/A')}")
-                    print(f"      Endereço novo: {endereco or 'N/A'}")
-
-                    # Verificar se há novos dados de contato para atualizar
-                    has_new_data = False
-                    updates = []
-
-                    if business_data.get('telefone') and not similar_dict.get('telefone'):
-                        has_new_data = True
-                        updates.append(f"telefone: {business_data.get('telefone')}")
-
-                    if business_data.get('whatsapp') and not similar_dict.get('whatsapp'):
-                        has_new_data = True
-                        updates.append(f"whatsapp: {business_data.get('whatsapp')}")
-
-                    if business_data.get('email') and not similar_dict.get('email'):
-                        has_new_data = True
-                        updates.append(f"email: {business_data.get('email')}")
-
-                    if business_data.get('website') and not similar_dict.get('website'):
-                        has_new_data = True
-                        updates.append(f"website: {business_data.get('website')}")
-
-                    if business_data.get('instagram') and not similar_dict.get('instagram'):
-                        has_new_data = True
-                        updates.append(f"instagram: {business_data.get('instagram')}")
-
-                    if business_data.get('facebook') and not similar_dict.get('facebook'):
-                        has_new_data = True
-                        updates.append(f"facebook: {business_data.get('facebook')}")
-
-                    if business_data.get('linkedin') and not similar_dict.get('linkedin'):
-                        has_new_data = True
-                        updates.append(f"linkedin: {business_data.get('linkedin')}")
-
-                    if business_data.get('twitter') and not similar_dict.get('twitter'):
-                        has_new_data = True
-                        updates.append(f"twitter: {business_data.get('twitter')}")
-
-                    if has_new_data:
-                        cursor.execute('''
-                            UPDATE empresas SET
-                                telefone = COALESCE(telefone, ?),
-                                whatsapp = COALESCE(whatsapp, ?),
-                                email = COALESCE(email, ?),
-                                website = COALESCE(website, ?),
-                                instagram = COALESCE(instagram, ?),
-                                facebook = COALESCE(facebook, ?),
-                                linkedin = COALESCE(linkedin, ?),
-                                twitter = COALESCE(twitter, ?),
-                                rating = COALESCE(?, rating),
-                                total_reviews = COALESCE(?, total_reviews),
-                                horario_funcionamento = COALESCE(horario_funcionamento, ?),
-                                data_atualizacao = CURRENT_TIMESTAMP
-                            WHERE id = ?
-                        ''', (
-                            business_data.get('telefone'),
-                            business_data.get('whatsapp'),
-                            business_data.get('email'),
-                            business_data.get('website'),
-                            business_data.get('instagram'),
-                            business_data.get('facebook'),
-                            business_data.get('linkedin'),
-                            business_data.get('twitter'),
-                            business_data.get('rating'),
-                            business_data.get('total_reviews'),
-                            business_data.get('horario_funcionamento'),
-                            similar_dict['id']
-                        ))
-                        db.conn.commit()
-                        print(f"   ✅ Atualizado com: {', '.join(updates)}")
-                        return 'updated'
-                    else:
-                        print(f"   ℹ️  Empresa já tem todos os dados disponíveis")
-                        return 'skipped'
-                else:
-                    print(f"   ❌ Erro inesperado: INSERT falhou mas empresa não foi encontrada")
-                    return 'skipped'
-
     def stop(self):
         """Parar o scraping"""
         self.running = False
@@ -0,0 +1,477 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Pool de navegadores para o scraping do Google Maps
+- URLs das empresas coletados uma única vez por busca
+- Extração dos detalhes distribuída entre N Chromes headless (um por worker),
+  começando enquanto o scroll da busca ainda carrega resultados
+- Um único escritor grava no banco e no checkpoint por URL
+"""
+
+import os
+import sys
+import queue
+import threading
+
+# Adicionar src ao path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from database.db import parse_place_id, PLACE_TTL_DAYS
+from scraper.google_maps_scraper import (
+    GoogleMapsScraper, BATCH_COMMIT, CONTACT_FIELDS, DEFAULT_BLOCKED_URLS, summarize_network_stats
+)
+from utils.logger import Logger
+
+logger = Logger()
+
+DEFAULT_WORKERS = int(os.getenv('SCRAPER_WORKERS', min(4, os.cpu_count() or 1)))
+
+# O que fazer com empresas visitadas dentro da validade (places_index): 'skip' não
+# carrega a página, 'defer' carrega somente depois de todas as outras
+KNOWN_PLACE_POLICIES = ('skip', 'defer')
+
+# Marca de fim da fila de tarefas (um por worker)
+_DONE = object()
+
+# Resultado de um worker cujo navegador não iniciou
+_WORKER_FAILED = object()
+
+# Resultado de uma tarefa devolvida sem executar (parada solicitada)
+_NOT_RUN = object()
+
+
+class ScraperPool:
+    """
+    Distribuir a extração de empresas entre vários GoogleMapsScraper
+
+    Cada worker é uma thread com o próprio Chrome (porta de depuração livre),
+    então a vazão cresce com os núcleos disponíveis. Os workers só navegam e
+    extraem; o banco é acessado apenas pela thread que chama search(), que
+    consome os resultados à medida que chegam.
+
+    O progresso de cada URL fica em search_checkpoint_urls: ao retomar uma
+    busca, apenas URLs pendentes ou com erro são visitados novamente. Empresas,
+    places_index e checkpoint são gravados em lote a cada BATCH_COMMIT URLs.
+
+    Com o eventlet (monkey_patch), as threads dos workers são greenlets e as
+    chamadas ao ChromeDriver (HTTP) cedem a vez entre si.
+
+    Exemplo:
+        with ScraperPool(workers=4) as pool:
+            empresas = pool.search_businesses('Padaria', 'São Paulo', 100, db=db)
+    """
+
+    def __init__(self, workers=DEFAULT_WORKERS, headless=True, scraper_factory=None, email_enricher=None,
+                 extraction='script', blocked_urls=DEFAULT_BLOCKED_URLS,
+                 known_place_ttl_days=PLACE_TTL_DAYS, known_places='skip'):
+        """
+        Args:
+            workers (int): Quantidade de navegadores em paralelo
+            headless (bool): Rodar os navegadores sem janela
+            scraper_factory (callable): Cria o scraper de um worker (padrão: GoogleMapsScraper)
+            email_enricher (EmailEnricher): Enriquecimento de emails compartilhado pelos workers
+            extraction (str): Modo de extração dos workers (ver EXTRACTION_MODES)
+            blocked_urls (list): Padrões de URL bloqueados nos navegadores dos workers
+            known_place_ttl_days (float): Validade de uma visita (0/None = visitar sempre)
+            known_places (str): Tratamento das empresas visitadas (ver KNOWN_PLACE_POLICIES)
+        """
+        if known_places not in KNOWN_PLACE_POLICIES:
+            raise ValueError(f'Tratamento de empresas conhecidas inválido: {known_places}')
+
+        self.workers = max(1, int(workers))
+        self.headless = headless
+        self.scraper_factory = scraper_factory or (
+            lambda: GoogleMapsScraper(
+                headless=self.headless, debugging_port=0,
+                email_enricher=email_enricher, extraction=extraction, blocked_urls=blocked_urls
+            )
+        )
+        self.scrapers = [None] * self.workers
+        self.known_place_ttl_days = known_place_ttl_days
+        self.known_places = known_places
+        self.running = True
+
+    def _get_scraper(self, slot):
+        """Scraper do worker (criado na primeira utilização e reaproveitado)"""
+        if self.scrapers[slot] is None:
+            self.scrapers[slot] = self.scraper_factory()
+        return self.scrapers[slot]
+
+    def _worker(self, slot, tasks, results, max_results):
+        """
+        Executar tarefas da fila até receber _DONE
+
+        ('collect', setor, cidade) gera um ('url', setor, cidade) por URL encontrado
+        durante o scroll e, ao final, o resultado da própria tarefa;
+        ('scrape', setor, cidade, url) gera os dados da empresa (None se a
+        extração falhou). Resultados: (tarefa, resultado, erro, scraper), com
+        resultado _NOT_RUN para tarefas não executadas.
+        """
+        try:
+            scraper = self._get_scraper(slot)
+        except Exception as e:
+            logger.error(f'[scraper {slot}] Falha ao iniciar o navegador: {e}')
+            results.put((_WORKER_FAILED, None, e, None))
+            return
+
+        while True:
+            task = tasks.get()
+            if task is _DONE:
+                return
+
+            # Parada solicitada: devolver as tarefas restantes sem executar
+            if not self.running:
+                results.put((task, _NOT_RUN, None, scraper))
+                continue
+
+            try:
+                if task[0] == 'collect':
+                    _, setor, cidade = task
+                    total = 0
+                    for url in scraper.iter_business_urls(setor, cidade, max_results):
+                        results.put((('url', setor, cidade), url, None, scraper))
+                        total += 1
+                        if not self.running:
+                            break
+                    results.put((task, total, None, scraper))
+                else:
+                    _, setor, cidade, url = task
+                    results.put((task, scraper.scrape_place(url, setor, cidade), None, scraper))
+            except Exception as e:
+                results.put((task, None, e, scraper))
+
+    def search(self, queries, max_results=50, db=None, progress_callback=None,
+               continue_from_checkpoint=True, required_contacts=None):
+        """
+        Buscar empresas de uma ou mais buscas usando todos os workers
+
+        A coleta e a extração se sobrepõem: cada URL encontrado no scroll de uma
+        busca vira na hora uma tarefa para os workers livres.
+
+        Args:
+            queries (list): [(setor, cidade), ...]
+            max_results (int): Máximo de URLs coletados por busca
+            db (Database): Banco para salvar empresas e checkpoints (opcional)
+            progress_callback (callable): Recebe o mesmo dict de progresso de
+                GoogleMapsScraper.search_businesses ('total' cresce durante a coleta)
+            continue_from_checkpoint (bool): Pular URLs já processados; se False,
+                o checkpoint das buscas é zerado
+            required_contacts (dict): Filtros de contato (padrão: qualquer contato)
+
+        Returns:
+            list: Empresas que atendem aos filtros (sem URLs repetidos entre buscas)
+        """
+        if required_contacts is None:
+            required_contacts = dict.fromkeys(CONTACT_FIELDS, True)
+
+        queries = list(dict.fromkeys(queries))
+
+        # Buscas já concluídas não são repetidas
+        if db:
+            for setor, cidade in list(queries):
+                if not continue_from_checkpoint:
+                    db.reset_checkpoint(setor, cidade)
+                    continue
+                checkpoint = db.get_checkpoint(setor, cidade)
+                if checkpoint and checkpoint['status'] == 'concluido':
+                    print(f"✅ Busca '{setor} em {cidade}' já foi concluída anteriormente (resete o checkpoint para repetir)")
+                    queries.remove((setor, cidade))
+
+        if not queries:
+            return []
+
+        tasks = queue.Queue()
+        results = queue.Queue()
+        outstanding = 0  # Tarefas enfileiradas ainda sem resultado
+        total_urls = 0
+        owners = {}  # url -> buscas que o encontraram (URLs repetidos são visitados uma vez)
+        finished_urls = {}  # url -> (status, resultado) já gravado nesta execução
+        deferred = []  # Tarefas de empresas conhecidas, executadas por último ('defer')
+        known_count = 0
+
+        def refresh_checkpoint(setor, cidade):
+            """Manter o checkpoint em andamento com o total de URLs conhecidos"""
+            checkpoint = db.get_checkpoint(setor, cidade)
+            db.create_or_update_checkpoint(
+                setor, cidade,
+                total_encontrados=sum(db.get_checkpoint_url_counts(setor, cidade).values()),
+                total_processados=checkpoint['total_processados'] if checkpoint else 0,
+                total_salvos=checkpoint['total_salvos'] if checkpoint else 0,
+                ultimo_indice=checkpoint['ultimo_indice'] if checkpoint else 0,
+                status='em_andamento'
+            )
+
+        def is_known(url):
+            """Empresa visitada dentro da validade"""
+            return bool(db and self.known_place_ttl_days and db.get_fresh_place_ids(
+                [parse_place_id(url)], self.known_place_ttl_days
+            ))
+
+        def add_url(query, url, new=True):
+            """Registrar um URL da busca; retorna True se virou uma tarefa nova"""
+            nonlocal outstanding, total_urls, known_count
+            if url in owners:
+                if query not in owners[url]:
+                    owners[url].append(query)
+                    if db and url in finished_urls:
+                        db.mark_checkpoint_url(*query, url, *finished_urls[url])
+                return False
+            if not new:
+                return False
+            owners[url] = [query]
+
+            if is_known(url):
+                known_count += 1
+                if self.known_places == 'defer':
+                    deferred.append(('scrape', *query, url))
+                else:
+                    finished_urls[url] = ('processado', 'known')
+                    db.mark_checkpoint_url(*query, url, 'processado', 'known')
+                return False
+
+            tasks.put(('scrape', *query, url))
+            outstanding += 1
+            total_urls += 1
+            return True
+
+        # Coleta primeiro; URLs pendentes de uma execução anterior já entram na fila
+        for query in queries:
+            tasks.put(('collect', *query))
+            outstanding += 1
+
+            if db:
+                refresh_checkpoint(*query)
+                for url in db.get_checkpoint_urls(*query, status=['pendente', 'erro']):
+                    add_url(query, url)
+
+        print(f"🔍 {len(queries)} busca(s) com {self.workers} navegador(es) (coleta e extração em paralelo)")
+
+        workers_alive = self.workers
+        for slot in range(self.workers):
+            threading.Thread(
+                target=self._worker, args=(slot, tasks, results, max_results), daemon=True
+            ).start()
+
+        businesses = []
+        processed_count = 0
+        saved_count = 0
+        updated_count = 0
+        skipped_count = 0
+
+        # URLs processados aguardando gravação: (número, url, busca, dados, atende aos filtros, erro, scraper)
+        pending = []
+
+        def flush_pending():
+            """Gravar empresas, places_index e checkpoint dos URLs pendentes em lote"""
+            nonlocal saved_count, updated_count, skipped_count
+            if not pending:
+                return
+
+            matched = [business_data for _, _, _, business_data, ok, error, _ in pending if ok and not error]
+            if db and matched:
+                results = iter(db.upsert_empresas(matched)['results'])
+            else:
+                results = iter([{'status': 'saved', 'id': None}] * len(matched))
+
+            places = []
+            url_updates = []
+            increments = {}  # busca -> [processados, salvos]
+            status = 'no_contact'
+            flush_saved = flush_updated = 0
+            for number, url, query, business_data, ok, error, owner_scraper in pending:
+                if error:
+                    url_updates.extend((*owner, url, 'erro', str(error)[:200]) for owner in owners[url])
+                    continue
+
+                nome = business_data.get('nome') or 'Sem nome'
+                status = 'no_contact'
+                if ok:
+                    result = next(results)
+                    status = result['status']
+                    if result['id'] is not None:
+                        business_data['id'] = result['id']
+
+                    if status == 'saved':
+                        saved_count += 1
+                        flush_saved += 1
+                        print(f"✅ [{number}/{total_urls}] {nome} - SALVO")
+                    elif status == 'updated':
+                        updated_count += 1
+                        flush_updated += 1
+                        print(f"🔄 [{number}/{total_urls}] {nome} - ATUALIZADO")
+                    else:
+                        skipped_count += 1
+                        print(f"⏭️  [{number}/{total_urls}] {nome} - JÁ EXISTE (sem novos dados)")
+
+                    owner_scraper.queue_email_enrichment(business_data)
+
+                finished_urls[url] = ('processado', status)
+                places.append((url, business_data.get('nome'), status))
+                for owner in owners[url]:
+                    url_updates.append((*owner, url, 'processado', status))
+                    counts = increments.setdefault(owner, [0, 0])
+                    counts[0] += 1
+                    counts[1] += 1 if status == 'saved' and owner == query else 0
+
+            if db:
+                db.mark_places_scraped(places)
+                db.mark_checkpoint_urls(url_updates)
+                for owner, (processados, salvos) in increments.items():
+                    db.update_checkpoint_progress(*owner, processados_increment=processados, salvos_increment=salvos)
+
+            # Callback de progresso (um por lote gravado)
+            if progress_callback:
+                progress_callback({
+                    'processed': processed_count,
+                    'total': total_urls,
+                    'saved': saved_count,
+                    'updated': updated_count,
+                    'skipped': skipped_count,
+                    'current_business': (pending[-1][3] or {}).get('nome') or 'Sem nome',
+                    'status': 'saved' if flush_saved else 'updated' if flush_updated else status
+                })
+
+            pending.clear()
+
+        while workers_alive > 0:
+            if len(pending) >= BATCH_COMMIT:
+                flush_pending()
+
+            if outstanding == 0:
+                if not deferred or not self.running:
+                    break
+                print(f"🔁 Visitando {len(deferred)} empresas já conhecidas (adiadas)")
+                for task in deferred:
+                    tasks.put(task)
+                outstanding += len(deferred)
+                total_urls += len(deferred)
+                deferred.clear()
+
+            task, business_data, error, scraper = results.get()
+
+            if task is _WORKER_FAILED:
+                workers_alive -= 1
+                continue
+
+            # URL encontrado durante o scroll de uma busca
+            if task[0] == 'url':
+                query, url = task[1:], business_data
+                # URLs já registrados no checkpoint estão na fila (pendentes) ou já foram processados
+                add_url(query, url, new=not db or db.add_checkpoint_urls(*query, [url]) > 0)
+                continue
+
+            outstanding -= 1
+
+            # Tarefa devolvida sem executar (parada solicitada): continua pendente
+            if business_data is _NOT_RUN:
+                continue
+
+            if task[0] == 'collect':
+                setor, cidade = task[1:]
+                if error:
+                    print(f"❌ Erro ao coletar '{setor} em {cidade}': {error}")
+                elif db:
+                    refresh_checkpoint(setor, cidade)
+                continue
+
+            setor, cidade, url = task[1:]
+
+            # scrape_place devolve None quando a extração falha
+            if business_data is None and error is None:
+                error = 'Falha ao extrair dados da empresa'
+
+            processed_count += 1
+            nome = (business_data or {}).get('nome') or 'Sem nome'
+
+            if error:
+                print(f"❌ [{processed_count}/{total_urls}] Erro ao processar empresa: {error}")
+                pending.append((processed_count, url, (setor, cidade), business_data, False, error, scraper))
+                continue
+
+            ok = bool(business_data.get('nome')) and scraper.passes_contact_filter(business_data, required_contacts)
+            if ok:
+                businesses.append(business_data)
+            else:
+                skipped_count += 1
+                print(f"⏭️  [{processed_count}/{total_urls}] {nome} - NÃO ATENDE FILTROS")
+            pending.append((processed_count, url, (setor, cidade), business_data, ok, None, scraper))
+
+        # Gravar o último lote (fim das buscas ou parada solicitada)
+        flush_pending()
+
+        for _ in range(self.workers):
+            tasks.put(_DONE)
+
+        if workers_alive == 0:
+            print("❌ Nenhum navegador do pool pôde ser iniciado")
+
+        # Buscas sem URLs pendentes ficam concluídas
+        if db and self.running and workers_alive > 0:
+            for setor, cidade in queries:
+                if not db.get_checkpoint_urls(setor, cidade, status=['pendente', 'erro']):
+                    db.mark_checkpoint_complete(setor, cidade)
+
+        print(f"\n{'='*50}")
+        print(f"📊 Resumo da busca ({self.workers} navegadores):")
+        print(f"   Total processados: {processed_count}")
+        print(f"   💾 Salvos: {saved_count}")
+        print(f"   🔄 Atualizados: {updated_count}")
+        print(f"   ⏭️  Ignorados: {skipped_count}")
+        if known_count:
+            print(f"   📌 Já conhecidas (visitadas há menos de {self.known_place_ttl_days} dias): {known_count}"
+                  f"{' - adiadas' if self.known_places == 'defer' else ' - puladas'}")
+        network = self.get_network_stats()
+        if network.get('avg_bytes') is not None:
+            print(f"   📶 Média por empresa: {network['avg_bytes'] / 1024:.0f} KB, "
+                  f"{network['avg_blocked']} bloqueadas, carga em {network['avg_load_seconds']:.2f}s")
+        print(f"{'='*50}\n")
+
+        return businesses
+
+    def search_businesses(self, setor, cidade, max_results=50, **kwargs):
+        """Equivalente a GoogleMapsScraper.search_businesses usando o pool"""
+        return self.search([(setor, cidade)], max_results, **kwargs)
+
+    def search_with_variations(self, setor, cidade, max_results_per_variation=50, **kwargs):
+        """Equivalente a GoogleMapsScraper.search_with_variations (variações coletadas em paralelo)"""
+        variations = self._get_scraper(0)._generate_search_variations(setor)
+        print(f"🔄 Variações de '{setor}': {', '.join(variations)}")
+        return self.search([(variation, cidade) for variation in variations], max_results_per_variation, **kwargs)
+
+    def search_by_neighborhoods(self, setor, cidade, neighborhoods, max_results_per_neighborhood=50, **kwargs):
+        """Equivalente a GoogleMapsScraper.search_by_neighborhoods (bairros coletados em paralelo)"""
+        queries = [(f"{setor} em {neighborhood}, {cidade}", "") for neighborhood in neighborhoods]
+        return self.search(queries, max_results_per_neighborhood, **kwargs)
+
+    def get_network_stats(self):
+        """Tráfego somado dos workers, com médias por empresa"""
+        totals = {'places': 0, 'bytes': 0, 'requests': 0, 'blocked': 0, 'load_seconds': 0.0}
+        for scraper in self.scrapers:
+            for key, value in (getattr(scraper, 'network_stats', None) or {}).items():
+                totals[key] = totals.get(key, 0) + value
+        return summarize_network_stats(totals)
+
+    def stop(self):
+        """Parar o scraping (os workers terminam a empresa atual)"""
+        self.running = False
+        for scraper in self.scrapers:
+            if scraper:
+                scraper.stop()
+
+    def close(self):
+        """Fechar todos os navegadores"""
+        self.running = False
+        for slot, scraper in enumerate(self.scrapers):
+            if scraper:
+                try:
+                    scraper.close()
+                except Exception as e:
+                    logger.error(f'[scraper {slot}] Erro ao fechar o navegador: {e}')
+            self.scrapers[slot] = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
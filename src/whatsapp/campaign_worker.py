@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Worker da fila persistente de campanhas (tabela campaign_jobs)
+- Reserva jobs pendentes e executa o handler do tipo da campanha
+- Heartbeat periódico; jobs sem heartbeat são retomados por outro worker
+- Parada/cancelamento percebidos pelo handler via should_stop()
+"""
+
+import os
+import sys
+import time
+import socket
+import threading
+
+# Adicionar src ao path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from utils.logger import Logger
+
+logger = Logger()
+
+DEFAULT_POLL_INTERVAL = 2.0  # Segundos entre consultas à fila vazia
+DEFAULT_HEARTBEAT_INTERVAL = 10.0  # Segundos entre heartbeats de um job em execução
+DEFAULT_STALE_AFTER = 60.0  # Segundos sem heartbeat para considerar o worker morto
+DEFAULT_RETRY_DELAY = 60  # Segundos até tentar de novo um job devolvido à fila
+
+# Resultado de um handler que devolve o job à fila (ex.: nenhuma sessão conectada)
+RETRY = 'pendente'
+
+
+class CampaignWorker:
+    """
+    Executar, um de cada vez, os jobs de campanha de determinados tipos
+
+    Cada handler recebe (job, should_stop) e retorna o status final do job:
+    'concluido' (padrão se retornar None), 'pausado', 'erro' ou RETRY para
+    voltar à fila depois de retry_delay segundos. Exceções viram 'erro'.
+
+    Os handlers retomam a partir do progresso gravado na campanha
+    (job['campanha_id'] / ultimo_indice), então um job reassumido após uma
+    queda continua de onde parou.
+
+    Exemplo:
+        worker = CampaignWorker(db, {'whatsapp': run_whatsapp_job}, name='selenium')
+        worker.start()
+    """
+
+    def __init__(self, db, handlers, name='worker', poll_interval=DEFAULT_POLL_INTERVAL,
+                 heartbeat_interval=DEFAULT_HEARTBEAT_INTERVAL, stale_after=DEFAULT_STALE_AFTER,
+                 retry_delay=DEFAULT_RETRY_DELAY, sleep=time.sleep):
+        """
+        Args:
+            db (Database): Banco de dados (fila campaign_jobs)
+            handlers (dict): {kind: handler(job, should_stop)}
+            name (str): Nome do worker (parte do worker_id)
+            poll_interval (float): Espera com a fila vazia
+            heartbeat_interval (float): Intervalo entre heartbeats
+            stale_after (float): Segundos sem heartbeat para retomar um job de outro worker
+            retry_delay (float): Espera antes de repetir um job devolvido com RETRY
+            sleep (callable): Função de espera (ex.: socketio.sleep)
+        """
+        self.db = db
+        self.handlers = handlers
+        self.name = name
+        self.worker_id = f'{socket.gethostname()}:{os.getpid()}:{name}'
+        self.poll_interval = poll_interval
+        self.heartbeat_interval = heartbeat_interval
+        self.stale_after = stale_after
+        self.retry_delay = retry_delay
+        self.sleep = sleep
+
+        self.current_job = None
+        self._stop_job = False
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        """Iniciar o loop do worker em segundo plano"""
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self.run_forever, daemon=True)
+        self._thread.start()
+        logger.info(f'Worker de campanhas {self.worker_id} iniciado ({", ".join(self.handlers)})')
+
+    def shutdown(self):
+        """Parar o loop (o job atual é interrompido e fica pausado)"""
+        self._running = False
+        self._stop_job = True
+
+    def run_forever(self):
+        """Reservar e executar jobs até shutdown()"""
+        while self._running:
+            try:
+                job = self.db.claim_job(self.worker_id, list(self.handlers), stale_after=self.stale_after)
+            except Exception as e:
+                logger.error(f'[{self.name}] Erro ao consultar fila de campanhas: {e}')
+                job = None
+
+            if job:
+                self.run_job(job)
+            else:
+                self.sleep(self.poll_interval)
+
+    def run_job(self, job):
+        """Executar um job reservado mantendo o heartbeat"""
+        self.current_job = job
+        self._stop_job = False
+        done = threading.Event()
+
+        def heartbeat():
+            while not done.wait(self.heartbeat_interval):
+                try:
+                    if not self.db.heartbeat_job(job['id'], self.worker_id):
+                        # Cancelado ou assumido por outro worker
+                        self._stop_job = True
+                except Exception as e:
+                    logger.error(f'[{self.name}] Erro no heartbeat do job {job["id"]}: {e}')
+
+        threading.Thread(target=heartbeat, daemon=True).start()
+
+        logger.info(f'[{self.name}] Executando job {job["id"]} ({job["kind"]}, tentativa {job["tentativas"]})')
+        status, erro = 'concluido', None
+        try:
+            status = self.handlers[job['kind']](job, self.should_stop) or 'concluido'
+        except Exception as e:
+            logger.error(f'[{self.name}] Erro no job {job["id"]}: {e}')
+            status, erro = 'erro', str(e)
+        finally:
+            done.set()
+            self.current_job = None
+
+        if status == RETRY:
+            self.db.release_job(job['id'], self.worker_id, retry_in=self.retry_delay)
+            logger.info(f'[{self.name}] Job {job["id"]} devolvido à fila (nova tentativa em {self.retry_delay}s)')
+        else:
+            self.db.finish_job(job['id'], self.worker_id, status, erro)
+            logger.info(f'[{self.name}] Job {job["id"]} finalizado: {status}')
+
+    def should_stop(self):
+        """Indica ao handler que o job atual deve parar"""
+        return self._stop_job
+
+    def stop(self, kind=None, job_id=None):
+        """
+        Interromper o job atual (se corresponder ao tipo/ID informado)
+
+        Returns:
+            bool: True se havia um job correspondente em execução
+        """
+        job = self.current_job
+        if not job or (kind and job['kind'] != kind) or (job_id and job['id'] != job_id):
+            return False
+        self._stop_job = True
+        return True
+
+    def get_info(self):
+        """Estado do worker"""
+        job = self.current_job
+        return {
+            'worker_id': self.worker_id,
+            'kinds': list(self.handlers),
+            'running': self._running,
+            'job_id': job['id'] if job else None,
+            'job_kind': job['kind'] if job else None
+        }
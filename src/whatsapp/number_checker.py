@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Verificação prévia de números no WhatsApp
+- Consulta em lote no serviço Baileys (onWhatsApp), sem abrir conversas
+- Resultado guardado em whatsapp_number_checks com validade (TTL)
+- Campanhas pulam de antemão os números que não existem no WhatsApp
+"""
+
+import os
+import sys
+
+# Adicionar src ao path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from database.db import NUMBER_CHECK_TTL_DAYS, normalize_phone
+from utils.logger import Logger
+
+logger = Logger()
+
+
+class NumberChecker:
+    """
+    Verificar em lote se números têm conta no WhatsApp
+
+    Números verificados dentro da validade vêm do cache no banco; apenas os
+    restantes são consultados no serviço Baileys. Se o serviço não estiver
+    conectado, só o cache é usado e os demais números ficam como não verificados.
+
+    Exemplo:
+        checker = NumberChecker(db, whatsapp_ptt_client)
+        validas, invalidas = checker.filter_empresas(empresas)
+    """
+
+    def __init__(self, db, client, ttl_days=NUMBER_CHECK_TTL_DAYS):
+        """
+        Args:
+            db (Database): Banco de dados (cache das verificações)
+            client (WhatsAppPTTClient): Cliente do serviço Baileys
+            ttl_days (float): Validade de uma verificação em dias
+        """
+        self.db = db
+        self.client = client
+        self.ttl_days = ttl_days
+
+    def check(self, numeros):
+        """
+        Verificar números (cache + serviço Baileys)
+
+        Args:
+            numeros (list): Números em qualquer formato
+
+        Returns:
+            dict: {numero_normalizado: True/False, ou None se não verificado}
+        """
+        normalizados = list(dict.fromkeys(n for n in map(normalize_phone, numeros) if n))
+        resultado = dict.fromkeys(normalizados)
+
+        cache = self.db.get_number_checks(normalizados, ttl_days=self.ttl_days)
+        resultado.update(cache)
+
+        pendentes = [numero for numero in normalizados if numero not in cache]
+        if pendentes:
+            if self.client.is_connected():
+                verificados = self.client.check_numbers(pendentes) or {}
+                self.db.save_number_checks(verificados)
+                resultado.update(verificados)
+            else:
+                logger.warning(f'Serviço Baileys não conectado: {len(pendentes)} números sem verificação')
+
+        existentes = sum(1 for existe in resultado.values() if existe)
+        inexistentes = sum(1 for existe in resultado.values() if existe is False)
+        logger.info(
+            f'Verificação de números: {existentes} existem, {inexistentes} não existem, '
+            f'{len(resultado) - existentes - inexistentes} não verificados ({len(cache)} do cache)'
+        )
+        return resultado
+
+    def filter_empresas(self, empresas, field='whatsapp'):
+        """
+        Separar empresas cujo número não existe no WhatsApp
+
+        Números não verificados continuam na lista de válidas (o envio decide).
+
+        Returns:
+            tuple: (validas, invalidas) na ordem original
+        """
+        verificacoes = self.check([empresa.get(field) for empresa in empresas])
+
+        validas, invalidas = [], []
+        for empresa in empresas:
+            if verificacoes.get(normalize_phone(empresa.get(field))) is False:
+                invalidas.append(empresa)
+            else:
+                validas.append(empresa)
+
+        return validas, invalidas
+
+    def mark(self, numero, existe):
+        """Registrar o resultado observado em um envio (ex.: número inválido)"""
+        self.db.save_number_checks({numero: existe})
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Pool de sessões WhatsApp Selenium para envio em paralelo
+- Uma sessão (navegador + perfil em whatsapp_sessions/<nome>) por número
+- Alvos da campanha distribuídos entre as sessões logadas
+- Limite de envio por sessão e progresso agregado
+"""
+
+import os
+import sys
+import time
+import queue
+import threading
+
+# Adicionar src ao path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from utils.logger import Logger
+
+logger = Logger()
+
+
+class RateLimiter:
+    """Intervalo mínimo entre envios de uma sessão"""
+
+    def __init__(self, min_interval):
+        self.min_interval = min_interval
+        self._last = None
+
+    def wait(self, sleep=time.sleep):
+        """
+        Aguardar até que o próximo envio seja permitido
+
+        Returns:
+            float: Instante (time.monotonic) liberado, para passar a mark() se o envio acontecer
+        """
+        if self._last is not None:
+            remaining = self._last + self.min_interval - time.monotonic()
+            if remaining > 0:
+                sleep(remaining)
+        return time.monotonic()
+
+    def mark(self, sent_at):
+        """Registrar um envio feito (alvos ignorados não ocupam o intervalo)"""
+        self._last = sent_at
+
+
+class SenderPool:
+    """
+    Gerenciar várias sessões WhatsAppSelenium e dividir campanhas entre elas
+
+    Cada sessão logada consome alvos de uma fila compartilhada, respeitando o
+    próprio intervalo mínimo entre envios. Assim a vazão cresce com o número de
+    sessões e sessões mais lentas simplesmente processam menos alvos.
+
+    Com o eventlet (monkey_patch), as threads dos workers são greenlets e as
+    chamadas ao ChromeDriver (HTTP) cedem a vez entre si.
+    """
+
+    def __init__(self):
+        self.sessions = {}  # nome -> WhatsAppSelenium
+        self.min_intervals = {}  # nome -> intervalo mínimo próprio (segundos)
+        self._lock = threading.Lock()
+
+    def add(self, session, min_interval=None):
+        """
+        Registrar uma sessão no pool
+
+        Args:
+            session (WhatsAppSelenium): Sessão (já iniciada ou não)
+            min_interval (float): Intervalo mínimo próprio entre envios (segundos)
+        """
+        self.sessions[session.session_name] = session
+        self.min_intervals[session.session_name] = min_interval
+        logger.info(f'Sessão {session.session_name} adicionada ao pool')
+
+    def remove(self, session_name):
+        """Remover sessão do pool (não fecha o navegador)"""
+        self.min_intervals.pop(session_name, None)
+        return self.sessions.pop(session_name, None)
+
+    def get(self, session_name):
+        """Obter sessão pelo nome"""
+        return self.sessions.get(session_name)
+
+    def logged_in(self, session_names=None):
+        """
+        Listar sessões ativas e logadas
+
+        Args:
+            session_names (list): Restringir a estas sessões (opcional)
+
+        Returns:
+            list: Sessões prontas para envio
+        """
+        names = session_names or list(self.sessions)
+        return [
+            self.sessions[name] for name in names
+            if name in self.sessions and self.sessions[name].driver and self.sessions[name].is_logged_in
+        ]
+
+    def get_info(self):
+        """Informações de todas as sessões do pool"""
+        return [
+            {**session.get_session_info(), 'min_interval': self.min_intervals.get(name)}
+            for name, session in self.sessions.items()
+        ]
+
+    def run(self, targets, send_fn, delay=30, progress_callback=None, should_stop=None,
+            session_names=None, sleep=time.sleep, skip_fn=None):
+        """
+        Enviar para todos os alvos usando as sessões logadas em paralelo
+
+        Args:
+            targets (list): Alvos (ex.: dicts de empresas)
+            send_fn (callable): send_fn(session, target) -> dict de resultado
+                (com 'success') ou None para ignorar o alvo
+            delay (float): Intervalo mínimo entre envios de cada sessão
+            progress_callback (callable): Recebe a cada alvo um dict com session,
+                current, total, success_count, failed_count, target e result
+                (chamado um de cada vez)
+            should_stop (callable): Retorna True para interromper a campanha
+            session_names (list): Usar apenas estas sessões (opcional)
+            sleep (callable): Função de espera (ex.: socketio.sleep)
+            skip_fn (callable): skip_fn(target) -> True para ignorar o alvo antes
+                de aguardar o intervalo (ex.: já enviado)
+
+        Returns:
+            dict: total, processed, success, failed, stopped e sessions (envios por sessão)
+        """
+        sessions = self.logged_in(session_names)
+        if not sessions:
+            raise RuntimeError('Nenhuma sessão WhatsApp logada no pool')
+
+        pending = queue.Queue()
+        for target in targets:
+            pending.put(target)
+
+        stats = {
+            'total': len(targets),
+            'processed': 0,
+            'success': 0,
+            'failed': 0,
+            'stopped': False,
+            'sessions': {session.session_name: 0 for session in sessions}
+        }
+
+        logger.info(f'Enviando para {len(targets)} alvos com {len(sessions)} sessão(ões)')
+
+        def worker(session):
+            own_interval = self.min_intervals.get(session.session_name) or 0
+            limiter = RateLimiter(max(delay, own_interval))
+
+            while True:
+                if should_stop and should_stop():
+                    stats['stopped'] = True
+                    return
+
+                try:
+                    target = pending.get_nowait()
+                except queue.Empty:
+                    return
+
+                # Alvos ignorados não esperam nem ocupam o intervalo entre envios
+                if skip_fn and skip_fn(target):
+                    continue
+
+                sent_at = limiter.wait(sleep)
+
+                # Reverificar após a espera para não enviar depois de um pedido de parada
+                if should_stop and should_stop():
+                    stats['stopped'] = True
+                    return
+
+                try:
+                    result = send_fn(session, target)
+                except Exception as e:
+                    logger.error(f'[{session.session_name}] Erro ao enviar: {e}')
+                    result = {'success': False, 'error': str(e)}
+
+                # Alvo ignorado pelo send_fn (não conta no progresso nem no intervalo)
+                if result is None:
+                    continue
+                limiter.mark(sent_at)
+
+                with self._lock:
+                    stats['processed'] += 1
+                    stats['sessions'][session.session_name] += 1
+                    if result.get('success'):
+                        stats['success'] += 1
+                    else:
+                        stats['failed'] += 1
+
+                    if progress_callback:
+                        progress_callback({
+                            'session': session.session_name,
+                            'current': stats['processed'],
+                            'total': stats['total'],
+                            'success_count': stats['success'],
+                            'failed_count': stats['failed'],
+                            'target': target,
+                            'result': result
+                        })
+
+        workers = [
+            threading.Thread(target=worker, args=(session,), daemon=True)
+            for session in sessions
+        ]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+
+        return stats
+
+    def close_all(self):
+        """Fechar todas as sessões do pool"""
+        for session in list(self.sessions.values()):
+            session.close()
+        self.sessions.clear()
+        self.min_intervals.clear()
@@ -8,8 +8,13 @@ Comunica-se com o serviço Node.js Baileys para enviar áudios PTT
 
 import os
 import sys
+import json
+import time
+import hashlib
+import threading
 import requests
-from typing import Dict, Optional
+from requests.adapters import HTTPAdapter
+from typing import Dict, List, Optional
 
 # Adicionar src ao path
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
@@ -18,38 +23,75 @@ from utils.logger import Logger
 
 logger = Logger()
 
+CHECK_BATCH_SIZE = 1000  # Limite de números por requisição do serviço (/check-numbers)
+STATUS_TTL = 5.0  # Segundos que o status da conexão fica em cache
+POOL_SIZE = 10  # Conexões keep-alive mantidas com o serviço
+BATCH_POLL_INTERVAL = 2.0  # Segundos entre consultas ao progresso de um job
+BATCH_MAX_RECIPIENTS = 10000  # Destinatários por job (mesmo limite do serviço)
+BATCH_MAX_BODY = 4 * 1024 * 1024  # Tamanho máximo do JSON aceito pelo serviço (express.json)
+
 
 class WhatsAppPTTClient:
     """Cliente para enviar áudios PTT via serviço Baileys"""
 
-    def __init__(self, service_url: str = 'http://localhost:3001'):
+    def __init__(self, service_url: str = 'http://localhost:3001', status_ttl: float = STATUS_TTL):
         """
         Inicializar cliente PTT
 
         Args:
             service_url (str): URL do serviço Node.js Baileys
+            status_ttl (float): Segundos que o status da conexão fica em cache
         """
         self.service_url = service_url.rstrip('/')
+        self.status_ttl = status_ttl
+
+        # Sessão HTTP com conexões keep-alive reutilizadas entre requisições
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self._status = None
+        self._status_at = 0.0
+        self._media = {}  # (caminho, mtime, tamanho) -> mediaId registrado no serviço
+        self._lock = threading.Lock()
+
         logger.info(f'WhatsApp PTT Client inicializado: {self.service_url}')
 
-    def check_status(self) -> Dict:
+    def check_status(self, max_age: Optional[float] = None) -> Dict:
         """
         Verificar status da conexão WhatsApp no serviço
 
+        Args:
+            max_age (float): Idade máxima (s) do status em cache; 0 força a consulta
+                (padrão: status_ttl)
+
         Returns:
             dict: Status da conexão
         """
+        max_age = self.status_ttl if max_age is None else max_age
+        if self._status is not None and time.monotonic() - self._status_at < max_age:
+            return self._status
+
         try:
-            response = requests.get(f'{self.service_url}/status', timeout=5)
+            response = self.session.get(f'{self.service_url}/status', timeout=5)
             response.raise_for_status()
-            return response.json()
+            status = response.json()
         except Exception as e:
             logger.error(f'Erro ao verificar status: {e}')
-            return {
+            status = {
                 'connected': False,
                 'error': str(e)
             }
 
+        self._status = status
+        self._status_at = time.monotonic()
+        return status
+
+    def invalidate_status(self):
+        """Descartar o status em cache (ex.: após o serviço recusar um envio)"""
+        self._status = None
+
     def get_qr_code(self) -> Optional[str]:
         """
         Obter QR Code para login
@@ -58,7 +100,7 @@ class WhatsAppPTTClient:
             str: QR Code string ou None
         """
         try:
-            response = requests.get(f'{self.service_url}/qr', timeout=5)
+            response = self.session.get(f'{self.service_url}/qr', timeout=5)
             if response.status_code == 200:
                 data = response.json()
                 return data.get('qrCode')
@@ -77,7 +119,8 @@ class WhatsAppPTTClient:
         status = self.check_status()
         return status.get('connected', False)
 
-    def send_audio_ptt(self, phone: str, audio_path: str, empresa_nome: str = '') -> Dict:
+    def send_audio_ptt(self, phone: str, audio_path: Optional[str] = None, empresa_nome: str = '',
+                       media_id: Optional[str] = None) -> Dict:
         """
         Enviar áudio como PTT (Push-to-Talk)
 
@@ -85,6 +128,7 @@ class WhatsAppPTTClient:
             phone (str): Número do WhatsApp (formato: +5511999999999 ou 11999999999)
             audio_path (str): Caminho do arquivo de áudio
             empresa_nome (str): Nome do contato (opcional)
+            media_id (str): Áudio já registrado (upload_audio); dispensa ler o arquivo
 
         Returns:
             dict: Resultado do envio
@@ -101,7 +145,7 @@ class WhatsAppPTTClient:
                 }
 
             # Verificar se arquivo existe
-            if not os.path.exists(audio_path):
+            if not media_id and not (audio_path and os.path.exists(audio_path)):
                 return {
                     'success': False,
                     'phone': phone,
@@ -117,33 +161,30 @@ class WhatsAppPTTClient:
             if not clean_phone.startswith('55') and len(clean_phone) == 11:
                 clean_phone = '55' + clean_phone
 
-            # Preparar dados
-            with open(audio_path, 'rb') as audio_file:
-                files = {'audio': (os.path.basename(audio_path), audio_file)}
-                data = {
-                    'phone': clean_phone,
-                    'name': empresa_nome
-                }
+            # Áudio enviado ao serviço uma única vez e referenciado pelo ID
+            media_id = media_id or self.upload_audio(audio_path)
+            response = self._post_ptt(clean_phone, empresa_nome, media_id)
 
-                # Enviar requisição
-                response = requests.post(
-                    f'{self.service_url}/send-ptt',
-                    files=files,
-                    data=data,
-                    timeout=30
-                )
+            # Áudio removido do serviço: registrar novamente e repetir
+            if response.status_code == 404 and audio_path and os.path.exists(audio_path):
+                media_id = self.upload_audio(audio_path, force=True)
+                response = self._post_ptt(clean_phone, empresa_nome, media_id)
 
-                response.raise_for_status()
-                result = response.json()
+            if response.status_code == 400:
+                self.invalidate_status()  # Ex.: WhatsApp desconectado no serviço
 
-                if result.get('success'):
-                    logger.success(f'PTT enviado com sucesso para {empresa_nome or phone}')
-                else:
-                    logger.error(f'Falha ao enviar PTT: {result.get("error")}')
+            response.raise_for_status()
+            result = response.json()
+
+            if result.get('success'):
+                logger.success(f'PTT enviado com sucesso para {empresa_nome or phone}')
+            else:
+                logger.error(f'Falha ao enviar PTT: {result.get("error")}')
 
-                return result
+            return result
 
         except requests.exceptions.ConnectionError:
+            self.invalidate_status()
             error_msg = 'Não foi possível conectar ao serviço PTT. Certifique-se de que está rodando: node whatsapp-ptt-service/server.js'
             logger.error(error_msg)
             return {
@@ -176,6 +217,269 @@ class WhatsAppPTTClient:
                 'timestamp': None
             }
 
+    def _post_ptt(self, phone: str, empresa_nome: str, media_id: str) -> requests.Response:
+        """Enviar PTT referenciando um áudio já registrado"""
+        return self.session.post(
+            f'{self.service_url}/send-ptt',
+            json={
+                'phone': phone,
+                'name': empresa_nome,
+                'mediaId': media_id
+            },
+            timeout=30
+        )
+
+    def upload_audio(self, audio_path: str, force: bool = False) -> str:
+        """
+        Registrar o áudio no serviço uma única vez
+
+        O mediaId é o SHA-256 do conteúdo: se o serviço já tiver o áudio (mesmo
+        enviado a partir de outro arquivo), os bytes não são reenviados nem
+        convertidos de novo. O ID fica em cache pelo caminho, data de modificação
+        e tamanho do arquivo.
+
+        Args:
+            audio_path (str): Caminho do arquivo de áudio
+            force (bool): Enviar o arquivo mesmo se já estiver registrado
+
+        Returns:
+            str: mediaId do áudio no serviço
+        """
+        stat = os.stat(audio_path)
+        key = (os.path.abspath(audio_path), stat.st_mtime, stat.st_size)
+
+        with self._lock:
+            if not force and key in self._media:
+                return self._media[key]
+
+            media_id = self._hash_file(audio_path)
+            if not force:
+                response = self.session.get(f'{self.service_url}/media/{media_id}', timeout=10)
+                if response.status_code == 200:
+                    self._media[key] = media_id
+                    logger.info(f'Áudio já registrado no serviço PTT: {os.path.basename(audio_path)} ({media_id[:12]})')
+                    return media_id
+
+            with open(audio_path, 'rb') as audio_file:
+                files = {'audio': (os.path.basename(audio_path), audio_file)}
+                response = self.session.post(f'{self.service_url}/media', files=files, timeout=60)
+
+            response.raise_for_status()
+            result = response.json()
+            if not result.get('success'):
+                raise RuntimeError(result.get('error') or 'Erro ao registrar áudio no serviço PTT')
+
+            self._media[key] = result['mediaId']
+            logger.info(f'Áudio registrado no serviço PTT: {os.path.basename(audio_path)} ({result["mediaId"][:12]})')
+            return result['mediaId']
+
+    @staticmethod
+    def _hash_file(audio_path: str) -> str:
+        """SHA-256 do conteúdo do arquivo (mesmo ID calculado pelo serviço)"""
+        digest = hashlib.sha256()
+        with open(audio_path, 'rb') as audio_file:
+            for block in iter(lambda: audio_file.read(1024 * 1024), b''):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def release_audio(self, audio_path: str) -> bool:
+        """
+        Remover do serviço o áudio registrado a partir deste arquivo
+
+        Returns:
+            bool: True se algum áudio foi removido
+        """
+        path = os.path.abspath(audio_path)
+        with self._lock:
+            keys = [key for key in self._media if key[0] == path]
+            media_ids = [self._media.pop(key) for key in keys]
+
+        removed = False
+        for media_id in media_ids:
+            try:
+                response = self.session.delete(f'{self.service_url}/media/{media_id}', timeout=10)
+                removed = removed or response.ok
+            except Exception as e:
+                logger.error(f'Erro ao remover áudio {media_id}: {e}')
+        return removed
+
+    # ==================== ENVIO EM LOTE ====================
+
+    def submit_batch(self, media_id: str, recipients: List[Dict], delay: float = 30,
+                     jitter: float = 0, retries: int = 1) -> Dict:
+        """
+        Criar no serviço um job de envio do mesmo áudio para vários contatos
+
+        O ritmo (intervalo + jitter) e as novas tentativas ficam no serviço;
+        o progresso é acompanhado com get_batch/wait_batch.
+
+        Args:
+            media_id (str): Áudio registrado (upload_audio)
+            recipients (list): [{'phone': ..., 'name': ..., 'ref': ...}] (ref volta nos resultados)
+            delay (float): Segundos entre envios
+            jitter (float): Variação aleatória adicional (segundos)
+            retries (int): Novas tentativas por contato
+
+        Returns:
+            dict: Resumo do job (jobId, status, total...) ou {'success': False, 'error': ...}
+        """
+        if len(recipients) > BATCH_MAX_RECIPIENTS:
+            return {'success': False, 'error': f'Máximo de {BATCH_MAX_RECIPIENTS} destinatários por job'}
+
+        body = json.dumps({
+            'mediaId': media_id,
+            'recipients': recipients,
+            'delay': delay,
+            'jitter': jitter,
+            'retries': retries
+        }).encode('utf-8')
+        if len(body) > BATCH_MAX_BODY:
+            # O serviço responderia 413 sem criar o job
+            return {'success': False, 'error': f'Lote excede o limite de {BATCH_MAX_BODY} bytes do serviço'}
+
+        try:
+            response = self.session.post(
+                f'{self.service_url}/send-ptt-batch',
+                data=body,
+                headers={'Content-Type': 'application/json'},
+                timeout=30
+            )
+            if response.status_code == 400:
+                self.invalidate_status()
+            return response.json()
+
+        except Exception as e:
+            logger.error(f'Erro ao criar job de envio em lote: {e}')
+            return {'success': False, 'error': str(e)}
+
+    def get_batch(self, job_id: str, since: int = 0) -> Dict:
+        """
+        Consultar o progresso de um job
+
+        Args:
+            job_id (str): ID do job
+            since (int): Devolver apenas resultados a partir deste índice
+
+        Returns:
+            dict: Resumo do job e 'results' novos
+        """
+        response = self.session.get(
+            f'{self.service_url}/send-ptt-batch/{job_id}',
+            params={'since': since},
+            timeout=10
+        )
+        response.raise_for_status()
+        return response.json()
+
+    def cancel_batch(self, job_id: str) -> bool:
+        """Interromper um job (o envio em andamento termina)"""
+        try:
+            response = self.session.post(f'{self.service_url}/send-ptt-batch/{job_id}/cancel', timeout=10)
+            return response.ok
+        except Exception as e:
+            logger.error(f'Erro ao cancelar job {job_id}: {e}')
+            return False
+
+    def wait_batch(self, job_id: str, on_result=None, should_stop=None,
+                   poll_interval: float = BATCH_POLL_INTERVAL, sleep=time.sleep) -> Dict:
+        """
+        Acompanhar um job até terminar, entregando cada resultado uma única vez
+
+        Args:
+            job_id (str): ID do job
+            on_result (callable): Chamado com cada resultado (index, phone, ref, success, error...)
+            should_stop (callable): Retorna True para cancelar o job
+            poll_interval (float): Segundos entre consultas
+            sleep (callable): Função de espera (ex.: socketio.sleep)
+
+        Returns:
+            dict: Resumo final do job
+        """
+        since = 0
+        cancel_sent = False
+        errors = 0
+
+        while True:
+            try:
+                job = self.get_batch(job_id, since)
+                errors = 0
+            except Exception as e:
+                # Falhas pontuais de rede não encerram o acompanhamento
+                errors += 1
+                logger.error(f'Erro ao consultar job {job_id}: {e}')
+                if errors >= 5:
+                    raise
+                sleep(poll_interval)
+                continue
+
+            for result in job.get('results', []):
+                if on_result:
+                    on_result(result)
+            since += len(job.get('results', []))
+
+            if job.get('status') != 'running':
+                return job
+
+            if should_stop and should_stop() and not cancel_sent:
+                cancel_sent = self.cancel_batch(job_id)
+
+            sleep(poll_interval)
+
+    def check_numbers(self, phones: List[str], batch_size: int = CHECK_BATCH_SIZE) -> Optional[Dict[str, bool]]:
+        """
+        Verificar em lote se números têm conta no WhatsApp (onWhatsApp do Baileys)
+
+        Args:
+            phones (list): Números do WhatsApp (qualquer formato)
+            batch_size (int): Números por requisição ao serviço
+
+        Returns:
+            dict: {numero (apenas dígitos, como recebido): existe}. Se um lote
+                falhar, os números dele ficam de fora e os demais lotes são
+                mantidos; None se nenhum lote pôde ser verificado
+        """
+        numeros = list(dict.fromkeys(
+            digits for digits in (''.join(filter(str.isdigit, str(phone or ''))) for phone in phones) if digits
+        ))
+        resultado = {}
+        falhas = 0
+
+        for i in range(0, len(numeros), batch_size):
+            batch = numeros[i:i + batch_size]
+            try:
+                response = self.session.post(
+                    f'{self.service_url}/check-numbers',
+                    json={'phones': batch},
+                    timeout=60
+                )
+                response.raise_for_status()
+                data = response.json()
+
+                if not data.get('success'):
+                    logger.error(f'Falha ao verificar números: {data.get("error")}')
+                    falhas += 1
+                    continue
+
+                for item in data.get('results', []):
+                    resultado[item['phone']] = bool(item.get('exists'))
+
+            except requests.exceptions.ConnectionError:
+                # Serviço fora do ar: os lotes seguintes também falhariam
+                self.invalidate_status()
+                logger.error('Não foi possível conectar ao serviço PTT. Certifique-se de que está rodando: node whatsapp-ptt-service/server.js')
+                falhas += 1
+                break
+
+            except Exception as e:
+                logger.error(f'Erro ao verificar números: {e}')
+                falhas += 1
+
+        if falhas and not resultado:
+            return None
+        if falhas:
+            logger.warning(f'Verificação parcial: {len(resultado)} de {len(numeros)} números verificados')
+        return resultado
+
     def logout(self) -> bool:
         """
         Desconectar do WhatsApp
@@ -184,10 +488,11 @@ class WhatsAppPTTClient:
             bool: True se logout bem-sucedido
         """
         try:
-            response = requests.post(f'{self.service_url}/logout', timeout=10)
+            response = self.session.post(f'{self.service_url}/logout', timeout=10)
             response.raise_for_status()
             result = response.json()
 
+            self.invalidate_status()
             if result.get('success'):
                 logger.info('Logout realizado com sucesso')
                 return True
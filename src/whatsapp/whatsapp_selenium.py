@@ -22,7 +22,7 @@ from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.chrome.service import Service
 from webdriver_manager.chrome import ChromeDriverManager
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
+from selenium.common.exceptions import TimeoutException, NoSuchElementException, StaleElementReferenceException
 
 # Adicionar src ao path
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
@@ -31,20 +31,118 @@ from utils.logger import Logger
 
 logger = Logger()
 
+# Elementos do WhatsApp Web observados pela camada de espera
+XPATH_SEARCH_BOX = '//div[@contenteditable="true"][@data-tab="3"]'
+XPATH_SEARCH_RESULT = '//div[@id="pane-side"]//div[@role="listitem" or @role="row"]'
+XPATH_MESSAGE_BOX = '//div[@contenteditable="true"][@data-tab="10"]'
+XPATH_INVALID_NUMBER = '//*[contains(text(), "número de telefone") and contains(text(), "não") and contains(text(), "WhatsApp")]'
+XPATH_FILE_INPUT = '//input[@type="file"]'
+XPATH_DIALOG_BUTTON = '//div[@role="dialog"]//button'
+
+# Seletores do botão de enviar no preview de anexo (disputados em paralelo)
+SEND_BUTTON_SELECTORS = [
+    '/html/body/div[1]/div/div/div[1]/div/div[3]/div/div[2]/div[2]/div/span/div/div/div/div[2]/div/div[2]/div[2]/div/div',
+    '//div[@role="button"]//span[@data-icon="send"]',
+    '//span[@data-icon="send"]',
+    '//button[@aria-label="Enviar"]',
+    '//button[contains(@aria-label, "Send")]',
+    '//div[@role="button" and @aria-label="Enviar"]',
+    '//span[@data-testid="send"]',
+    '//button[contains(@class, "send")]',
+    '//div[contains(@class, "send")]//button',
+]
+
+# Tempo máximo (segundos) de cada etapa; cada espera termina assim que a condição ocorre
+DEFAULT_TIMEOUTS = {
+    'search_box': 10,  # Caixa de busca de contatos
+    'search_results': 5,  # Resultados da busca
+    'chat_open': 20,  # Caixa de mensagem ou aviso de número inválido
+    'attach': 10,  # Menu de anexo / input de arquivo
+    'send_button': 15,  # Botão de enviar no preview (inclui processamento do arquivo)
+    'sent': 5,  # Confirmação (tick) da mensagem enviada
+    'in_page': 5,  # Troca de chat sem recarregar a página (antes do fallback por URL)
+}
+POLL_FREQUENCY = 0.1  # Intervalo entre verificações do DOM
+
+# Modos de abrir conversas: 'url' recarrega o app em /send?phone=; 'link' e 'search'
+# trocam de chat dentro do app já carregado e usam a URL apenas como fallback
+NAVIGATION_MODES = ('url', 'link', 'search')
+
+# 'link' e 'search' detectam a troca de chat pela identidade do elemento da caixa
+# de mensagem, o que ainda não foi validado em uma sessão real do WhatsApp Web
+# (se o React reaproveitar o nó, toda troca cai no fallback por URL). Ficam
+# desativados até WHATSAPP_INPAGE_NAVIGATION=1
+INPAGE_NAVIGATION_ENABLED = os.getenv('WHATSAPP_INPAGE_NAVIGATION') == '1'
+
+# Falhas seguidas da troca de chat na página antes de a sessão passar a usar só a URL
+IN_PAGE_MAX_FAILURES = 3
+
+# Modos de escrever a mensagem: 'insert_text' insere cada linha de uma vez (CDP
+# Input.insertText ou execCommand), 'keys' digita tecla a tecla com send_keys
+COMPOSITION_MODES = ('insert_text', 'keys')
+
+# Fallback do insert_text sem CDP: inserir texto no elemento focado (gera evento input)
+INSERT_TEXT_SCRIPT = "document.execCommand('insertText', false, arguments[0]);"
+
+# Caixa de mensagem com conteúdo (emojis viram <img> no WhatsApp Web)
+MESSAGE_BOX_FILLED_SCRIPT = "return arguments[0].textContent.length > 0 || arguments[0].querySelector('img') !== null;"
+
+# Clicar em um link wa.me dentro do app (tratado pelo próprio WhatsApp Web, sem reload)
+OPEN_CHAT_LINK_SCRIPT = """
+const link = document.createElement('a');
+link.href = 'https://wa.me/' + arguments[0];
+link.target = '_blank';
+link.rel = 'noopener noreferrer';
+(document.querySelector('#app') || document.body).appendChild(link);
+link.click();
+link.remove();
+"""
+
+# Última mensagem enviada no chat aberto: [data-id da linha, já tem tick de enviado].
+# A lista de mensagens é virtualizada (contar ticks não funciona), mas a última
+# mensagem está sempre renderizada com o chat rolado até o fim
+LAST_OUTGOING_SCRIPT = """
+const main = document.querySelector('#main') || document;
+const messages = main.querySelectorAll('.message-out, [data-id^="true_"]');
+const last = messages[messages.length - 1];
+if (!last) {
+    return [null, false];
+}
+const row = last.closest('[data-id]') || last;
+const sent = last.querySelector('[data-icon="msg-check"], [data-icon="msg-dblcheck"]') !== null;
+return [row.getAttribute('data-id'), sent];
+"""
+
 
 class WhatsAppSelenium:
     """Bot WhatsApp usando Selenium com sessão persistente"""
 
-    def __init__(self, session_name='default', headless=False):
+    def __init__(self, session_name='default', headless=False, timeouts=None, navigation='url',
+                 composition='insert_text'):
         """
         Inicializar bot WhatsApp
 
         Args:
             session_name (str): Nome da sessão (para múltiplas contas)
             headless (bool): Executar em modo headless (sem interface)
+            timeouts (dict): Sobrescrever tempos máximos por etapa (ver DEFAULT_TIMEOUTS)
+            navigation (str): Modo de abrir conversas (ver NAVIGATION_MODES)
+            composition (str): Modo de escrever a mensagem (ver COMPOSITION_MODES)
         """
+        if navigation not in NAVIGATION_MODES:
+            raise ValueError(f'Modo de navegação inválido: {navigation}')
+        if navigation != 'url' and not INPAGE_NAVIGATION_ENABLED:
+            raise ValueError(f'Modo de navegação experimental: {navigation} (defina WHATSAPP_INPAGE_NAVIGATION=1)')
+        if composition not in COMPOSITION_MODES:
+            raise ValueError(f'Modo de composição inválido: {composition}')
+
         self.session_name = session_name
         self.headless = headless
+        self.timeouts = {**DEFAULT_TIMEOUTS, **(timeouts or {})}
+        self.navigation = navigation
+        self.composition = composition
+        self._in_page_failures = 0
+        self._cdp_available = True  # Desativado se o driver não suportar execute_cdp_cmd
         self.driver = None
         self.is_logged_in = False
         self.session_dir = Path('whatsapp_sessions') / session_name
@@ -201,43 +299,316 @@ class WhatsAppSelenium:
             logger.error('Timeout aguardando login')
             return False
 
-    def search_contact(self, phone_or_name):
+    # ==================== ESPERAS POR EVENTOS DO DOM ====================
+
+    def wait_for_any(self, locators, timeout, clickable=False):
         """
-        Buscar contato por telefone ou nome
+        Aguardar o primeiro de vários elementos aparecer
+
+        Todas as condições são verificadas a cada POLL_FREQUENCY segundos e a
+        espera termina assim que uma delas ocorre (ou no timeout).
 
         Args:
-            phone_or_name (str): Telefone ou nome do contato
+            locators (dict): {nome: xpath}, verificados na ordem
+            timeout (float): Tempo máximo de espera em segundos
+            clickable (bool): Exigir elemento visível e habilitado
 
         Returns:
-            bool: True se encontrou, False caso contrário
+            tuple: (nome, elemento) ou (None, None) em caso de timeout
         """
-        try:
-            # Clicar na caixa de busca
-            search_box = WebDriverWait(self.driver, 10).until(
-                EC.presence_of_element_located((By.XPATH, '//div[@contenteditable="true"][@data-tab="3"]'))
-            )
+        def first_match(driver):
+            for name, xpath in locators.items():
+                for element in driver.find_elements(By.XPATH, xpath):
+                    if not clickable or (element.is_displayed() and element.is_enabled()):
+                        return name, element
+            return False
 
-            search_box.click()
-            time.sleep(0.5)
+        try:
+            return WebDriverWait(
+                self.driver, timeout,
+                poll_frequency=POLL_FREQUENCY,
+                ignored_exceptions=(StaleElementReferenceException,)
+            ).until(first_match)
+        except TimeoutException:
+            return None, None
 
-            # Limpar busca anterior
-            search_box.clear()
-            time.sleep(0.5)
+    def _last_outgoing_id(self):
+        """data-id da última mensagem enviada no chat aberto (ou None)"""
+        return self.driver.execute_script(LAST_OUTGOING_SCRIPT)[0]
 
-            # Digitar busca
-            search_box.send_keys(phone_or_name)
-            time.sleep(2)
+    def _wait_sent(self, previous_id):
+        """
+        Aguardar o tick de enviado na última mensagem enviada, que deve ser
+        outra além da que era a última antes do envio
 
-            # Pressionar Enter para abrir conversa
-            search_box.send_keys(Keys.ENTER)
-            time.sleep(2)
+        Returns:
+            bool: True se a confirmação apareceu dentro do timeout 'sent'
+        """
+        def confirmed(driver):
+            message_id, sent = driver.execute_script(LAST_OUTGOING_SCRIPT)
+            return sent and message_id != previous_id
 
+        try:
+            WebDriverWait(self.driver, self.timeouts['sent'], poll_frequency=POLL_FREQUENCY).until(confirmed)
             return True
+        except TimeoutException:
+            return False
+
+    def _open_chat(self, clean_phone):
+        """
+        Abrir conversa e aguardar o chat ficar pronto
+
+        Nos modos 'link' e 'search' a troca de chat acontece dentro do app já
+        carregado; se não funcionar, a conversa é aberta pela URL.
+
+        Returns:
+            tuple: ('ready', caixa de mensagem), ('invalid', None) se o WhatsApp
+                avisar que o número não existe, ou (None, None) no timeout
+        """
+        if self.navigation != 'url' and self._app_loaded():
+            if self.navigation == 'link':
+                outcome, element = self._open_chat_link(clean_phone)
+            else:
+                outcome, element = self._open_chat_search(clean_phone)
+
+            if outcome == 'invalid':
+                self._in_page_failures = 0
+                self._dismiss_dialog()
+                return outcome, None
+            if outcome == 'ready':
+                self._in_page_failures = 0
+                return outcome, element
+
+            logger.warning(f'Troca de chat na página falhou ({self.navigation}), abrindo via URL')
+            self._in_page_failures += 1
+            if self._in_page_failures >= IN_PAGE_MAX_FAILURES:
+                # Cada falha custa o timeout 'in_page' antes do fallback
+                logger.warning(f'{IN_PAGE_MAX_FAILURES} falhas seguidas; sessão {self.session_name} passa a usar navegação por URL')
+                self.navigation = 'url'
+
+        return self._open_chat_url(clean_phone)
+
+    def _open_chat_url(self, clean_phone):
+        """Abrir conversa via URL (recarrega o WhatsApp Web)"""
+        self.driver.get(f'https://web.whatsapp.com/send?phone={clean_phone}')
+
+        outcome, element = self.wait_for_any(
+            {'ready': XPATH_MESSAGE_BOX, 'invalid': XPATH_INVALID_NUMBER},
+            self.timeouts['chat_open']
+        )
+        return outcome, element if outcome == 'ready' else None
+
+    def _open_chat_link(self, clean_phone):
+        """Abrir conversa clicando em um link wa.me injetado no app"""
+        previous_box = self._current_message_box_id()
+        handles = len(self.driver.window_handles)
+
+        self.driver.execute_script(OPEN_CHAT_LINK_SCRIPT, clean_phone)
+
+        # Link não interceptado pelo app: abriu outra aba, desativar este modo
+        if len(self.driver.window_handles) > handles:
+            current = self.driver.current_window_handle
+            for handle in self.driver.window_handles[handles:]:
+                self.driver.switch_to.window(handle)
+                self.driver.close()
+            self.driver.switch_to.window(current if current in self.driver.window_handles else self.driver.window_handles[0])
+            logger.warning('WhatsApp Web não tratou o link na página; usando navegação por URL')
+            self.navigation = 'url'
+            return None, None
+
+        return self._wait_chat_switch(previous_box)
+
+    def _open_chat_search(self, clean_phone):
+        """Abrir conversa pela caixa de busca (contatos e conversas existentes)"""
+        previous_box = self._current_message_box_id()
+
+        if not self._search_and_open(clean_phone):
+            return None, None
+
+        return self._wait_chat_switch(previous_box)
+
+    def _app_loaded(self):
+        """Verificar se o WhatsApp Web já está carregado nesta aba"""
+        try:
+            return (self.driver.current_url.startswith('https://web.whatsapp.com') and
+                    bool(self.driver.find_elements(By.XPATH, XPATH_SEARCH_BOX)))
+        except Exception:
+            return False
+
+    def _current_message_box_id(self):
+        """Identificador do elemento da caixa de mensagem do chat aberto (ou None)"""
+        boxes = self.driver.find_elements(By.XPATH, XPATH_MESSAGE_BOX)
+        return boxes[0].id if boxes else None
+
+    def _wait_chat_switch(self, previous_box):
+        """
+        Aguardar uma caixa de mensagem diferente da anterior (novo chat) ou o aviso de número inválido
+
+        Returns:
+            tuple: ('ready', caixa), ('invalid', None) ou (None, None) no timeout 'in_page'
+        """
+        def switched(driver):
+            if driver.find_elements(By.XPATH, XPATH_INVALID_NUMBER):
+                return 'invalid', None
+            for element in driver.find_elements(By.XPATH, XPATH_MESSAGE_BOX):
+                if element.id != previous_box:
+                    return 'ready', element
+            return False
+
+        try:
+            return WebDriverWait(
+                self.driver, self.timeouts['in_page'],
+                poll_frequency=POLL_FREQUENCY,
+                ignored_exceptions=(StaleElementReferenceException,)
+            ).until(switched)
+        except TimeoutException:
+            return None, None
+
+    def _dismiss_dialog(self):
+        """Fechar diálogo aberto (ex.: aviso de número inválido) para liberar o app"""
+        for button in self.driver.find_elements(By.XPATH, XPATH_DIALOG_BUTTON):
+            try:
+                button.click()
+                return
+            except Exception:
+                continue
+
+    def _search_and_open(self, phone_or_name):
+        """Digitar na caixa de busca, aguardar resultados e abrir o primeiro (Enter)"""
+        # Clicar na caixa de busca
+        search_box = WebDriverWait(self.driver, self.timeouts['search_box'], poll_frequency=POLL_FREQUENCY).until(
+            EC.element_to_be_clickable((By.XPATH, XPATH_SEARCH_BOX))
+        )
+
+        search_box.click()
+
+        # Limpar busca anterior
+        search_box.clear()
+
+        # Digitar busca e aguardar os resultados
+        search_box.send_keys(phone_or_name)
+        outcome, _ = self.wait_for_any({'result': XPATH_SEARCH_RESULT}, self.timeouts['search_results'])
+
+        # Pressionar Enter para abrir conversa
+        search_box.send_keys(Keys.ENTER)
+        return outcome is not None
+
+    def search_contact(self, phone_or_name):
+        """
+        Buscar contato por telefone ou nome
+
+        Args:
+            phone_or_name (str): Telefone ou nome do contato
+
+        Returns:
+            bool: True se a conversa foi aberta, False caso contrário
+        """
+        try:
+            self._search_and_open(phone_or_name)
+
+            # A conversa pode já estar aberta: basta a caixa de mensagem estar presente
+            outcome, _ = self.wait_for_any({'ready': XPATH_MESSAGE_BOX}, self.timeouts['chat_open'])
+            return outcome == 'ready'
 
         except Exception as e:
             logger.error(f'Erro ao buscar contato: {e}')
             return False
 
+    # ==================== COMPOSIÇÃO DA MENSAGEM ====================
+
+    def _compose_message(self, message_box, message, mode=None):
+        """
+        Escrever a mensagem na caixa do chat aberto
+
+        No modo 'insert_text' cada linha é inserida de uma vez (inclusive emojis
+        fora do BMP, que o send_keys do ChromeDriver não suporta) e as quebras
+        de linha viram Shift+Enter. Se a caixa continuar vazia, digita com send_keys.
+
+        Returns:
+            str: Modo efetivamente usado
+        """
+        mode = mode or self.composition
+
+        if mode == 'insert_text':
+            try:
+                self._insert_message(message_box, message)
+                if not message.strip() or self.driver.execute_script(MESSAGE_BOX_FILLED_SCRIPT, message_box):
+                    return 'insert_text'
+                logger.warning('Inserção de texto não refletiu na caixa de mensagem, digitando com send_keys')
+            except Exception as e:
+                logger.warning(f'Erro ao inserir texto ({e}), digitando com send_keys')
+            self._clear_message_box(message_box)
+
+        self._type_message(message_box, message)
+        return 'keys'
+
+    def _insert_message(self, message_box, message):
+        """Inserir cada linha com uma única operação"""
+        message_box.click()
+
+        lines = message.split('\n')
+        for i, line in enumerate(lines):
+            if line:
+                self._insert_text(line)
+            if i < len(lines) - 1:
+                # Shift+Enter para quebra de linha
+                message_box.send_keys(Keys.SHIFT, Keys.ENTER)
+
+    def _insert_text(self, text):
+        """Inserir texto no elemento focado (CDP Input.insertText ou execCommand)"""
+        if self._cdp_available:
+            try:
+                self.driver.execute_cdp_cmd('Input.insertText', {'text': text})
+                return
+            except AttributeError:
+                self._cdp_available = False  # Driver sem suporte a CDP
+
+        self.driver.execute_script(INSERT_TEXT_SCRIPT, text)
+
+    def _type_message(self, message_box, message):
+        """Digitar a mensagem linha por linha com send_keys"""
+        lines = message.split('\n')
+        for i, line in enumerate(lines):
+            message_box.send_keys(line)
+            if i < len(lines) - 1:
+                # Shift+Enter para quebra de linha
+                message_box.send_keys(Keys.SHIFT, Keys.ENTER)
+
+    def _clear_message_box(self, message_box):
+        """Apagar o conteúdo da caixa de mensagem"""
+        message_box.send_keys(Keys.CONTROL, 'a')
+        message_box.send_keys(Keys.DELETE)
+
+    def benchmark_composition(self, phone, message, repeats=3):
+        """
+        Comparar o tempo de escrita da mensagem em cada modo (sem enviar)
+
+        Args:
+            phone (str): Número de um chat para o teste
+            message (str): Mensagem (ex.: template já personalizado)
+            repeats (int): Repetições por modo
+
+        Returns:
+            dict: {modo: tempo médio em segundos} ou None se o chat não abrir
+        """
+        outcome, message_box = self._open_chat(''.join(filter(str.isdigit, phone)))
+        if outcome != 'ready':
+            logger.error(f'Não foi possível abrir o chat de {phone} para o benchmark')
+            return None
+
+        results = {}
+        for mode in COMPOSITION_MODES:
+            elapsed = []
+            for _ in range(repeats):
+                start = time.perf_counter()
+                used = self._compose_message(message_box, message, mode=mode)
+                elapsed.append(time.perf_counter() - start)
+                self._clear_message_box(message_box)
+            results[mode] = sum(elapsed) / len(elapsed)
+            logger.info(f'Composição {mode} ({used}): {results[mode]:.3f}s em média ({len(message)} caracteres)')
+
+        return results
+
     def check_chat_history(self):
         """
         Verificar se já existe histórico de conversa no chat aberto
@@ -308,14 +679,10 @@ class WhatsAppSelenium:
             # Formatar telefone (remover caracteres especiais)
             clean_phone = ''.join(filter(str.isdigit, phone))
 
-            # Abrir conversa via URL
-            url = f'https://web.whatsapp.com/send?phone={clean_phone}'
-            self.driver.get(url)
-            time.sleep(3)
+            # Abrir conversa via URL e aguardar: caixa de mensagem OU aviso de número inválido
+            outcome, _ = self._open_chat(clean_phone)
 
-            # Verificar se o número existe
-            try:
-                error_element = self.driver.find_element(By.XPATH, '//*[contains(text(), "número de telefone") and contains(text(), "não") and contains(text(), "WhatsApp")]')
+            if outcome == 'invalid':
                 logger.error(f'Número {phone} não existe no WhatsApp')
                 return {
                     'success': False,
@@ -325,15 +692,8 @@ class WhatsAppSelenium:
                     'status': 'nao_existe',
                     'timestamp': datetime.now().isoformat()
                 }
-            except:
-                pass  # Número existe, continuar
 
-            # Aguardar caixa de mensagem aparecer
-            try:
-                WebDriverWait(self.driver, 20).until(
-                    EC.presence_of_element_located((By.XPATH, '//div[@contenteditable="true"][@data-tab="10"]'))
-                )
-            except TimeoutException:
+            if outcome is None:
                 logger.error(f'Timeout ao aguardar caixa de mensagem para {phone}.')
                 return {
                     'success': False,
@@ -345,46 +705,28 @@ class WhatsAppSelenium:
                 }
 
             # Localizar botão de anexo (clipe)
-            try:
-                attach_button = WebDriverWait(self.driver, 10).until(
-                    EC.presence_of_element_located((By.XPATH, '//div[@title="Anexar" or @aria-label="Anexar"]'))
-                )
-                attach_button.click()
-                time.sleep(1)
-            except:
-                # Tentar XPath alternativo
-                try:
-                    attach_button = self.driver.find_element(By.XPATH, '//span[@data-icon="plus" or @data-icon="attach-menu-plus"]/..')
-                    attach_button.click()
-                    time.sleep(1)
-                except Exception as e:
-                    logger.error(f'Erro ao clicar no botão de anexo: {e}')
-                    return {
-                        'success': False,
-                        'phone': phone,
-                        'empresa': empresa_nome,
-                        'error': 'Não foi possível abrir menu de anexo',
-                        'timestamp': datetime.now().isoformat()
-                    }
+            _, attach_button = self.wait_for_any(
+                {
+                    'anexar': '//div[@title="Anexar" or @aria-label="Anexar"]',
+                    'plus': '//span[@data-icon="plus" or @data-icon="attach-menu-plus"]/..'
+                },
+                self.timeouts['attach'],
+                clickable=True
+            )
+            if not attach_button:
+                logger.error('Erro ao clicar no botão de anexo: botão não encontrado')
+                return {
+                    'success': False,
+                    'phone': phone,
+                    'empresa': empresa_nome,
+                    'error': 'Não foi possível abrir menu de anexo',
+                    'timestamp': datetime.now().isoformat()
+                }
+            attach_button.click()
 
-            # Localizar input de arquivo (invisível)
+            # Localizar input de arquivo (invisível), presente assim que o menu abre
             try:
-                # Tentar múltiplos seletores para o input de arquivo
-                file_input = None
-                input_selectors = [
-                    '//input[@type="file"]',
-                    '//input[@accept]',
-                    '//input[@accept="image/*,video/mp4,video/3gpp,video/quicktime"]',
-                    '//input[contains(@accept, "image")]'
-                ]
-
-                for selector in input_selectors:
-                    try:
-                        file_input = self.driver.find_element(By.XPATH, selector)
-                        if file_input:
-                            break
-                    except:
-                        continue
+                _, file_input = self.wait_for_any({'file': XPATH_FILE_INPUT}, self.timeouts['attach'])
 
                 if not file_input:
                     logger.error('Não foi possível encontrar input de arquivo')
@@ -402,9 +744,6 @@ class WhatsAppSelenium:
 
                 logger.info(f'Arquivo de áudio carregado: {absolute_path}')
 
-                # Aguardar mais tempo para o arquivo processar
-                time.sleep(3)
-
             except Exception as e:
                 logger.error(f'Erro ao enviar arquivo: {e}')
                 return {
@@ -415,60 +754,32 @@ class WhatsAppSelenium:
                     'timestamp': datetime.now().isoformat()
                 }
 
-            # Aguardar preview do arquivo e botão de enviar
+            # Aguardar preview do arquivo: o botão de enviar fica clicável quando o arquivo termina de processar
             try:
-                # Tentar múltiplos seletores para o botão de enviar
-                send_button = None
-                send_selectors = [
-                    # XPath específico fornecido pelo usuário
-                    '/html/body/div[1]/div/div/div[1]/div/div[3]/div/div[2]/div[2]/div/span/div/div/div/div[2]/div/div[2]/div[2]/div/div',
-                    # Versão relativa do mesmo XPath
-                    '//div[@role="button"]//span[@data-icon="send"]',
-                    # Seletores alternativos
-                    '//span[@data-icon="send"]',
-                    '//button[@aria-label="Enviar"]',
-                    '//button[contains(@aria-label, "Send")]',
-                    '//div[@role="button" and @aria-label="Enviar"]',
-                    '//span[@data-testid="send"]',
-                    '//button[contains(@class, "send")]',
-                    # Buscar pelo parent do ícone
-                    '//span[@data-icon="send"]/parent::div[@role="button"]',
-                    '//span[@data-icon="send"]/..'
-                ]
-
-                for selector in send_selectors:
-                    try:
-                        send_button = WebDriverWait(self.driver, 5).until(
-                            EC.element_to_be_clickable((By.XPATH, selector))
-                        )
-                        if send_button:
-                            logger.info(f'Botão de enviar encontrado com: {selector}')
-                            break
-                    except:
-                        continue
+                selector, send_button = self.wait_for_any(
+                    {selector: selector for selector in SEND_BUTTON_SELECTORS},
+                    self.timeouts['send_button'],
+                    clickable=True
+                )
 
                 if not send_button:
-                    logger.warning('Botão de enviar não encontrado com seletores conhecidos. Tentando alternativa...')
-
-                    # Última tentativa: procurar por qualquer botão/span clicável na área de preview
-                    try:
-                        send_button = WebDriverWait(self.driver, 5).until(
-                            EC.element_to_be_clickable((By.XPATH, '//div[contains(@class, "send")]//button'))
-                        )
-                    except:
-                        return {
-                            'success': False,
-                            'phone': phone,
-                            'empresa': empresa_nome,
-                            'error': 'Não foi possível encontrar botão de enviar. Verifique se o arquivo foi carregado manualmente.',
-                            'timestamp': datetime.now().isoformat()
-                        }
-
-                time.sleep(1)
+                    return {
+                        'success': False,
+                        'phone': phone,
+                        'empresa': empresa_nome,
+                        'error': 'Não foi possível encontrar botão de enviar. Verifique se o arquivo foi carregado manualmente.',
+                        'timestamp': datetime.now().isoformat()
+                    }
+
+                logger.info(f'Botão de enviar encontrado com: {selector}')
+
+                last_sent = self._last_outgoing_id()
                 send_button.click()
-                time.sleep(3)
 
-                logger.success(f'Áudio enviado para {empresa_nome or phone}')
+                if self._wait_sent(last_sent):
+                    logger.success(f'Áudio enviado para {empresa_nome or phone}')
+                else:
+                    logger.warning('Áudio enviado mas não confirmado visualmente')
 
                 return {
                     'success': True,
@@ -527,29 +838,10 @@ class WhatsAppSelenium:
             # Formatar telefone (remover caracteres especiais)
             clean_phone = ''.join(filter(str.isdigit, phone))
 
-            # Abrir conversa via URL (mais confiável)
-            url = f'https://web.whatsapp.com/send?phone={clean_phone}'
-            self.driver.get(url)
-            time.sleep(3)
+            # Abrir conversa via URL e aguardar: caixa de mensagem OU aviso de número inválido
+            outcome, message_box = self._open_chat(clean_phone)
 
-            # Se check_history está ativo, verificar histórico
-            if check_history:
-                has_history = self.check_chat_history()
-                if has_history:
-                    logger.info(f'Conversa já iniciada com {empresa_nome or phone}. Pulando envio.')
-                    return {
-                        'success': False,
-                        'phone': phone,
-                        'empresa': empresa_nome,
-                        'error': 'Conversa já iniciada anteriormente',
-                        'status': 'ja_enviado',
-                        'has_history': True,
-                        'timestamp': datetime.now().isoformat()
-                    }
-
-            # Verificar se o número existe (procurar por mensagem de erro)
-            try:
-                error_element = self.driver.find_element(By.XPATH, '//*[contains(text(), "número de telefone") and contains(text(), "não") and contains(text(), "WhatsApp")]')
+            if outcome == 'invalid':
                 logger.error(f'Número {phone} não existe no WhatsApp')
                 return {
                     'success': False,
@@ -559,15 +851,8 @@ class WhatsAppSelenium:
                     'status': 'nao_existe',
                     'timestamp': datetime.now().isoformat()
                 }
-            except:
-                pass  # Número existe, continuar
 
-            # Aguardar caixa de mensagem aparecer
-            try:
-                message_box = WebDriverWait(self.driver, 20).until(
-                    EC.presence_of_element_located((By.XPATH, '//div[@contenteditable="true"][@data-tab="10"]'))
-                )
-            except TimeoutException:
+            if outcome is None:
                 # Pode ser que o número não exista
                 logger.error(f'Timeout ao aguardar caixa de mensagem para {phone}. Número pode não existir.')
                 return {
@@ -579,28 +864,31 @@ class WhatsAppSelenium:
                     'timestamp': datetime.now().isoformat()
                 }
 
-            time.sleep(1)
+            # Se check_history está ativo, verificar histórico (chat já carregado)
+            if check_history:
+                has_history = self.check_chat_history()
+                if has_history:
+                    logger.info(f'Conversa já iniciada com {empresa_nome or phone}. Pulando envio.')
+                    return {
+                        'success': False,
+                        'phone': phone,
+                        'empresa': empresa_nome,
+                        'error': 'Conversa já iniciada anteriormente',
+                        'status': 'ja_enviado',
+                        'has_history': True,
+                        'timestamp': datetime.now().isoformat()
+                    }
 
-            # Dividir mensagem em linhas e enviar
-            lines = message.split('\n')
-            for i, line in enumerate(lines):
-                message_box.send_keys(line)
-                if i < len(lines) - 1:
-                    # Shift+Enter para quebra de linha
-                    message_box.send_keys(Keys.SHIFT, Keys.ENTER)
+            last_sent = self._last_outgoing_id()
 
-            time.sleep(0.5)
+            # Escrever a mensagem (uma inserção por linha, ou tecla a tecla no modo 'keys')
+            self._compose_message(message_box, message)
 
             # Enviar (Enter)
             message_box.send_keys(Keys.ENTER)
 
-            time.sleep(2)
-
-            # Verificar se enviou (procurar ícone de enviado)
-            try:
-                WebDriverWait(self.driver, 5).until(
-                    EC.presence_of_element_located((By.XPATH, '//span[@data-icon="msg-check" or @data-icon="msg-dblcheck"]'))
-                )
+            # Verificar se enviou (tick na nova última mensagem enviada)
+            if self._wait_sent(last_sent):
                 logger.success(f'Mensagem enviada para {empresa_nome or phone}')
 
                 return {
@@ -610,16 +898,15 @@ class WhatsAppSelenium:
                     'timestamp': datetime.now().isoformat()
                 }
 
-            except TimeoutException:
-                # Pode ter enviado mesmo sem encontrar o ícone
-                logger.warning('Mensagem enviada mas não confirmada visualmente')
-                return {
-                    'success': True,
-                    'phone': phone,
-                    'empresa': empresa_nome,
-                    'warning': 'Enviado mas não confirmado',
-                    'timestamp': datetime.now().isoformat()
-                }
+            # Pode ter enviado mesmo sem encontrar o ícone
+            logger.warning('Mensagem enviada mas não confirmada visualmente')
+            return {
+                'success': True,
+                'phone': phone,
+                'empresa': empresa_nome,
+                'warning': 'Enviado mas não confirmado',
+                'timestamp': datetime.now().isoformat()
+            }
 
         except TimeoutException:
             error_msg = 'Timeout aguardando elementos do WhatsApp'
@@ -811,6 +1098,9 @@ if __name__ == '__main__':
         # result = bot.send_message('+5511999999999', 'Teste do bot Selenium!', 'Teste')
         # print(f'Resultado: {result}')
 
+        # Benchmark da escrita: insert_text x send_keys (não envia a mensagem)
+        # print(bot.benchmark_composition('+5511999999999', 'Olá! 😀 Linha de teste\n' * 50))
+
         print('\n✅ Teste concluído. Feche o navegador ou aguarde...')
         input('Pressione Enter para fechar...')
 
@@ -10,22 +10,34 @@ const express = require('express');
 const multer = require('multer');
 const cors = require('cors');
 const fs = require('fs');
+const crypto = require('crypto');
 const path = require('path');
 
 // Configurações
 const PORT = 3001;
 const UPLOAD_DIR = path.join(__dirname, 'uploads');
+const MEDIA_DIR = path.join(__dirname, 'media'); // Áudios já convertidos, nomeados pelo SHA-256 do upload
+const MEDIA_CACHE_MAX = 20; // Áudios convertidos mantidos em memória
+const BATCH_MAX_RECIPIENTS = 10000; // Destinatários por job de envio em lote
+const BATCH_MAX_BODY = '4mb'; // Limite do JSON recebido (10000 destinatários ≈ 1 MB; o padrão de 100kb recusa ~1400)
+const BATCH_JOB_TTL = 60 * 60 * 1000; // Jobs concluídos ficam disponíveis por 1 hora
+const BATCH_RETRY_DELAY = 5000; // Espera antes de repetir um envio que falhou (ms)
 const AUTH_DIR = path.join(__dirname, 'auth_baileys');
+const CHECK_BATCH_SIZE = 50; // Números por consulta onWhatsApp
+const CHECK_MAX_NUMBERS = 1000; // Números por requisição /check-numbers
 
 // Criar diretórios necessários
 if (!fs.existsSync(UPLOAD_DIR)) {
     fs.mkdirSync(UPLOAD_DIR, { recursive: true });
 }
+if (!fs.existsSync(MEDIA_DIR)) {
+    fs.mkdirSync(MEDIA_DIR, { recursive: true });
+}
 
 // Configurar Express
 const app = express();
 app.use(cors());
-app.use(express.json());
+app.use(express.json({ limit: BATCH_MAX_BODY }));
 
 // Configurar Multer para upload de arquivos
 const storage = multer.diskStorage({
@@ -51,6 +63,14 @@ const logger = {
     success: (msg, ...args) => console.log(`[SUCCESS] ${msg}`, ...args)
 };
 
+// Cache dos áudios convertidos (mediaId -> Buffer OGG, em ordem de uso)
+const mediaCache = new Map();
+// Conversões em andamento (mediaId -> Promise), para não converter o mesmo conteúdo em paralelo
+const pendingTranscodes = new Map();
+
+// Jobs de envio em lote (jobId -> job)
+const batchJobs = new Map();
+
 // Estado do WhatsApp
 let sock = null;
 let qrCode = null;
@@ -171,6 +191,238 @@ function formatPhoneToJID(phone) {
     return cleanPhone + '@s.whatsapp.net';
 }
 
+/**
+ * Caminho de um áudio registrado (null se o ID for inválido ou não existir)
+ */
+function getMediaPath(mediaId) {
+    if (!/^[a-f0-9]{64}$/.test(mediaId || '')) {
+        return null;
+    }
+
+    const mediaPath = path.join(MEDIA_DIR, `${mediaId}.ogg`);
+    return fs.existsSync(mediaPath) ? mediaPath : null;
+}
+
+/**
+ * Obter o áudio convertido de um mediaId (memória ou disco)
+ */
+function getMediaBuffer(mediaId) {
+    if (mediaCache.has(mediaId)) {
+        const buffer = mediaCache.get(mediaId);
+        mediaCache.delete(mediaId);
+        mediaCache.set(mediaId, buffer);
+        return buffer;
+    }
+
+    const mediaPath = getMediaPath(mediaId);
+    if (!mediaPath) {
+        return null;
+    }
+
+    const buffer = fs.readFileSync(mediaPath);
+    mediaCache.set(mediaId, buffer);
+    if (mediaCache.size > MEDIA_CACHE_MAX) {
+        mediaCache.delete(mediaCache.keys().next().value);
+    }
+    return buffer;
+}
+
+/**
+ * Registrar um upload pelo hash do conteúdo
+ *
+ * O áudio só é convertido para OGG Opus na primeira vez que o conteúdo
+ * aparece; uploads repetidos reaproveitam o arquivo já convertido. Se a
+ * conversão falhar, o upload é descartado e a promessa é rejeitada.
+ */
+async function registerMedia(uploadPath) {
+    const mediaId = crypto.createHash('sha256').update(fs.readFileSync(uploadPath)).digest('hex');
+
+    if (getMediaPath(mediaId)) {
+        fs.unlinkSync(uploadPath);
+        return { mediaId, cached: true };
+    }
+
+    if (pendingTranscodes.has(mediaId)) {
+        fs.unlinkSync(uploadPath);
+    } else {
+        const transcode = (async () => {
+            // Extensão própria: a saída .ogg nunca coincide com o arquivo de entrada
+            const sourcePath = `${uploadPath}.src`;
+            fs.renameSync(uploadPath, sourcePath);
+
+            const oggPath = await convertToOgg(sourcePath);
+            if (oggPath === sourcePath) {
+                // ffmpeg falhou: nada é gravado sob o hash, senão o arquivo não
+                // convertido seria reaproveitado em todo upload com o mesmo conteúdo
+                fs.rmSync(sourcePath, { force: true });
+                fs.rmSync(sourcePath.replace(/\.[^/.]+$/, '.ogg'), { force: true });
+                throw new Error('Falha ao converter o áudio para OGG Opus');
+            }
+            fs.renameSync(oggPath, path.join(MEDIA_DIR, `${mediaId}.ogg`));
+        })();
+
+        pendingTranscodes.set(mediaId, transcode.finally(() => pendingTranscodes.delete(mediaId)));
+    }
+
+    await pendingTranscodes.get(mediaId);
+    return { mediaId, cached: false };
+}
+
+/**
+ * Números equivalentes no WhatsApp: no Brasil o JID de contas antigas pode
+ * vir sem o nono dígito (55 + DDD + 8 dígitos)
+ */
+function phoneVariants(cleanPhone) {
+    const variants = [cleanPhone];
+
+    if (cleanPhone.startsWith('55')) {
+        if (cleanPhone.length === 13 && cleanPhone[4] === '9') {
+            variants.push(cleanPhone.slice(0, 4) + cleanPhone.slice(5));
+        } else if (cleanPhone.length === 12) {
+            variants.push(cleanPhone.slice(0, 4) + '9' + cleanPhone.slice(4));
+        }
+    }
+
+    return variants;
+}
+
+/**
+ * Verificar em lote quais números têm conta no WhatsApp (sem abrir conversas)
+ */
+async function checkNumbers(phones) {
+    const results = [];
+
+    for (let i = 0; i < phones.length; i += CHECK_BATCH_SIZE) {
+        const batch = phones.slice(i, i + CHECK_BATCH_SIZE);
+        const jids = batch.map(formatPhoneToJID);
+
+        // Uma consulta por lote; a resposta traz os JIDs encontrados
+        const found = await sock.onWhatsApp(...jids);
+        const existing = new Map();
+        for (const item of found || []) {
+            if (item && item.exists) {
+                existing.set(item.jid.split('@')[0], item.jid);
+            }
+        }
+
+        batch.forEach((phone, index) => {
+            const cleanPhone = jids[index].split('@')[0];
+            const match = phoneVariants(cleanPhone).find(variant => existing.has(variant));
+            results.push({
+                phone: phone,
+                exists: !!match,
+                jid: match ? existing.get(match) : null
+            });
+        });
+    }
+
+    return results;
+}
+
+/**
+ * Aguardar (ms)
+ */
+function sleep(ms) {
+    return new Promise(resolve => setTimeout(resolve, ms));
+}
+
+/**
+ * Enviar buffer OGG Opus como PTT
+ */
+async function sendPTTBuffer(phone, audioBuffer) {
+    await sock.sendMessage(formatPhoneToJID(phone), {
+        audio: audioBuffer,
+        mimetype: 'audio/ogg; codecs=opus',
+        ptt: true, // 🔥 Isto define como PTT!
+        fileName: 'audio.ogg'
+    });
+}
+
+/**
+ * Resumo público de um job de envio em lote
+ */
+function batchJobSummary(job) {
+    return {
+        jobId: job.id,
+        status: job.status,
+        total: job.recipients.length,
+        processed: job.results.length,
+        sent: job.sent,
+        failed: job.failed,
+        createdAt: job.createdAt,
+        finishedAt: job.finishedAt
+    };
+}
+
+/**
+ * Processar um job: envios em sequência, com intervalo + jitter e novas tentativas
+ */
+async function runBatchJob(job) {
+    const audioBuffer = getMediaBuffer(job.mediaId);
+
+    for (let i = 0; i < job.recipients.length; i++) {
+        if (job.cancelled) {
+            break;
+        }
+
+        // Intervalo entre envios com variação aleatória (não antes do primeiro)
+        if (i > 0) {
+            const waitMs = (job.delay + Math.random() * job.jitter) * 1000;
+            const until = Date.now() + waitMs;
+            while (!job.cancelled && Date.now() < until) {
+                await sleep(Math.min(1000, until - Date.now()));
+            }
+            if (job.cancelled) {
+                break;
+            }
+        }
+
+        const recipient = job.recipients[i];
+        let error = null;
+
+        for (let attempt = 0; attempt <= job.retries; attempt++) {
+            if (attempt > 0) {
+                await sleep(BATCH_RETRY_DELAY);
+            }
+
+            try {
+                if (!sock || !connectionState.connected) {
+                    throw new Error('WhatsApp não está conectado');
+                }
+                await sendPTTBuffer(recipient.phone, audioBuffer);
+                error = null;
+                break;
+            } catch (err) {
+                error = err.message || 'Erro ao enviar áudio PTT';
+                logger.warn(`Falha ao enviar PTT para ${recipient.phone} (tentativa ${attempt + 1}): ${error}`);
+            }
+        }
+
+        if (error) {
+            job.failed++;
+        } else {
+            job.sent++;
+        }
+
+        job.results.push({
+            index: i,
+            phone: recipient.phone,
+            name: recipient.name || '',
+            ref: recipient.ref,
+            success: !error,
+            error: error,
+            timestamp: new Date().toISOString()
+        });
+    }
+
+    job.status = job.cancelled ? 'cancelled' : 'completed';
+    job.finishedAt = new Date().toISOString();
+    logger.info(`📦 Job ${job.id} ${job.status}: ${job.sent} enviados, ${job.failed} falhas`);
+
+    // Remover o job da memória depois de um tempo
+    setTimeout(() => batchJobs.delete(job.id), BATCH_JOB_TTL);
+}
+
 /**
  * Converter áudio para formato OGG Opus
  */
@@ -215,6 +467,13 @@ app.get('/', (req, res) => {
             status: 'GET /status',
             qr: 'GET /qr',
             sendPTT: 'POST /send-ptt',
+            sendPTTBatch: 'POST /send-ptt-batch',
+            batchStatus: 'GET /send-ptt-batch/:id?since=N',
+            batchCancel: 'POST /send-ptt-batch/:id/cancel',
+            checkNumbers: 'POST /check-numbers',
+            uploadMedia: 'POST /media',
+            checkMedia: 'GET /media/:id',
+            deleteMedia: 'DELETE /media/:id',
             logout: 'POST /logout'
         }
     });
@@ -249,10 +508,85 @@ app.get('/qr', (req, res) => {
 });
 
 /**
- * POST /send-ptt - Enviar áudio como PTT
+ * POST /media - Registrar áudio para vários envios
  *
  * Body (multipart/form-data):
  * - audio: arquivo de áudio (required)
+ *
+ * Retorna o mediaId (SHA-256 do conteúdo) usado em /send-ptt no lugar do arquivo
+ */
+app.post('/media', upload.single('audio'), async (req, res) => {
+    try {
+        if (!req.file) {
+            return res.status(400).json({
+                success: false,
+                error: 'Arquivo de áudio é obrigatório'
+            });
+        }
+
+        const { mediaId, cached } = await registerMedia(req.file.path);
+        logger.info(`📥 Áudio registrado: ${mediaId} (${cached ? 'já convertido' : 'convertido agora'})`);
+
+        res.json({
+            success: true,
+            mediaId: mediaId,
+            cached: cached
+        });
+
+    } catch (error) {
+        logger.error('❌ Erro ao registrar áudio:', error);
+
+        if (req.file && fs.existsSync(req.file.path)) {
+            fs.unlinkSync(req.file.path);
+        }
+
+        res.status(500).json({
+            success: false,
+            error: error.message || 'Erro ao registrar áudio'
+        });
+    }
+});
+
+/**
+ * GET /media/:id - Verificar se um áudio já está registrado (evita reenviar os bytes)
+ */
+app.get('/media/:id', (req, res) => {
+    if (!getMediaPath(req.params.id)) {
+        return res.status(404).json({
+            success: false,
+            error: 'Áudio não encontrado'
+        });
+    }
+
+    res.json({
+        success: true,
+        mediaId: req.params.id
+    });
+});
+
+/**
+ * DELETE /media/:id - Remover áudio registrado
+ */
+app.delete('/media/:id', (req, res) => {
+    const mediaPath = getMediaPath(req.params.id);
+    if (!mediaPath) {
+        return res.status(404).json({
+            success: false,
+            error: 'Áudio não encontrado'
+        });
+    }
+
+    fs.unlinkSync(mediaPath);
+    mediaCache.delete(req.params.id);
+    res.json({ success: true });
+});
+
+/**
+ * POST /send-ptt - Enviar áudio como PTT
+ *
+ * Body (multipart/form-data ou JSON):
+ * - audio: arquivo de áudio (required, ou mediaId)
+ * - mediaId: ID retornado por /media ou SHA-256 do áudio (alternativa ao arquivo)
  * - phone: número do WhatsApp (required)
  * - name: nome do contato (optional)
  */
@@ -267,7 +601,7 @@ app.post('/send-ptt', upload.single('audio'), async (req, res) => {
         }
 
         // Validar dados
-        const { phone, name } = req.body;
+        const { phone, name, mediaId } = req.body;
         if (!phone) {
             return res.status(400).json({
                 success: false,
@@ -275,35 +609,29 @@ app.post('/send-ptt', upload.single('audio'), async (req, res) => {
             });
         }
 
-        if (!req.file) {
+        if (!req.file && !mediaId) {
             return res.status(400).json({
                 success: false,
                 error: 'Arquivo de áudio é obrigatório'
             });
         }
 
-        let audioPath = req.file.path;
-        logger.info(`📤 Enviando PTT para ${phone} (${name || 'sem nome'})`);
-
-        // Converter para OGG Opus
-        audioPath = await convertToOgg(audioPath);
+        // Arquivo enviado junto: registrar pelo hash (converte só se for conteúdo novo)
+        const audioId = req.file ? (await registerMedia(req.file.path)).mediaId : mediaId;
 
-        // Ler arquivo de áudio
-        const audioBuffer = fs.readFileSync(audioPath);
+        // Áudio já convertido para OGG Opus
+        const audioBuffer = getMediaBuffer(audioId);
+        if (!audioBuffer) {
+            return res.status(404).json({
+                success: false,
+                error: 'Áudio não encontrado. Registre novamente em /media.'
+            });
+        }
 
-        // Formatar JID
-        const jid = formatPhoneToJID(phone);
+        logger.info(`📤 Enviando PTT para ${phone} (${name || 'sem nome'})`);
 
         // Enviar como PTT
-        await sock.sendMessage(jid, {
-            audio: audioBuffer,
-            mimetype: 'audio/ogg; codecs=opus',
-            ptt: true, // 🔥 Isto define como PTT!
-            fileName: 'audio.ogg'
-        });
-
-        // Limpar arquivo temporário
-        fs.unlinkSync(audioPath);
+        await sendPTTBuffer(phone, audioBuffer);
 
         logger.info(`✅ PTT enviado com sucesso para ${phone}`);
 
@@ -329,6 +657,175 @@ app.post('/send-ptt', upload.single('audio'), async (req, res) => {
     }
 });
 
+/**
+ * POST /send-ptt-batch - Criar job de envio do mesmo áudio para vários contatos
+ *
+ * Body (JSON):
+ * - mediaId: ID retornado por /media (required)
+ * - recipients: [{ phone, name, ref }] (required; ref é devolvido nos resultados)
+ * - delay: segundos entre envios (default 30)
+ * - jitter: variação aleatória adicional em segundos (default 0)
+ * - retries: novas tentativas por contato (default 1)
+ *
+ * Os resultados são lidos em GET /send-ptt-batch/:id?since=N
+ */
+app.post('/send-ptt-batch', (req, res) => {
+    if (!sock || !connectionState.connected) {
+        return res.status(400).json({
+            success: false,
+            error: 'WhatsApp não está conectado. Faça login primeiro.'
+        });
+    }
+
+    const { mediaId } = req.body;
+    const recipients = (req.body.recipients || []).filter(recipient => recipient && recipient.phone);
+
+    if (!getMediaBuffer(mediaId)) {
+        return res.status(404).json({
+            success: false,
+            error: 'Áudio não encontrado. Registre novamente em /media.'
+        });
+    }
+
+    if (!recipients.length || recipients.length > BATCH_MAX_RECIPIENTS) {
+        return res.status(400).json({
+            success: false,
+            error: `Informe de 1 a ${BATCH_MAX_RECIPIENTS} destinatários`
+        });
+    }
+
+    // Valores inválidos (NaN) desligariam o intervalo entre envios e as tentativas
+    const delay = Number(req.body.delay ?? 30);
+    const jitter = Number(req.body.jitter ?? 0);
+    const retries = Number(req.body.retries ?? 1);
+    if (!Number.isFinite(delay) || !Number.isFinite(jitter) || !Number.isInteger(retries)) {
+        return res.status(400).json({
+            success: false,
+            error: 'delay e jitter devem ser números e retries um inteiro'
+        });
+    }
+
+    const job = {
+        id: crypto.randomUUID(),
+        mediaId: mediaId,
+        recipients: recipients.map(recipient => ({ ...recipient, phone: String(recipient.phone) })),
+        delay: Math.max(0, delay),
+        jitter: Math.max(0, jitter),
+        retries: Math.max(0, retries),
+        status: 'running',
+        cancelled: false,
+        sent: 0,
+        failed: 0,
+        results: [],
+        createdAt: new Date().toISOString(),
+        finishedAt: null
+    };
+    batchJobs.set(job.id, job);
+
+    logger.info(`📦 Job ${job.id} criado: ${recipients.length} destinatários`);
+
+    runBatchJob(job).catch(error => {
+        logger.error(`❌ Erro no job ${job.id}:`, error);
+        job.status = 'failed';
+        job.finishedAt = new Date().toISOString();
+    });
+
+    res.json({
+        success: true,
+        ...batchJobSummary(job)
+    });
+});
+
+/**
+ * GET /send-ptt-batch/:id?since=N - Progresso do job e resultados a partir do índice N
+ */
+app.get('/send-ptt-batch/:id', (req, res) => {
+    const job = batchJobs.get(req.params.id);
+    if (!job) {
+        return res.status(404).json({
+            success: false,
+            error: 'Job não encontrado'
+        });
+    }
+
+    const since = Math.max(0, parseInt(req.query.since || '0', 10) || 0);
+
+    res.json({
+        success: true,
+        ...batchJobSummary(job),
+        results: job.results.slice(since)
+    });
+});
+
+/**
+ * POST /send-ptt-batch/:id/cancel - Interromper um job (o envio em andamento termina)
+ */
+app.post('/send-ptt-batch/:id/cancel', (req, res) => {
+    const job = batchJobs.get(req.params.id);
+    if (!job) {
+        return res.status(404).json({
+            success: false,
+            error: 'Job não encontrado'
+        });
+    }
+
+    job.cancelled = true;
+    res.json({
+        success: true,
+        ...batchJobSummary(job)
+    });
+});
+
+/**
+ * POST /check-numbers - Verificar se números existem no WhatsApp
+ *
+ * Body (JSON):
+ * - phones: lista de números (required, até CHECK_MAX_NUMBERS)
+ */
+app.post('/check-numbers', async (req, res) => {
+    try {
+        // Verificar se está conectado
+        if (!sock || !connectionState.connected) {
+            return res.status(400).json({
+                success: false,
+                error: 'WhatsApp não está conectado. Faça login primeiro.'
+            });
+        }
+
+        const phones = (req.body.phones || []).map(String).filter(phone => /[0-9]/.test(phone));
+        if (!phones.length) {
+            return res.status(400).json({
+                success: false,
+                error: 'Lista de números é obrigatória'
+            });
+        }
+
+        if (phones.length > CHECK_MAX_NUMBERS) {
+            return res.status(400).json({
+                success: false,
+                error: `Máximo de ${CHECK_MAX_NUMBERS} números por requisição`
+            });
+        }
+
+        logger.info(`🔎 Verificando ${phones.length} números no WhatsApp`);
+        const results = await checkNumbers(phones);
+        const total = results.filter(result => result.exists).length;
+        logger.info(`✅ ${total}/${phones.length} números existem no WhatsApp`);
+
+        res.json({
+            success: true,
+            results: results
+        });
+
+    } catch (error) {
+        logger.error('❌ Erro ao verificar números:', error);
+        res.status(500).json({
+            success: false,
+            error: error.message || 'Erro ao verificar números'
+        });
+    }
+});
+
 /**
  * POST /logout - Desconectar do WhatsApp
  */